@@ -83,6 +83,7 @@ class OPTION(StrEnum):
 
     # Optimization Preferences
     OPT_STRATEGY = "opt_strategy"
+    CACHE_DIR = "cache_dir"
 
 
 OPTIONS = options.Options()
@@ -243,6 +244,9 @@ def init() -> None:
         ignore_none=True,
     )
 
+    # Directory of the compilation cache (None = no cache)
+    OPTIONS(Action.ADD, name=OPTION.CACHE_DIR, type=str, default=None, ignore_none=True)
+
     OPTIONS(
         Action.ADD,
         name=OPTION.PROJECT_FILENAME,
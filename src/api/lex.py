@@ -16,17 +16,35 @@ class LexError(Exception):
 
 
 class LexToken:
-    def __init__(self) -> None:
-        self.type: str | None = None
-        self.value: Any = None
-        self.lineno: int = 1
-        self.lexpos: int = 0
-        self.lexer: Lexer | None = None
+    __slots__ = "fname", "lexer", "lexpos", "lineno", "text", "type", "value"
+
+    fname: str  # File the token comes from (set by the preprocessor)
+    text: str  # Original text of the token, if its value was converted (set by the lexer rules)
+
+    def __init__(
+        self,
+        type: str | None = None,
+        value: Any = None,
+        lineno: int = 1,
+        lexpos: int = 0,
+        lexer: Lexer | None = None,
+    ) -> None:
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.lexer = lexer
 
     def __repr__(self) -> str:
         return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
 
 
+# Rules of a state, compiled into a single regex with a named group per rule (in the order
+# they are tried), and, for every group name, the token type and the function to call (if any)
+Action = tuple[str, Callable[[LexToken], Any] | None]
+StateRules = tuple[re.Pattern[str] | None, dict[str, Action]]
+
+
 class Lexer:
     def __init__(self, obj: Any) -> None:
         self._object = obj
@@ -102,31 +120,21 @@ class Lexer:
         strings.sort(key=lambda x: len(x[3]), reverse=True)
 
         # Build rules per state
-        state_rules: dict[str, list[tuple[str, re.Pattern[str], Callable[[LexToken], Any] | None]]] = {
+        state_rules: dict[str, list[tuple[str, str, str, Callable[[LexToken], Any] | None]]] = {
             s: [] for s in state_names
         }
 
         # Add functions first
         for name, target_states, rule_name, pattern, func in functions:
-            try:
-                rx = re.compile(pattern)
-                for s in target_states:
-                    state_rules[s].append((rule_name, rx, func))
-            except Exception as e:
-                print(f"Error compiling pattern {pattern!r} for rule {name}: {e}", file=sys.stderr)
-                raise e
+            for s in target_states:
+                state_rules[s].append((name, rule_name, pattern, func))
 
         # Add strings second
         for name, target_states, rule_name, pattern in strings:
-            try:
-                rx = re.compile(pattern)
-                for s in target_states:
-                    state_rules[s].append((rule_name, rx, None))
-            except Exception as e:
-                print(f"Error compiling pattern {pattern!r} for rule {name}: {e}", file=sys.stderr)
-                raise e
+            for s in target_states:
+                state_rules[s].append((name, rule_name, pattern, None))
 
-        self.compiled_rules = state_rules
+        self.compiled_rules: dict[str, StateRules] = {s: compile_rules(rules) for s, rules in state_rules.items()}
 
     def input(self, data: str) -> None:
         self.lexdata = data
@@ -171,46 +179,29 @@ class Lexer:
 
         while self.lexpos < len(self.lexdata):
             state = self.statestack[-1]
-            rules = self.compiled_rules.get(state, [])
-
-            matched = False
-            for rule_name, rx, val in rules:
-                m = rx.match(self.lexdata, self.lexpos)
-                if m:
-                    matched = True
-                    matched_text = m.group(0)
-
-                    t = LexToken()
-                    t.type = rule_name
-                    t.value = matched_text
-                    t.lineno = self.lineno
-                    t.lexpos = self.lexpos
-                    t.lexer = self
-
-                    # Advance position BEFORE calling function
-                    self.lexpos += len(matched_text)
-
-                    if val:
-                        res = val(t)
-                        if res is None:
-                            # Ignored token
-                            break
-                        return res
-                    # Convert to token type (which is rule_name)
+            # Undeclared states (set directly in statestack) have no rules
+            regex, actions = self.compiled_rules.get(state, (None, {}))
+
+            m = regex.match(self.lexdata, self.lexpos) if regex is not None else None
+            if m is not None:
+                rule_name, func = actions[m.lastgroup]  # type: ignore[index]
+                t = LexToken(rule_name, m.group(), self.lineno, self.lexpos, self)
+
+                # Advance position BEFORE calling function
+                self.lexpos = m.end()
+
+                if func is None:
                     return t
 
-            if matched:
-                continue
+                res = func(t)
+                if res is not None:
+                    return res
+                continue  # Ignored token
 
             # No rule matched
             err_handler = self.error_handlers.get(state)
             if err_handler:
-                t = LexToken()
-                t.type = "error"
-                t.value = self.lexdata[self.lexpos :]
-                t.lineno = self.lineno
-                t.lexpos = self.lexpos
-                t.lexer = self
+                t = LexToken("error", self.lexdata[self.lexpos :], self.lineno, self.lexpos, self)
 
                 old_pos = self.lexpos
                 res = err_handler(t)
@@ -226,6 +217,27 @@ class Lexer:
         return None
 
 
+def compile_rules(rules: list[tuple[str, str, str, Callable[[LexToken], Any] | None]]) -> StateRules:
+    """Compiles the given (name, rule_name, pattern, function) rules of a state into a single regex,
+    which tries them in the given order. Rules are identified by their (unique) names.
+    """
+    if not rules:
+        return None, {}
+
+    try:
+        regex = re.compile("|".join(f"(?P<{name}>{pattern})" for name, _, pattern, _ in rules))
+    except re.error:
+        for name, _, pattern, _ in rules:  # Reports the first wrong pattern
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                print(f"Error compiling pattern {pattern!r} for rule {name}: {e}", file=sys.stderr)
+                raise e
+        raise
+
+    return regex, {name: (rule_name, func) for name, rule_name, _, func in rules}
+
+
 def get_attr(obj: Any, name: str, default: Any = None) -> Any:
     if isinstance(obj, dict):
         return obj.get(name, default)
@@ -6,6 +6,7 @@
 # --------------------------------------------------------------------
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 
 __all__ = ("BackendInterface",)
 
@@ -31,9 +32,10 @@ class BackendInterface(ABC):
         """Emits Program End routine"""
 
     @abstractmethod
-    def emit(self, *, optimize: bool = True) -> list[str]:
+    def emit(self, *, optimize: bool = True, variables: Iterable[str] = ()) -> list[str]:
         """Begin converting each quad instruction to asm
         by iterating over the "mem" array, and called its
         associated function. Each function returns an array of
-        ASM instructions
+        ASM instructions.
+        variables are the (global) variables declared apart, with their own memory.
         """
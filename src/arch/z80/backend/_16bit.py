@@ -5,6 +5,7 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
+from src.api.config import OPTIONS, OptimizationStrategy
 from src.api.tmp_labels import tmp_label
 from src.arch.z80.backend._8bit import Bits8
 from src.arch.z80.backend.common import _int_ops, is_2n, is_int, log2, runtime_call
@@ -234,6 +235,9 @@ class Bits16:
             A * 1 = 1 * A = A
 
           * If B is 2^n and B < 16 => Shift Right n
+
+          * Otherwise, if B has just a few bits, and not optimizing for size,
+            shift and add instead of calling the multiplication routine
         """
         op1, op2 = tuple(ins[2:])
         if _int_ops(op1, op2) is not None:  # If any of the operands is constant
@@ -261,6 +265,19 @@ class Bits16:
                 output.append("push hl")
                 return output
 
+            bits = bin(cls.int16(op2))[3:]  # Bits after the leading 1
+            if OPTIONS.opt_strategy != OptimizationStrategy.Size and len(bits) + bits.count("1") <= 8:
+                # e.g. HL * 10 (1010b) = ((HL * 2) * 2 + HL) * 2
+                if "1" in bits:
+                    output.append("ld d, h")
+                    output.append("ld e, l")
+                for bit in bits:
+                    output.append("add hl, hl")
+                    if bit == "1":
+                        output.append("add hl, de")
+                output.append("push hl")
+                return output
+
             output.append(f"ld de, {op2}")
         else:
             if op2[0] == "_":  # stack optimization
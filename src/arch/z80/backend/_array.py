@@ -51,6 +51,17 @@ def _addr(value: str) -> list[str]:
     return output
 
 
+def _store_addr(ins: Quad) -> list[str]:
+    """Emits the address of the array element to store into (in HL).
+    istore instructions compute it inline after the value, so it is
+    already at the top of the stack.
+    """
+    if ins.instr.startswith("istore"):
+        return ["pop hl"]
+
+    return _addr(ins[1])
+
+
 def _aaddr(ins: Quad) -> list[str]:
     """Loads the address of an array element
     into the stack.
@@ -131,7 +142,7 @@ def _astore8(ins: Quad) -> list[str]:
     stack.
     Use '*' for indirect store on 1st operand (A pointer to an array)
     """
-    output = _addr(ins[1])
+    output = _store_addr(ins)
     op = ins[2]
 
     indirect = op[0] == "*"
@@ -180,7 +191,7 @@ def _astore16(ins: Quad) -> list[str]:
     store16 a, x =>  *(&a) = x
     Use '*' for indirect store on 1st operand.
     """
-    output = _addr(ins[1])
+    output = _store_addr(ins)
     op = ins[2]
 
     indirect = op[0] == "*"
@@ -234,7 +245,7 @@ def _astore32(ins: Quad) -> list[str]:
     """Stores 2º operand content into address of 1st operand.
     store16 a, x =>  *(&a) = x
     """
-    output = _addr(ins[1])
+    output = _store_addr(ins)
 
     value = ins[2]
     if value[0] == "*":
@@ -267,7 +278,7 @@ def _astoref16(ins: Quad) -> list[str]:
     """Stores 2º operand content into address of 1st operand.
     storef16 a, x =>  *(&a) = x
     """
-    output = _addr(ins[1])
+    output = _store_addr(ins)
 
     value = ins[2]
     if value[0] == "*":
@@ -291,7 +302,7 @@ def _astoref16(ins: Quad) -> list[str]:
 
 def _astoref(ins: Quad) -> list[str]:
     """Stores a floating point value into a memory address."""
-    output = _addr(ins[1])
+    output = _store_addr(ins)
 
     value = ins[2]
     if value[0] == "*":
@@ -257,6 +257,15 @@ class ICInstruction(ICInstructionInterface):
     ASTOREF = "astoref"
     ASTORESTR = "astorestr"
     # ARRAY STORE STR1 <-- STR2
+    ISTOREI8 = "istorei8"
+    ISTOREU8 = "istoreu8"
+    ISTOREI16 = "istorei16"
+    ISTOREU16 = "istoreu16"
+    ISTOREI32 = "istorei32"
+    ISTOREU32 = "istoreu32"
+    ISTOREF16 = "istoref16"
+    ISTOREF = "istoref"
+    # ARRAY ELEMENT STORE t, X -> Stores X at the address t, computed after X
     LOADI8 = "loadi8"
     LOADU8 = "loadu8"
     LOADI16 = "loadi16"
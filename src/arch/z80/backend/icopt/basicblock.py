@@ -0,0 +1,114 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+from __future__ import annotations
+
+import itertools
+from collections.abc import Iterable, Iterator, Sequence
+
+from ..icinstruction import ICInstruction
+from ..quad import Quad
+from . import ops
+
+__all__ = "BasicBlock", "get_basic_blocks"
+
+# Instructions which always jump (RET jumps to the function exit label)
+JUMPS = frozenset((ICInstruction.JUMP, *(x for x in ICInstruction.values() if x.startswith("ret"))))
+
+# Instructions after which the execution does not continue in the next quad
+ENDS = JUMPS | {ICInstruction.LEAVE, ICInstruction.END}
+
+
+def _is_branch(quad: Quad) -> bool:
+    """Whether the quad jumps to its label depending on its operand (i.e. jzerou8)"""
+    return (ops.split(quad) or ("", ""))[0] in ops.BRANCHES
+
+
+class BasicBlock(Sequence[Quad]):
+    """A sequence of quads only entered at its beginning (i.e. a label) and only left at its end (i.e. a jump).
+    Jumps not known (i.e. from inline ASM, or computed ones) are not taken into account.
+    """
+
+    def __init__(self, quads: Iterable[Quad]) -> None:
+        self.quads: list[Quad] = list(quads)
+        self.next: BasicBlock | None = None  # Which (if any) basic block follows this one in memory
+        self.prev: BasicBlock | None = None  # Which (if any) basic block precedes to this one in the code
+        self.comes_from: set[BasicBlock] = set()  # Blocks jumping to this one, or following on it
+        self.goes_to: set[BasicBlock] = set()  # Blocks this one jumps to, or follows on
+
+    def __len__(self) -> int:
+        return len(self.quads)
+
+    def __getitem__(self, key):
+        return self.quads[key]
+
+    def __iter__(self) -> Iterator[Quad]:
+        return iter(self.quads)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.label or ''} len: {len(self)}>"
+
+    @property
+    def label(self) -> str | None:
+        """The label this block starts with, if any"""
+        if self.quads and self.quads[0].instr == ICInstruction.LABEL:
+            return self.quads[0].args[0]
+
+        return None
+
+    @property
+    def jump_label(self) -> str | None:
+        """The label this block jumps to at its end, if any"""
+        if not self.quads:
+            return None
+
+        quad = self.quads[-1]
+        if quad.instr == ICInstruction.JUMP:
+            return quad.args[0]
+
+        if quad.instr in JUMPS or _is_branch(quad):
+            return quad.args[-1]
+
+        return None
+
+    @property
+    def falls_through(self) -> bool:
+        """Whether the execution might continue in the next block"""
+        return not self.quads or self.quads[-1].instr not in ENDS
+
+
+def get_basic_blocks(quads: Iterable[Quad]) -> list[BasicBlock]:
+    """Splits the quads into basic blocks, and links them building the control flow graph"""
+    result: list[BasicBlock] = []
+    current: list[Quad] = []
+
+    for quad in quads:
+        if current and quad.instr in (ICInstruction.LABEL, ICInstruction.INLINE):
+            result.append(BasicBlock(current))
+            current = []
+
+        current.append(quad)
+        if quad.instr in ENDS or quad.instr == ICInstruction.INLINE or _is_branch(quad):
+            result.append(BasicBlock(current))
+            current = []
+
+    if current:
+        result.append(BasicBlock(current))
+
+    labels = {block.label: block for block in result if block.label is not None}
+    for prev, block in itertools.pairwise(result):
+        prev.next, block.prev = block, prev
+
+    for block in result:
+        if block.next is not None and block.falls_through:
+            block.goes_to.add(block.next)
+        if (target := labels.get(block.jump_label or "")) is not None:
+            block.goes_to.add(target)
+        for target in block.goes_to:
+            target.comes_from.add(block)
+
+    return result
@@ -0,0 +1,347 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Optimizations on the intermediate code (quads), before it's emitted:
+
+  * Constant propagation and folding: variables known to hold a literal are replaced by it,
+    and operations on literals are computed at compile time.
+  * Copy propagation: literals and variables pushed onto the stack are directly used by the quad popping them.
+  * Algebraic simplifications (i.e. X + 0, X * 1, X * 0).
+  * Common subexpression elimination: an expression whose value is already held by a variable is read from it.
+  * Dead temporaries elimination: computations whose result is no longer needed are removed.
+
+The quads are a stack machine: each temporary is pushed by the quad computing it and popped by the one using it.
+Temporary names can't be trusted, so the data flow within each basic block is recovered by simulating the stack.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable
+
+from ..common import is_int
+from ..icinstruction import ICInstruction
+from ..quad import Quad
+from . import ops
+from .basicblock import get_basic_blocks
+
+__all__ = ("optimize",)
+
+# Quads declaring variables (other labels, like DIM AT ones, might be aliases)
+DECLARATIONS = frozenset((ICInstruction.VAR, ICInstruction.VARX, ICInstruction.VARD))
+
+
+class Memory:
+    """Values known to be held by variables at some point of the code.
+    Different variables are assumed not to overlap, as the ASM optimizer does.
+    """
+
+    def __init__(self) -> None:
+        self.constants: dict[str, tuple[int, int]] = {}  # Operand -> (size, value)
+        self.values: dict[Hashable, tuple[str, int, frozenset[str]]] = {}  # Expression -> (operand, size, vars read)
+
+    def clear(self) -> None:
+        self.constants.clear()
+        self.values.clear()
+
+    def kill(self, var: str) -> None:
+        """Forgets everything depending on the given variable, after it's written"""
+        self.constants = {k: v for k, v in self.constants.items() if ops.base(k) != var}
+        self.values = {k: v for k, v in self.values.items() if ops.base(v[0]) != var and var not in v[2]}
+
+    def constant(self, operand: str, type_: str) -> str | None:
+        """The literal held by the operand, if known"""
+        if (value := self.constants.get(operand)) is None or value[0] != ops.INT_TYPES[type_]:
+            return None
+
+        return ops.literal(value[1], type_)
+
+
+class Optimizer:
+    """Optimizes a list of quads. Each basic block is optimized in order, starting with the values known
+    at the end of the previous one if that's the only way to get into it.
+    """
+
+    def __init__(self, quads: Iterable[Quad], variables: Iterable[str] = ()) -> None:
+        self.quads: list[Quad | None] = list(quads)  # Deleted quads are set to None
+        self.variables = frozenset(
+            (*variables, *(quad.args[0] for quad in self.quads if quad and quad.instr in DECLARATIONS))
+        )
+        self.producers: dict[tuple[int, int], int] = {}  # (quad, arg) -> quad pushing the value popped
+        self.consumers: dict[int, tuple[int, int]] = {}  # quad -> (quad, arg) popping the value pushed
+
+    def __call__(self) -> list[Quad]:
+        start = 0
+        memory = Memory()
+        for block in get_basic_blocks(quad for quad in self.quads if quad is not None):
+            if block.label is not None or block.prev is None or block.comes_from != {block.prev}:
+                memory = Memory()
+            self._optimize_block(start, start + len(block), memory)
+            start += len(block)
+
+        return [quad for quad in self.quads if quad is not None]
+
+    def _optimize_block(self, start: int, end: int, memory: Memory) -> None:
+        self._link(start, end)
+        i = start
+        while i < end:
+            if self._rewrite(i, memory):  # Quads before i might be deleted, but the memory state is the same
+                continue
+
+            self._update(i, memory)
+            i += 1
+
+    def _quad(self, i: int) -> Quad:
+        quad = self.quads[i]
+        assert quad is not None
+        return quad
+
+    def _link(self, start: int, end: int) -> None:
+        """Matches each value pushed with the quad popping it.
+        Values pushed or popped by opaque quads are unknown, and left unlinked.
+        """
+        self.producers.clear()
+        self.consumers.clear()
+        stack: list[int] = []
+
+        for i in range(start, end):
+            if (quad := self.quads[i]) is None:
+                continue
+
+            if not ops.is_pure(quad):
+                stack.clear()
+                continue
+
+            for arg in reversed(ops.sources(quad)):  # The last operand pushed is popped first
+                if ops.is_stack(quad.args[arg]) and stack:
+                    j = stack.pop()
+                    self.producers[i, arg] = j
+                    self.consumers[j] = i, arg
+
+            if ops.result_type(quad) is not None:
+                stack.append(i)
+
+    def _subtree(self, i: int) -> list[int] | None:
+        """Quads computing the operands of the given one, or None if any of them is unknown"""
+        result: list[int] = []
+        quad = self._quad(i)
+        for arg in ops.sources(quad):
+            if not ops.is_stack(quad.args[arg]):
+                continue
+
+            if (j := self.producers.get((i, arg))) is None or (tree := self._subtree(j)) is None:
+                return None
+
+            result.extend((*tree, j))
+
+        return result
+
+    def _writes(self, start: int, end: int) -> bool:
+        """Whether any quad between the given ones (not included) might write into memory"""
+        for quad in self.quads[start + 1 : end]:
+            if quad is not None and (not ops.is_pure(quad) or (ops.split(quad) or ("", ""))[0] == "store"):
+                return True
+
+        return False
+
+    def _takes_boolean(self, i: int) -> bool:
+        """Whether the result of the quad is only checked for being 0 or not"""
+        return (consumer := self.consumers.get(i)) is not None and ops.takes_boolean(self._quad(consumer[0]))
+
+    def _fold(self, i: int, quad: Quad) -> int | None:
+        """The result of the quad replacing the i-th one, if it can be computed"""
+        if (value := ops.fold(quad)) is None or ops.is_boolean(quad) and not self._takes_boolean(i):
+            return None
+
+        return value
+
+    def _can_emit(self, i: int, quad: Quad) -> bool:
+        """Whether the quad can replace the i-th one: operations on literals only must be folded"""
+        op = (ops.split(quad) or ("", ""))[0]
+        if op in ("load", "store") or op in ops.BRANCHES or not all(is_int(quad.args[x]) for x in ops.sources(quad)):
+            return True
+
+        return self._fold(i, quad) is not None
+
+    def _key(self, i: int) -> tuple[Hashable, frozenset[str]] | None:
+        """Returns a key identifying the value computed by the quad, and the variables it reads.
+        Loads are transparent, so X + 1 has the same key whether X is loaded first or not.
+        Returns None if the value depends on anything else.
+        """
+        quad = self._quad(i)
+        if ops.result_type(quad) is None or ops.is_boolean(quad) and not self._takes_boolean(i):
+            return None  # Some boolean results are not normalized (i.e. could be either 1 or 255)
+
+        keys: list[Hashable] = []
+        read: set[str] = set()
+        for arg in ops.sources(quad):
+            operand = quad.args[arg]
+            if is_int(operand):
+                keys.append(ops.literal(int(operand), ops.operand_type(quad, arg)))
+            elif ops.is_memory(operand) and ops.base(operand) in self.variables:
+                keys.append(operand)
+                read.add(ops.base(operand))
+            elif not ops.is_stack(operand) or operand[0] == "*":
+                return None
+            elif (j := self.producers.get((i, arg))) is None or (sub := self._key(j)) is None:
+                return None
+            else:
+                keys.append(sub[0])
+                read.update(sub[1])
+
+        if (ops.split(quad) or ("", ""))[0] == "load":
+            return keys[0], frozenset(read)
+
+        if quad.instr == ICInstruction.CAST:
+            return (quad.instr, *quad.args[1:3], *keys), frozenset(read)
+
+        return (quad.instr, *keys), frozenset(read)
+
+    def _load(self, i: int, value: str) -> None:
+        """Replaces the i-th quad with a load of the given literal or variable"""
+        quad = self._quad(i)
+        self.quads[i] = Quad(f"load{ops.result_type(quad)}", quad.args[0], value)
+
+    def _unlink(self, i: int) -> None:
+        """Removes the links of the operands of the given quad"""
+        for arg in ops.sources(self._quad(i)):
+            if (j := self.producers.pop((i, arg), None)) is not None:
+                del self.consumers[j]
+
+    def _delete(self, quads: Iterable[int]) -> None:
+        """Deletes the given quads, and their links"""
+        for i in quads:
+            self._unlink(i)
+            if (consumer := self.consumers.pop(i, None)) is not None:
+                del self.producers[consumer]
+            self.quads[i] = None
+
+    def _rewrite(self, i: int, memory: Memory) -> bool:
+        """Optimizes the i-th quad. Returns whether anything changed"""
+        if (quad := self.quads[i]) is None or not ops.is_pure(quad):
+            return False
+
+        indexes = ops.sources(quad)
+        op, type_ = ops.split(quad) or ("", "")
+
+        # Constant propagation
+        args = list(quad.args)
+        for arg in indexes:
+            if ops.is_memory(args[arg]) and (value := memory.constant(args[arg], ops.operand_type(quad, arg))):
+                args[arg] = value
+
+        if args != list(quad.args) and self._can_emit(i, new := Quad(quad.instr, *args)):
+            self.quads[i] = new
+            return True
+
+        # Constant folding
+        if (result := self._fold(i, quad)) is not None:
+            self._load(i, str(result))
+            return True
+
+        # Algebraic identities: X + 0 = X
+        if (arg := ops.identity(quad)) is not None and (not ops.is_boolean(quad) or self._takes_boolean(i)):
+            if not ops.is_stack(operand := quad.args[arg]) or operand[0] == "*":
+                self._load(i, operand)
+                return True
+
+            # Removes the quad leaving the operand onto the stack, so it's popped by the consumer instead
+            producer, consumer = self.producers.get((i, arg)), self.consumers.get(i)
+            self._delete((i,))
+            if producer is not None and consumer is not None:
+                self.producers[consumer], self.consumers[producer] = producer, consumer
+            return True
+
+        # Absorbing elements: X * 0 = 0
+        if (
+            (result := ops.absorbing(quad)) is not None
+            and (not ops.is_boolean(quad) or self._takes_boolean(i))
+            and (tree := self._subtree(i)) is not None
+        ):
+            self._delete(tree)
+            self._load(i, str(result))
+            return True
+
+        # Common subexpressions already held by a variable
+        if (
+            op != "load"
+            and (key := self._key(i)) is not None
+            and (held := memory.values.get(key[0])) is not None
+            and held[1] == ops.INT_TYPES[ops.result_type(quad) or ""]
+            and (tree := self._subtree(i)) is not None
+            and not self._writes(min(tree, default=i), i)
+        ):
+            self._delete(tree)
+            self._load(i, held[0])
+            return True
+
+        # Copy propagation: the consumer uses the literal or variable loaded
+        if (
+            op == "load"
+            and (is_int(value := quad.args[1]) or ops.is_memory(value))
+            and (consumer := self.consumers.get(i)) is not None
+        ):
+            j, arg = consumer
+            target = self._quad(j)
+            operand_type = ops.operand_type(target, arg)
+            if (
+                target.args[arg][0] != "*"
+                and ops.INT_TYPES[operand_type] == ops.INT_TYPES[type_]
+                and (is_int(value) or not self._writes(i, j))
+            ):
+                args = list(target.args)
+                args[arg] = ops.literal(int(value), operand_type) if is_int(value) else value
+                if self._can_emit(j, new := Quad(target.instr, *args)):
+                    self._delete((i,))
+                    self.quads[j] = new
+                    return True
+
+        return False
+
+    def _update(self, i: int, memory: Memory) -> None:
+        """Updates the values known to be held by variables after executing the i-th quad"""
+        if (quad := self.quads[i]) is None:
+            return
+
+        if not ops.is_pure(quad):
+            memory.clear()
+            return
+
+        op, type_ = ops.split(quad) or ("", "")
+        if op != "store":
+            return
+
+        dest, value = quad.args
+        if not ops.is_memory(dest) or (var := ops.base(dest)) not in self.variables:
+            memory.clear()  # Unknown address (i.e. POKE)
+            return
+
+        memory.kill(var)
+        size = ops.INT_TYPES[type_]
+        if is_int(value):
+            memory.constants[dest] = size, ops.to_int(int(value), type_)
+        elif (
+            ops.is_stack(value)
+            and value[0] != "*"
+            and (j := self.producers.get((i, 1))) is not None
+            and (key := self._key(j)) is not None
+            and isinstance(key[0], tuple)
+            and var not in key[1]
+        ):
+            memory.values[key[0]] = dest, size, key[1]
+
+
+def optimize(quads: Iterable[Quad], variables: Iterable[str] = ()) -> list[Quad]:
+    """Returns the given quads optimized. Each pass might enable further optimizations
+    on quads already visited (i.e. a load whose consumer has been removed), so it's repeated until nothing changes.
+    Besides those declared by the quads, the given variables (i.e. globals, declared later) are known not to overlap.
+    """
+    result = list(quads)
+    variables = frozenset(variables)
+    while (optimized := Optimizer(result, variables)()) != result:
+        result = optimized
+
+    return result
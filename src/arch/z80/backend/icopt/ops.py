@@ -0,0 +1,288 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Semantics of the quads understood by the IC optimizer: integer operations, casts, loads and stores.
+Any other quad is opaque (i.e. calls, arrays, strings and floats).
+"""
+
+import operator
+import re
+from collections.abc import Callable
+from types import MappingProxyType
+from typing import Final
+
+from ..common import is_int
+from ..icinstruction import ICInstruction
+from ..quad import Quad
+
+__all__ = (
+    "INT_TYPES",
+    "absorbing",
+    "base",
+    "fold",
+    "identity",
+    "is_boolean",
+    "is_memory",
+    "is_pure",
+    "is_stack",
+    "literal",
+    "operand_type",
+    "result_type",
+    "sources",
+    "split",
+    "takes_boolean",
+    "to_int",
+)
+
+# Integer types and their sizes in bytes
+INT_TYPES: Final[MappingProxyType[str, int]] = MappingProxyType(
+    {"u8": 1, "i8": 1, "u16": 2, "i16": 2, "u32": 4, "i32": 4}
+)
+
+NUMERIC: Final = frozenset(("add", "sub", "mul", "div", "mod", "band", "bor", "bxor", "shl", "shr"))
+BOOLEAN: Final = frozenset(("lt", "gt", "le", "ge", "eq", "ne", "and", "or", "xor"))  # Result is a boolean
+UNARY: Final = frozenset(("neg", "abs", "bnot", "not"))
+BRANCHES: Final = frozenset(("jzero", "jnzero", "jgezero"))
+
+OPERATORS: Final[MappingProxyType[str, Callable[[int, int], int | bool]]] = MappingProxyType(
+    {
+        "add": operator.add,
+        "sub": operator.sub,
+        "mul": operator.mul,
+        "band": operator.and_,
+        "bor": operator.or_,
+        "bxor": operator.xor,
+        "shl": operator.lshift,
+        "shr": operator.rshift,  # Arithmetic shift for signed operands
+        "lt": operator.lt,
+        "gt": operator.gt,
+        "le": operator.le,
+        "ge": operator.ge,
+        "eq": operator.eq,
+        "ne": operator.ne,
+        "and": lambda a, b: a != 0 and b != 0,
+        "or": lambda a, b: a != 0 or b != 0,
+        "xor": lambda a, b: (a != 0) != (b != 0),
+    }
+)
+
+RE_INSTR = re.compile(
+    rf"^({'|'.join(sorted(NUMERIC | BOOLEAN | UNARY | BRANCHES | {'load', 'store'}))})({'|'.join(INT_TYPES)})$"
+)
+RE_TEMP = re.compile(r"^\*?t\d+$")
+RE_MEMORY = re.compile(r"^(_[\w.]+)(?: [+-] \d+)?$")  # A variable, or an offset from it
+
+
+def split(quad: Quad) -> tuple[str, str] | None:
+    """Returns the (operation, type) of the given quad, if it's an integer one (e.g. addu8 -> add, u8)"""
+    if (match := RE_INSTR.match(quad.instr)) is None:
+        return None
+
+    return match.group(1), match.group(2)
+
+
+def is_stack(arg: str) -> bool:
+    """Whether the operand is a temporary (popped from the stack), maybe pointing to memory (i.e. *t1)"""
+    return RE_TEMP.match(arg) is not None
+
+
+def is_memory(arg: str) -> bool:
+    """Whether the operand is a variable in memory (i.e. _a, or _a.__DATA__ + 2)"""
+    return RE_MEMORY.match(arg) is not None
+
+
+def base(arg: str) -> str:
+    """The variable an operand in memory belongs to (i.e. _a.__DATA__ for _a.__DATA__ + 2)"""
+    match = RE_MEMORY.match(arg)
+    assert match is not None
+    return match.group(1)
+
+
+def _is_operand(arg: str) -> bool:
+    """Whether the operand is one of the kinds understood: literals, labels, variables and temporaries"""
+    arg = arg.removeprefix("*")
+    return bool(arg) and (is_int(arg) or arg[0] in "_#" or is_stack(arg))
+
+
+def sources(quad: Quad) -> tuple[int, ...]:
+    """Indexes of the arguments read by the quad, in the order they're pushed.
+    Returns an empty tuple for opaque quads.
+    """
+    if quad.instr == ICInstruction.CAST:
+        return (3,) if quad.args[1] in (*INT_TYPES, "bool") and quad.args[2] in (*INT_TYPES, "bool") else ()
+
+    if (ops := split(quad)) is None:
+        return ()
+
+    op = ops[0]
+    if op in NUMERIC or op in BOOLEAN:
+        return 1, 2
+
+    if op == "store":
+        # Stores to an address in the stack (i.e. POKE) are left as they are
+        return (1,) if not is_stack(quad.args[0]) else ()
+
+    if op in BRANCHES:
+        return (0,)
+
+    return (1,)  # load and unary ones
+
+
+def is_pure(quad: Quad) -> bool:
+    """Whether the quad is understood by the optimizer (the only side effect allowed is a store)"""
+    return bool(indexes := sources(quad)) and all(_is_operand(quad.args[i]) for i in indexes)
+
+
+def result_type(quad: Quad) -> str | None:
+    """The type of the value computed (pushed) by the quad, if any"""
+    if quad.instr == ICInstruction.CAST:
+        return "u8" if quad.args[2] == "bool" else quad.args[2]
+
+    op, type_ = split(quad) or ("", "")
+    if op in BRANCHES or op == "store":
+        return None
+
+    return "u8" if is_boolean(quad) else type_
+
+
+def operand_type(quad: Quad, index: int) -> str:
+    """Type of the given argument of a quad"""
+    if quad.instr == ICInstruction.CAST:
+        return "u8" if quad.args[1] == "bool" else quad.args[1]
+
+    op, type_ = split(quad) or ("", "")
+    if op in ("shl", "shr") and index == 2:
+        return "u8"
+
+    return type_
+
+
+def is_boolean(quad: Quad) -> bool:
+    """Whether the result is a boolean (0 for False, anything else for True)"""
+    op = (split(quad) or ("", ""))[0]
+    return op in BOOLEAN or op == "not"
+
+
+def takes_boolean(quad: Quad) -> bool:
+    """Whether the quad only checks its operands for being 0 (False) or not (True)"""
+    if quad.instr == ICInstruction.CAST:
+        return quad.args[1] == "bool"
+
+    op, type_ = split(quad) or ("", "")
+    return op in ("and", "or", "xor", "not") or op in ("jzero", "jnzero") and INT_TYPES[type_] == 1
+
+
+def to_int(value: int, type_: str) -> int:
+    """Returns the value truncated to the given type (i.e. 255 for -1 as u8, -1 for 255 as i8)"""
+    bits = 8 * INT_TYPES[type_]
+    value &= (1 << bits) - 1
+    if type_[0] == "i" and value >> (bits - 1):
+        value -= 1 << bits
+
+    return value
+
+
+def literal(value: int, type_: str) -> str:
+    """The operand for the given value of the given type"""
+    return str(to_int(value, type_))
+
+
+def fold(quad: Quad) -> int | None:
+    """Computes the result of the quad if its operands are literals, or None if not possible"""
+    indexes = sources(quad)
+    if not indexes or not all(is_int(quad.args[i]) for i in indexes) or (type_ := result_type(quad)) is None:
+        return None
+
+    if quad.instr == ICInstruction.CAST:
+        value = int(quad.args[3])
+        return to_int(value != 0 if quad.args[1] == "bool" else to_int(value, quad.args[1]), type_)
+
+    op, op_type = split(quad) or ("", "")
+    if op == "load":  # Already a literal
+        return None
+
+    a, *b = (to_int(int(quad.args[i]), operand_type(quad, i)) for i in indexes)
+
+    if op in UNARY:
+        result = {"neg": -a, "abs": abs(a), "bnot": ~a, "not": a == 0}[op]
+    elif op in ("div", "mod"):
+        if b[0] == 0 or op_type[0] == "i":  # Signed division is not folded
+            return None
+        result = a // b[0] if op == "div" else a % b[0]
+    else:
+        result = OPERATORS[op](a, b[0])
+
+    return to_int(result, type_)
+
+
+def _literal_arg(quad: Quad) -> tuple[int, int] | None:
+    """For binary operations with one literal operand, returns (index of the other operand, literal value)"""
+    indexes = sources(quad)
+    if len(indexes) != 2:
+        return None
+
+    for i, j in (indexes, indexes[::-1]):
+        if is_int(quad.args[j]) and not is_int(quad.args[i]):
+            return i, to_int(int(quad.args[j]), operand_type(quad, j))
+
+    return None
+
+
+def identity(quad: Quad) -> int | None:
+    """If the result of the quad is one of its operands (i.e. X + 0), returns its index"""
+    if quad.instr == ICInstruction.CAST:
+        from_, to = quad.args[1:3]
+        if from_ in INT_TYPES and (to == "bool" and INT_TYPES[from_] == 1 or INT_TYPES.get(to) == INT_TYPES[from_]):
+            return 3
+        return None
+
+    if (other := _literal_arg(quad)) is None:
+        return None
+
+    i, value = other
+    op, type_ = split(quad) or ("", "")
+    mask = (1 << 8 * INT_TYPES[type_]) - 1
+    first = i == 1  # Non-commutative operations only have an identity as 2nd operand
+    if (
+        op in ("add", "bor", "bxor")
+        and value == 0
+        or op == "mul"
+        and value == 1
+        or op == "band"
+        and value & mask == mask
+        or op == "or"
+        and value == 0
+        and mask == 0xFF  # Booleans are bytes
+        or op == "and"
+        and value != 0
+        and mask == 0xFF
+        or op in ("sub", "shl", "shr")
+        and first
+        and value == 0
+        or op == "div"
+        and first
+        and value == 1
+    ):
+        return i
+
+    return None
+
+
+def absorbing(quad: Quad) -> int | None:
+    """If the result of the quad does not depend on its non-literal operand (i.e. X * 0), returns it"""
+    if (other := _literal_arg(quad)) is None:
+        return None
+
+    value = other[1]
+    op = (split(quad) or ("", ""))[0]
+    if op in ("mul", "band", "and") and value == 0:
+        return 0
+
+    if op == "or" and value != 0:
+        return 1
+
+    return None
@@ -9,15 +9,16 @@ from __future__ import annotations
 
 import re
 from collections import defaultdict
+from collections.abc import Iterable
 
 from src.api.config import OPTIONS
 from src.api.options import Action
 from src.api.tmp_labels import TMP_LABELS
 from src.arch.interface.backend import BackendInterface
-from src.arch.z80.optimizer.asm import Asm
+from src.arch.z80.optimizer.asm import Asm, clear_decoded
 from src.arch.z80.peephole import engine
 
-from . import common
+from . import common, icopt, regalloc
 
 # 8 bit bitwise operations
 # 8 bit shift operations
@@ -450,6 +451,15 @@ class Backend(BackendInterface):
             ICInstruction.ASTOREF: ICInfo(2, _astoref),
             ICInstruction.ASTORESTR: ICInfo(2, _astorestr),
             # ARRAY STORE STR1 <-- STR2 : Store string: Reallocs STR1 and then copies STR2 into STR1
+            # ARRAY ELEMENT STORE t, X -> Stores X at the element address t (computed inline, after X)
+            ICInstruction.ISTOREI8: ICInfo(2, _astore8),
+            ICInstruction.ISTOREU8: ICInfo(2, _astore8),
+            ICInstruction.ISTOREI16: ICInfo(2, _astore16),
+            ICInstruction.ISTOREU16: ICInfo(2, _astore16),
+            ICInstruction.ISTOREI32: ICInfo(2, _astore32),
+            ICInstruction.ISTOREU32: ICInfo(2, _astore32),
+            ICInstruction.ISTOREF16: ICInfo(2, _astoref16),
+            ICInstruction.ISTOREF: ICInfo(2, _astoref),
             ICInstruction.LOADI8: ICInfo(
                 2, Bits8.load8
             ),  # LOAD X, nnnn  -> Load memory content at nnnn into X (X must be a temporal)
@@ -614,6 +624,7 @@ class Backend(BackendInterface):
         """Initializes this module"""
 
         common.init()
+        clear_decoded()
         self.MEMORY.clear()
         self._set_quad_table()
 
@@ -754,7 +765,7 @@ class Backend(BackendInterface):
             return
 
         # Optimization patterns: at this point no more than -O2
-        patterns = [x for x in engine.PATTERNS if x.level <= min(OPTIONS.optimization_level, 2)]
+        patterns = engine.get_patterns(None, min(OPTIONS.optimization_level, 2))
 
         idx = max(0, base_index - engine.MAXLEN)
         while idx < len(output):
@@ -763,16 +774,31 @@ class Backend(BackendInterface):
             else:
                 idx = max(0, idx - engine.MAXLEN)
 
-    def emit(self, *, optimize: bool = True) -> list[str]:
+    @classmethod
+    def _peephole(cls, code: list[str]) -> list[str]:
+        """Returns the given code optimized by the peephole (as emit() does)"""
+        output: list[str] = []
+        cls._output_join(output, code, optimize=True)
+        return output
+
+    def emit(self, *, optimize: bool = True, variables: Iterable[str] = ()) -> list[str]:
         """Begin converting each quad instruction to asm
         by iterating over the "mem" array, and called its
         associated function. Each function returns an array of
         ASM instructions which will be appended to the
-        'output' array
+        'output' array.
+        variables are the (global) variables declared apart, with their own memory.
         """
         output: list[str] = []
-        for quad in self.MEMORY:
-            self._output_join(output, self._QUAD_TABLE[quad.instr].func(quad), optimize=optimize)
+        if optimize and OPTIONS.optimization_level > 2:
+            self.MEMORY[:] = icopt.optimize(self.MEMORY, variables)
+
+        chunks = [self._QUAD_TABLE[quad.instr].func(quad) for quad in self.MEMORY]
+        if optimize and OPTIONS.optimization_level > 1:
+            regalloc.allocate(self.MEMORY, chunks, self._peephole)
+
+        for chunk in chunks:
+            self._output_join(output, chunk, optimize=optimize)
 
         if optimize and OPTIONS.optimization_level > 1:
             self.remove_unused_labels(output)
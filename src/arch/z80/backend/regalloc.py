@@ -0,0 +1,284 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Register allocation of expression temporaries (-O2 and above).
+
+Every quad leaves its result (a temporary, tN) on the stack, and the quad using it pops it later.
+The peephole removes a PUSH immediately followed by its POP, but not when other values are pushed
+and popped in between (i.e. the first operand of a binary operation, while the second one is computed).
+These are the only temporaries left on the stack by the peephole, so they are the ones allocated here.
+Such temporaries, if used once and BC is not used by the code in between, are kept in BC instead:
+the PUSH becomes LD B, r (and LD C, r), and the POP is removed, using B (and C) instead of the registers
+popped, or copying them back when that's not possible.
+The peephole is run once on the code from the PUSH to the POP, to skip the candidates whose PUSH and POP
+it removes anyway. Every other one is checked by running the peephole on the code of both quads (the one
+pushing the temporary and the one popping it), both ways, and only kept if it's faster (or as fast and smaller).
+The code in between does not change, and the unchanged code of each quad is optimized only once.
+"""
+
+import re
+from collections import defaultdict
+from collections.abc import Callable, Sequence
+
+from src.arch.z80.optimizer.helpers import is_register
+from src.arch.z80.optimizer.memcell import MemCell
+from src.arch.z80.peephole import stats
+from src.zxbasm.z80 import Z80SET
+
+from .quad import Quad
+
+__all__ = ("allocate",)
+
+RE_TEMP = re.compile(r"^\*?(t\d+)$")
+
+# Register pair -> (high, low) registers. There's no LD C, F, so the low part of AF (the flags) is not kept
+PAIRS: dict[str, tuple[str, str | None]] = {
+    "af": ("a", None),
+    "bc": ("b", "c"),
+    "de": ("d", "e"),
+    "hl": ("h", "l"),
+}
+
+# Integer operations whose operands can be swapped
+COMMUTATIVE = frozenset(
+    f"{op}{type_}"
+    for op in ("add", "mul", "band", "bor", "bxor", "eq", "ne", "and", "or", "xor")
+    for type_ in ("u8", "i8", "u16", "i16")
+)
+
+# Instructions leaving the code of the quad (registers might be used after them)
+BRANCHES = frozenset(("call", "djnz", "jp", "jr", "ret", "reti", "retn", "rst"))
+
+
+def _temp_uses(quads: Sequence[Quad]) -> dict[str, list[tuple[int, int]]]:
+    """Returns the (quad, argument) positions of every temporary, in order"""
+    result: dict[str, list[tuple[int, int]]] = defaultdict(list)
+    for i, quad in enumerate(quads):
+        for j, arg in enumerate(quad.args):
+            if (match := RE_TEMP.match(arg)) is not None:
+                result[match.group(1)].append((i, j))
+
+    return result
+
+
+def _stack_op(line: str) -> tuple[str, str] | None:
+    """Returns ("push" | "pop", register pair) if the line is a PUSH or a POP of a register pair"""
+    parts = line.split()
+    if len(parts) == 2 and parts[0] in ("push", "pop") and parts[1] in PAIRS:
+        return parts[0], parts[1]
+
+    return None
+
+
+def _pushes(chunk: Sequence[str]) -> int:
+    """Number of words pushed at the end of the code (its result)"""
+    result = 0
+    for line in reversed(chunk):
+        if (op := _stack_op(line)) is None or op[0] != "push":
+            break
+        result += 1
+
+    return result
+
+
+def _pops(chunk: Sequence[str]) -> int:
+    """Number of words popped at the beginning of the code (its operands)"""
+    result = 0
+    for line in chunk:
+        if (op := _stack_op(line)) is None or op[0] != "pop":
+            break
+        result += 1
+
+    return result
+
+
+def _cell(line: str) -> MemCell | None:
+    """Returns the instruction in the line, or None if it's not a single one (a label, a comment, etc.)"""
+    line = line.strip()
+    if not line or line[0] in "#;" or line[-1] == ":" or "\n" in line:
+        return None
+
+    return MemCell(line, 0)
+
+
+def _keeps_bc(lines: Sequence[str]) -> bool:
+    """Whether the code neither uses BC nor jumps, nor uses SP (other than PUSH / POP)"""
+    for line in lines:
+        cell = _cell(line)
+        if cell is None or cell.inst in BRANCHES or {"b", "c"} & (cell.destroys | cell.requires):
+            return False
+        if {"sp", "(sp)"} & set(cell.opers) and _stack_op(line) is None:
+            return False
+
+    return True
+
+
+def _depth(lines: Sequence[str]) -> int | None:
+    """Number of words left on the stack by the code, or None if it pops more than it pushes"""
+    result = 0
+    for line in lines:
+        if (op := _stack_op(line)) is not None:
+            result += 1 if op[0] == "push" else -1
+            if result < 0:
+                return None
+
+    return result
+
+
+def _ignores_flags(lines: Sequence[str]) -> bool:
+    """Whether the code sets the flags before reading them (so POP AF needs not restore them)"""
+    for line in lines:
+        cell = _cell(line)
+        if cell is None or cell.inst in BRANCHES or "f" in cell.requires:
+            return False
+        if "f" in cell.destroys:
+            return True
+
+    return True
+
+
+def _rename(line: str, regs: dict[str, str]) -> str | None:
+    """Returns the instruction with its register operands renamed, or None if there's no such instruction.
+    Only instructions whose operands are all registers (or a register pair pointing to memory) are renamed.
+    """
+    inst, _, opers = line.strip().partition(" ")
+    renamed = []
+    for oper in (x.strip() for x in opers.split(",")) if opers else ():
+        indirect = oper[:1] == "(" and oper[-1:] == ")"
+        reg = oper[1:-1] if indirect else oper
+        if not is_register(reg):
+            return None
+        reg = regs.get(reg, reg)
+        renamed.append(f"({reg})" if indirect else reg)
+
+    if f"{inst} {','.join(renamed)}".upper() not in Z80SET:
+        return None
+
+    return f"{inst} {', '.join(renamed)}"
+
+
+def _use_bc(lines: Sequence[str], pair: str) -> list[str] | None:
+    """Returns the code following the POP of the given register pair, using BC instead of it.
+    Returns None if that's not possible (i.e. an instruction not available for BC)
+    """
+    hi, lo = PAIRS[pair]
+    if lo is None:
+        return None  # A is the accumulator: instructions using it can't use B instead
+
+    regs = {pair: "bc", hi: "b", lo: "c"}
+    result = list(lines)
+    for i, line in enumerate(lines):
+        cell = _cell(line)
+        if cell is None or cell.inst in BRANCHES or {"b", "c"} & (cell.destroys | cell.requires):
+            return None
+
+        if {hi, lo} & cell.requires:
+            if (renamed := _rename(line, regs)) is None:
+                return None
+            result[i] = renamed
+        elif {hi, lo} & cell.destroys:  # The value popped is not used anymore
+            return result if {hi, lo} <= cell.destroys else None
+
+    return result
+
+
+def _pop_index(code: Sequence[str], count: int) -> int | None:
+    """Returns the index of the POP after the given count of them, at the beginning of the code (before any PUSH)"""
+    for i, line in enumerate(code):
+        if (op := _stack_op(line)) is None:
+            continue
+        if op[0] != "pop":
+            break
+        if not count:
+            return i
+        count -= 1
+
+    return None
+
+
+def _keep_in_bc(
+    defined: list[str], used: list[str], index: int, commutative: bool
+) -> tuple[list[str], list[str]] | None:
+    """Given the code defining a temporary and the code using it (popping it at the given index),
+    returns both changed to keep it in BC instead, or None if not possible
+    """
+    hi, lo = PAIRS[defined[-1].split()[1]]  # Both lines are a PUSH and a POP (see _stack_op)
+    popped = used[index].split()[1]
+    rest = used[index + 1 :]
+
+    if lo is None:  # 8 bit value (in A): copied to B, and back to the high register popped
+        if popped == "af" and not _ignores_flags(rest):
+            return None
+        return [*defined[:-1], f"ld b, {hi}"], [*used[:index], f"ld {PAIRS[popped][0]}, b", *rest]
+
+    # Operands of commutative operations can be swapped: the one popped into DE is popped into HL instead
+    swap = commutative and popped == "hl" and index > 0 and used[index - 1] == "pop de"
+    if (renamed := _use_bc(rest, popped)) is not None:
+        used = [*used[:index], *renamed]
+    elif swap and (renamed := _use_bc(rest, "de")) is not None:
+        used = [*used[: index - 1], "pop hl", *renamed]
+    elif swap:
+        used = [*used[: index - 1], "pop hl", "ld d, b", "ld e, c", *rest]
+    else:
+        used = [*used[:index], f"ld {PAIRS[popped][0]}, b", f"ld {PAIRS[popped][1]}, c", *rest]
+
+    return [*defined[:-1], f"ld b, {hi}", f"ld c, {lo}"], used
+
+
+def allocate(quads: Sequence[Quad], chunks: list[list[str]], optimize: Callable[[list[str]], list[str]]) -> None:
+    """Given the quads and the code emitted for each one of them, changes the code to
+    keep in BC the temporaries which can be held there. The given optimize function
+    (the peephole) tells whether that's better: only then it's done.
+    """
+    uses = _temp_uses(quads)
+    busy_until = -1  # BC holds a temporary until this quad
+    costs: dict[int, tuple[int, int]] = {}  # Cost of the (optimized) code of each quad
+
+    def optimized(code: list[str]) -> list[str]:
+        with stats.paused():  # The code tried here is discarded
+            return optimize(code)
+
+    for temp, positions in uses.items():
+        if len(positions) != 2:
+            continue
+
+        (i, arg_i), (j, _) = positions
+        if arg_i != 0 or i == j or i < busy_until or quads[i].args[0] != temp:
+            continue
+
+        if _pushes(chunks[i]) != 1:
+            continue  # Not pushed, or several words (i.e. 32 bits or float)
+
+        # Words pushed after this one (i.e. the 2nd operand) are popped before it
+        middle = [line for chunk in chunks[i + 1 : j] for line in chunk]
+        if (above := _depth(middle)) is None or (index := _pop_index(chunks[j], above)) is None:
+            continue
+
+        between = middle + chunks[j][:index]
+        if not any(_stack_op(x) for x in between) or not _keeps_bc(between):
+            continue  # The peephole already removes a PUSH followed by its POP
+
+        if (result := _keep_in_bc(chunks[i], chunks[j], index, quads[j].instr in COMMUTATIVE)) is None:
+            continue
+
+        # Same, once the peephole removes the words pushed in between (only the operands and the result are left)
+        code = optimized([*chunks[i], *middle, *chunks[j]])
+        if not any(_stack_op(x) for x in code[_pops(code) : len(code) - _pushes(code)]):
+            continue
+
+        for k in i, j:
+            if k not in costs:
+                costs[k] = stats.cost(optimized(chunks[k]))
+
+        after_i, after_j = stats.cost(optimized(result[0])), stats.cost(optimized(result[1]))
+        before = [x + y for x, y in zip(costs[i], costs[j])]
+        after = [x + y for x, y in zip(after_i, after_j)]
+
+        if (after[1], after[0]) < (before[1], before[0]):  # Fewer T-states, or bytes
+            chunks[i], chunks[j] = result
+            costs[i], costs[j] = after_i, after_j
+            busy_until = j
@@ -7,15 +7,81 @@
 
 import re
 from functools import lru_cache
+from typing import NamedTuple
 
 from src.zxbasm import z80
 
-from .helpers import single_registers
+from .helpers import is_register, single_registers
 from .patterns import RE_INDIR16, RE_OUTC
 
 # Dict of patterns to normalized instructions. I.e. 'ld a, 5' -> 'LD A,N'
 Z80_PATTERN: dict[re.Pattern, z80.Opcode] = {}
 
+# Same patterns as above, bucketed by (uppercase) mnemonic and keeping Z80_PATTERN order.
+# I.e. 'LD' -> [(re('LD A,(BC)'), Opcode(...)), ..., (re('LD A,.+'), Opcode(...)), ...]
+Z80_PATTERN_INDEX: dict[str, list[tuple[re.Pattern, z80.Opcode]]] = {}
+
+# Mnemonics having numeric literals in some of their patterns (i.e. 'BIT 0,A', 'IM 1').
+# Numbers in their operands cannot be normalized.
+LITERAL_NUMBER_MNEMONICS: set[str] = set()
+
+# Operand literals that can only be matched by an N / NN wildcard in a pattern:
+# numbers, labels starting with '_' or '.', and '$' expressions. I.e. 'ld a, (_x + 1)' -> 'ld a, (N + N)'
+RE_LITERAL = re.compile(r"(?<![\w.$])(?:[_.$][\w.]*|(?P<num>\d\w*))")
+RE_MNEMONIC = re.compile(r"[ \t]*([^ \t]*)")
+
+
+class DecodedAsm(NamedTuple):
+    """An asm instruction already decoded (see decode())"""
+
+    asm: str  # Normalized asm text. I.e. 'ld a, (hl)'
+    inst: str  # Mnemonic (or label). I.e. 'ld'
+    oper: tuple[str, ...]  # Operands (see Asm.opers())
+    regs_oper: tuple[str, ...]  # Same operands, but registers in lowercase
+    cond: str | None  # Condition flag (see Asm.condition())
+    output: tuple[str, ...]  # Registers where the result is stored (see Asm.result())
+    is_label: bool
+
+
+# Decoded instructions, by asm text (either as given or normalized)
+_DECODED: dict[str, DecodedAsm] = {}
+
+
+def decode(asm: str) -> DecodedAsm:
+    """Decodes the given asm instruction. Every different instruction text is decoded
+    only once, and the result is shared, so it must not be modified.
+    """
+    result = _DECODED.get(asm)
+    if result is not None:
+        return result
+
+    stripped = asm.strip()
+    assert stripped, f"Empty instruction '{asm}'"
+    result = _DECODED.get(stripped)
+
+    if result is None:
+        inst = Asm.instruction(stripped)
+        oper = tuple(Asm.opers(stripped))
+        result = DecodedAsm(
+            asm="{} {}".format(inst, " ".join(stripped.split(" ", 1)[1:])).strip(),
+            inst=inst,
+            oper=oper,
+            regs_oper=tuple(x.lower() if is_register(x) else x for x in oper),
+            cond=Asm.condition(stripped),
+            output=Asm.result(stripped),
+            is_label=inst[-1] == ":",
+        )
+        result = _DECODED.setdefault(result.asm, result)  # Interned by normalized text
+        _DECODED[stripped] = result
+
+    _DECODED[asm] = result
+    return result
+
+
+def clear_decoded() -> None:
+    """Forgets the instructions decoded so far, so they don't pile up across compilations"""
+    _DECODED.clear()
+
 
 class Asm:
     """Defines an asm instruction"""
@@ -23,29 +89,55 @@ class Asm:
     __slots__ = "_bytes", "_max_tstates", "asm", "cond", "inst", "is_label", "oper", "output"
 
     _operands_cache: dict[str, list[str]] = {}
+    _opcode_cache: dict[str, z80.Opcode | None] = {}
 
     def __init__(self, asm: str):
-        asm = asm.strip()
-        assert asm, f"Empty instruction '{asm}'"
-        self.inst = Asm.instruction(asm)
-        self.oper = Asm.opers(asm)
-        self.asm = "{} {}".format(self.inst, " ".join(asm.split(" ", 1)[1:])).strip()
-        self.cond = Asm.condition(asm)
-        self.output = Asm.result(asm)
+        decoded = decode(asm)
+        self.inst = decoded.inst
+        self.oper = list(decoded.oper)
+        self.asm = decoded.asm
+        self.cond = decoded.cond
+        self.output = decoded.output
         self._bytes: tuple[str] | None = None
         self._max_tstates = None
-        self.is_label = self.inst[-1] == ":"
+        self.is_label = decoded.is_label
 
     def _compute_bytes(self):
-        for patt, opcode_data in Z80_PATTERN.items():
-            if patt.match(self.asm):
-                self._bytes = tuple(opcode_data.opcode.split())
-                self._max_tstates = opcode_data.T
-                return
+        opcode_data = Asm.opcode(self.asm)
+        if opcode_data is not None:
+            self._bytes = tuple(opcode_data.opcode.split())
+            self._max_tstates = opcode_data.T
+            return
 
         self._bytes = ()
         self._max_tstates = 0
 
+    @staticmethod
+    def opcode(asm: str) -> z80.Opcode | None:
+        """Returns the Opcode entry matching the given asm instruction, or None
+        if it's unknown. This is the same as trying every pattern in Z80_PATTERN
+        in order, but only the ones sharing the same mnemonic are tried, and results
+        are cached by normalized instruction (literals replaced by N).
+        """
+        mnemonic = RE_MNEMONIC.match(asm).group(1).upper()
+        candidates = Z80_PATTERN_INDEX.get(mnemonic)
+        if candidates is None:
+            return None
+
+        if mnemonic in LITERAL_NUMBER_MNEMONICS:
+            key = RE_LITERAL.sub(lambda m: m.group() if m.group("num") else "N", asm)
+        else:
+            key = RE_LITERAL.sub("N", asm)
+
+        try:
+            return Asm._opcode_cache[key]
+        except KeyError:
+            pass
+
+        result = next((opcode_data for patt, opcode_data in candidates if patt.match(key)), None)
+        Asm._opcode_cache[key] = result
+        return result
+
     @property
     def bytes(self) -> tuple[str]:
         """Returns the assembled bytes as a list of hexadecimal ones.
@@ -237,5 +329,14 @@ def init():
     Z80_PATTERN[re.compile(make_patt("DEFB NN"), flags=re.IGNORECASE)] = z80.Opcode("DEFB NN", 0, 1, "XX")
     Z80_PATTERN[re.compile(make_patt("DEFW NNNN"), flags=re.IGNORECASE)] = z80.Opcode("DEFW NNNN", 0, 2, "XX XX")
 
+    Z80_PATTERN_INDEX.clear()
+    LITERAL_NUMBER_MNEMONICS.clear()
+    Asm._opcode_cache.clear()
+    for patt, opcode_data in Z80_PATTERN.items():
+        mnemonic = opcode_data.asm.split(" ", 1)[0].upper()
+        Z80_PATTERN_INDEX.setdefault(mnemonic, []).append((patt, opcode_data))
+        if any(c.isdigit() for c in opcode_data.asm):
+            LITERAL_NUMBER_MNEMONICS.add(mnemonic)
+
 
 init()
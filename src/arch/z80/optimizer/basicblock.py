@@ -13,21 +13,25 @@ from typing import TYPE_CHECKING, Final
 from src.api import errmsg
 from src.api.config import OPTIONS
 from src.api.debug import __DEBUG__
-from src.api.utils import flatten_list, sfirst
+from src.api.utils import sfirst
 from src.arch.z80.backend.common import ASMS
-from src.arch.z80.peephole import evaluator
-from src.arch.z80.peephole.engine import OptPattern
+from src.arch.z80.peephole import engine, evaluator, stats
+from src.arch.z80.peephole.engine import OptPattern, PatternIndex
 from src.arch.z80.peephole.evaluator import FN
 
 from .cpustate import CPUState
 from .helpers import (
     ALL_REGS,
+    REG_BITS,
     dict_intersection,
     idx_args,
     is_16bit_oper_register,
+    mask_regs,
     new_tmp_val,
+    regs_mask,
     simplify_asm_args,
     single_registers,
+    single_registers_mask,
 )
 from .labelinfo import LabelInfo
 from .labels_dict import LabelsDict
@@ -39,6 +43,9 @@ if TYPE_CHECKING:
 
 __all__ = "BasicBlock", "DummyBasicBlock"
 
+# Registers reported by BasicBlock.requires() and destroys() (i.e. not r, nor the alternate a' and f')
+BLOCK_REGS_MASK: Final[int] = regs_mask(["a", "b", "c", "d", "e", "f", "h", "l", "i", "ixh", "ixl", "iyh", "iyl", "sp"])
+
 
 class BasicBlock(Sequence[MemCell]):
     """A Class describing a basic block"""
@@ -46,6 +53,8 @@ class BasicBlock(Sequence[MemCell]):
     __UNIQUE_ID = 0
     clean_asm_args = False
 
+    _MEMCELL_TYPE: type[MemCell] = MemCell
+
     def __new__(cls, *args, **kwargs):
         cls.__UNIQUE_ID += 1
         return super().__new__(cls)
@@ -56,7 +65,6 @@ class BasicBlock(Sequence[MemCell]):
         self.mem: list[MemCell] = []
         self.next: BasicBlock | None = None  # Which (if any) basic block follows this one in memory
         self.prev: BasicBlock | None = None  # Which (if any) basic block precedes to this one in the code
-        self.lock = False  # True if this block is being accessed by other subroutine
         self.comes_from: set[BasicBlock] = set()  # A list/tuple containing possible jumps to this block
         self.goes_to: set[BasicBlock] = set()  # A list/tuple of possible block to jump from here
         self.modified = False  # True if something has been changed during optimization
@@ -90,6 +98,7 @@ class BasicBlock(Sequence[MemCell]):
         self._bytes = None
         self._sizeof = None
         self._max_tstates = None
+        self.optimizer.liveness.update(self)
 
     def __iter__(self) -> Iterator[MemCell]:
         for mem in self.mem:
@@ -107,7 +116,9 @@ class BasicBlock(Sequence[MemCell]):
         self._bytes = None
         self._sizeof = None
         self._max_tstates = None
-        return self.mem.pop(i)
+        result = self.mem.pop(i)
+        self.optimizer.liveness.update(self)
+        return result
 
     @property
     def code(self) -> list[str]:
@@ -121,14 +132,33 @@ class BasicBlock(Sequence[MemCell]):
         assert isinstance(value, Iterable)
         mems = tuple(value)
         assert all(isinstance(x, str) for x in mems)
+        self.mem = [self._new_memcell(asm, i) for i, asm in enumerate(mems)]
+
+        self._bytes = None
+        self._sizeof = None
+        self._max_tstates = None
+        self.optimizer.liveness.update(self)
+
+    def _new_memcell(self, asm: str, addr: int) -> MemCell:
         if self.clean_asm_args:
-            self.mem = [MemCell(simplify_asm_args(asm), i) for i, asm in enumerate(mems)]
-        else:
-            self.mem = [MemCell(asm, i) for i, asm in enumerate(mems)]
+            asm = simplify_asm_args(asm)
+
+        return self._MEMCELL_TYPE(asm, addr)
+
+    def _patch_code(self, i: int, length: int, value: Iterable[str]) -> None:
+        """Replaces the code in [i, i + length) with the given one, creating
+        new MemCells only for the replaced instructions.
+        """
+        mems = [self._new_memcell(asm, i + j) for j, asm in enumerate(value)]
+        self.mem[i : i + length] = mems
+        if len(mems) != length:
+            for j in range(i + len(mems), len(self.mem)):
+                self.mem[j].addr = j
 
         self._bytes = None
         self._sizeof = None
         self._max_tstates = None
+        self.optimizer.liveness.update(self)
 
     @property
     def bytes(self):
@@ -194,6 +224,7 @@ class BasicBlock(Sequence[MemCell]):
 
         self.comes_from.remove(basic_block)
         basic_block.goes_to.remove(self)
+        self.optimizer.liveness.reset()
 
     def delete_goes_to(self, basic_block: BasicBlock | None) -> None:
         """Removes the basic_block ptr from the list for "goes_to"
@@ -207,6 +238,7 @@ class BasicBlock(Sequence[MemCell]):
 
         self.goes_to.remove(basic_block)
         basic_block.comes_from.remove(self)
+        self.optimizer.liveness.reset()
 
     def add_comes_from(self, basic_block: BasicBlock | None) -> None:
         """This simulates a set. Adds the basic_block to the comes_from
@@ -221,6 +253,7 @@ class BasicBlock(Sequence[MemCell]):
 
         self.comes_from.add(basic_block)
         basic_block.goes_to.add(self)
+        self.optimizer.liveness.reset()
 
     def add_goes_to(self, basic_block: BasicBlock | None) -> None:
         """This simulates a set. Adds the basic_block to the goes_to
@@ -234,6 +267,7 @@ class BasicBlock(Sequence[MemCell]):
 
         self.goes_to.add(basic_block)
         basic_block.comes_from.add(self)
+        self.optimizer.liveness.reset()
 
     def update_next_block(self) -> None:
         """If the last instruction of this block is a JP, JR or RET (with no
@@ -270,9 +304,13 @@ class BasicBlock(Sequence[MemCell]):
         """Checks whether any of the given regs are required from the given point
         to the end or not.
         """
-        if self.lock:
-            return True
+        return self._is_used(regs, i, top)[0]
 
+    def _is_used(self, regs: Sequence[str], i: int, top: int | None = None) -> tuple[bool, int]:
+        """Like is_used(), but also returns the position of the last instruction
+        examined to get the result (or len(self) if the result depends on the
+        end of the block or on the blocks it goes to).
+        """
         i = max(i, 0)
         top = len(self) if top is None else top + 1
 
@@ -281,102 +319,92 @@ class BasicBlock(Sequence[MemCell]):
             ix = single_registers(idx_args(regs[0][1:-1])[0]) if idx_args(regs[0][1:-1]) else []  # type: ignore
 
             rr = set(r16 + ix)
+            r16_mask = regs_mask(r16)
             mem_vars = set([] if rr else RE_ID_OR_NUMBER.findall(regs[0]))
 
-            for mem in self[i:top]:  # For memory accesses only mark as NOT used if it's overwritten
+            # For memory accesses only mark as NOT used if it's overwritten
+            for ii, mem in enumerate(self[i:top], start=i):
                 if mem.inst == "ld" and mem.opers[0] == regs[0]:
-                    return False
+                    return False, ii
 
                 # And, Or, Xor uses both operands
                 if mem.inst in {"and", "or", "xor"} and mem.opers[0] == regs[0]:
-                    return True
+                    return True, ii
 
                 if mem.opers and mem.opers[-1] == regs[0]:
-                    return True
+                    return True, ii
 
-                if rr and any(_ in r16 for _ in mem.destroys):  # (hl) :: inc hl / (ix + n) :: inc ix
-                    return True
+                if rr and mem.destroys_mask & r16_mask:  # (hl) :: inc hl / (ix + n) :: inc ix
+                    return True, ii
 
                 if mem.opers and mem_vars.intersection(RE_ID_OR_NUMBER.findall(mem.opers[-1])):
-                    return True
+                    return True, ii
 
-            return True
+            return True, top
 
-        regs = flatten_list([single_registers(x) for x in regs])  # make a copy
+        pending = single_registers_mask(regs)  # Registers not yet required nor overwritten
         for ii in range(i, top):
-            if any(r in regs for r in self.mem[ii].requires):
-                return True
+            mem = self.mem[ii]
+            if mem.requires_mask & pending:
+                return True, ii
 
-            for r in self.mem[ii].destroys:
-                if r in regs:
-                    regs.remove(r)
+            pending &= ~mem.destroys_mask
+            if not pending:
+                return False, ii
 
-            if not regs:
-                return False
+        return self.goes_requires(pending), len(self)
 
-        self.lock = True
-        result = self.goes_requires(regs)
-        self.lock = False
-
-        return result
-
-    def requires(self, i: int = 0, end_: int | None = None) -> set[str]:
-        """Returns a list of registers and variables this block requires.
-        By default checks from the beginning (i = 0).
+    def requires_mask(self, i: int = 0, end_: int | None = None) -> int:
+        """Returns the register mask of the registers this block requires (i.e. reads
+        before overwriting them). By default checks from the beginning (i = 0).
         :param i: initial position of the block to examine
         :param end_: final position to examine
-        :returns: registers safe to write
         """
         i = max(i, 0)
-        end_ = len(self) if end_ is None or end_ > len(self) else end_
-        regs = {"a", "b", "c", "d", "e", "f", "h", "l", "i", "ixh", "ixl", "iyh", "iyl", "sp"}
-        result: set[str] = set()
+        written = 0
+        result = 0
+
+        for mem in self.mem[i:end_]:
+            result |= mem.requires_mask & ~written
+            written |= mem.destroys_mask
 
-        for ii in range(i, end_):
-            for r in self.mem[ii].requires:
-                r = r.lower()
-                if r in regs:
-                    result.add(r)
-                    regs.remove(r)
+        return result
 
-            for r in self.mem[ii].destroys:
-                r = r.lower()
-                if r in regs:
-                    regs.remove(r)
+    def destroys_mask(self, i: int = 0) -> int:
+        """Returns the register mask of the registers this block destroys.
+        By default checks from the beginning (i = 0).
+        """
+        result = 0
 
-            if not regs:
-                break
+        for mem in self.mem[i:]:
+            result |= mem.destroys_mask
 
         return result
 
+    def requires(self, i: int = 0, end_: int | None = None) -> set[str]:
+        """Returns a list of registers this block requires (see requires_mask())"""
+        return mask_regs(self.requires_mask(i, end_) & BLOCK_REGS_MASK)
+
     def destroys(self, i: int = 0) -> list[str]:
-        """Returns a list of registers this block destroys
+        """Returns a list of registers this block destroys, in the order they're first destroyed
         By default checks from the beginning (i = 0).
         """
-        regs = {"a", "b", "c", "d", "e", "f", "h", "l", "i", "ixh", "ixl", "iyh", "iyl", "sp"}
-        top = len(self)
+        pending = BLOCK_REGS_MASK
         result: list[str] = []
 
-        for ii in range(i, top):
-            for r in self.mem[ii].destroys:
-                if r in regs:
-                    result.append(r)
-                    regs.remove(r)
-
-            if not regs:
-                break
+        for mem in self.mem[i:]:
+            regs = mem.destroys_mask & pending
+            if regs:
+                result.extend(reg for reg, bit in REG_BITS.items() if regs & bit)
+                pending &= ~regs
 
         return result
 
-    def goes_requires(self, regs):
+    def goes_requires(self, regs: int) -> bool:
         """Returns whether any of the goes_to block requires any of
-        the given registers.
+        the registers in the given register mask (i.e. they're live at the end of this block).
         """
-        for block in self.goes_to:
-            if block.is_used(regs, 0):
-                return True
-
-        return False
+        return bool(self.optimizer.liveness.live_out(self) & regs)
 
     def get_first_non_label_instruction(self):
         """Returns the memcell of the given block, which is
@@ -431,9 +459,14 @@ class BasicBlock(Sequence[MemCell]):
         for asm_line in self.code:
             self.cpu.execute(asm_line)
 
-    def optimize(self, patterns_list):
+    def optimize(self, patterns_list: Iterable[OptPattern]):
         """Tries to detect peep-hole patterns in this basic block
         and remove them.
+
+        After a pattern is applied, matching resumes at the earliest position
+        whose result might have changed: MAXLEN instructions before the rewritten
+        one, or any earlier position where a pattern was discarded by an
+        IS_REQUIRED() check that looked at the rewritten code.
         """
         i: int
         p: OptPattern
@@ -441,9 +474,18 @@ class BasicBlock(Sequence[MemCell]):
         if self.optimized:
             return
 
-        changed = True
+        if not isinstance(patterns_list, PatternIndex):
+            patterns_list = PatternIndex(patterns_list)
+
         code = self.code
         old_unary = dict(evaluator.UNARY)
+        horizon = -1  # Last position examined by IS_REQUIRED() in the current condition
+
+        def is_required(x: str) -> bool:
+            nonlocal horizon
+            result, last = self._is_used([x], i + len(p.patt))
+            horizon = max(horizon, last)
+            return result
 
         # monkey-patches some functions in this optimizer level (> 2)
         evaluator.UNARY[FN.GVAL] = self.cpu.get
@@ -451,46 +493,58 @@ class BasicBlock(Sequence[MemCell]):
             "c": str(self.cpu.C) if self.cpu.C is not None else new_tmp_val(),
             "z": str(self.cpu.Z) if self.cpu.Z is not None else new_tmp_val(),
         }.get(x.lower(), new_tmp_val())
-        evaluator.UNARY[FN.IS_REQUIRED] = lambda x: self.is_used([x], i + len(p.patt))
+        evaluator.UNARY[FN.IS_REQUIRED] = is_required
 
         if OPTIONS.optimization_level > 3:
             regs, mems = self.guesses_initial_state_from_origin_blocks()
         else:
             regs, mems = {}, {}
 
-        while changed:
-            changed = False
-            self.cpu.reset(regs=regs, mems=mems)
-
-            for i, asm_line in enumerate(code):
-                for p in patterns_list:
-                    match = p.patt.match(code[i:])
-                    if match is None:  # HINT: {} is also a valid match
-                        continue
-
-                    for var, defline in p.defines:
-                        match[var] = defline.expr.eval(match)
-
-                    if not p.cond.eval(match):
-                        continue
-
-                    # all patterns matched successfully. Apply this rule
-                    new_code = list(code)
-                    matched = new_code[i : i + len(p.patt)]
-                    new_code[i : i + len(p.patt)] = p.template.filter(match)
-                    errmsg.info("pattern applied [{}:{}]".format("%03i" % p.flag, p.fname))
-                    __DEBUG__("matched: \n    {}".format("\n    ".join(matched)), level=1)
-                    changed = new_code != code
-                    if changed:
-                        code = new_code
-                        self.code = new_code
-                        break
+        self.cpu.reset(regs=regs, mems=mems)
+        step = max(engine.MAXLEN, 1)
+        checkpoints: list[CPUState] = []  # checkpoints[k] is the CPU state before executing code[k * step]
+        discarded: list[tuple[int, int]] = []  # (position, horizon) of patterns discarded by IS_REQUIRED()
+
+        i = 0
+        while i < len(code):
+            if i == len(checkpoints) * step:
+                checkpoints.append(self.cpu.snapshot())
 
+            changed = False
+            for p in patterns_list.candidates(code[i]):
+                horizon = -1
+                match = engine.match_pattern(p, code, i)
+                if match is None:  # HINT: {} is also a valid match
+                    if horizon >= 0:
+                        discarded.append((i, horizon))
+                    continue
+
+                # all patterns matched successfully. Apply this rule
+                matched = code[i : i + len(p.patt)]
+                applied = p.template.filter(match)
+                errmsg.info("pattern applied [{}:{}]".format("%03i" % p.flag, p.fname))
+                __DEBUG__("matched: \n    {}".format("\n    ".join(matched)), level=1)
+                changed = applied != matched
                 if changed:
-                    self.modified = True
+                    stats.record_application(p.fname, matched, applied)
+                    code[i : i + len(p.patt)] = applied
+                    self._patch_code(i, len(matched), applied)
                     break
 
+            if not changed:
+                self.cpu.execute(code[i])
+                i += 1
+                continue
+
+            self.modified = True
+            resume = max(0, i - engine.MAXLEN + 1)
+            resume = min([resume, *(pos for pos, last in discarded if last >= i)])
+            discarded = [x for x in discarded if x[0] < resume]
+            del checkpoints[resume // step + 1 :]
+            self.cpu.restore(checkpoints[-1])
+            for asm_line in code[(len(checkpoints) - 1) * step : resume]:
                 self.cpu.execute(asm_line)
+            i = resume
 
         evaluator.UNARY.update(old_unary)  # restore old copy
         self.optimized = True
@@ -503,15 +557,15 @@ class DummyBasicBlock(BasicBlock):
 
     def __init__(self, destroys: Iterable[str], requires: Iterable[str], optimizer: Optimizer) -> None:
         BasicBlock.__init__(self, [], optimizer)
-        self.__destroys = tuple(destroys)
-        self.__requires = set(requires)
+        self.__destroys = regs_mask(destroys)
+        self.__requires = regs_mask(requires)
         self.code = ["ret"]
 
-    def destroys(self, i: int = 0) -> list[str]:
-        return list(self.__destroys)
+    def destroys_mask(self, i: int = 0) -> int:
+        return self.__destroys
 
-    def requires(self, i: int = 0, end_=None) -> set[str]:
-        return set(self.__requires)
+    def requires_mask(self, i: int = 0, end_=None) -> int:
+        return self.__requires
 
     def is_used(self, regs: Iterable[str], i: int, top: int | None = None) -> bool:
-        return len([x for x in regs if x in self.__requires]) > 0
+        return bool(single_registers_mask(regs) & self.__requires)
@@ -5,6 +5,7 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
+import copy
 import re
 from collections import UserDict
 from collections.abc import Mapping
@@ -288,6 +289,23 @@ class CPUState:
 
         self.reset_flags()
 
+    def snapshot(self) -> CPUState:
+        """Returns a copy of the current state, that can be later
+        restored with restore()
+        """
+        result = copy.copy(self)
+        result.regs = dict(self.regs)
+        result.stack = list(self.stack)
+        result.mem = Memory()
+        result.mem.data = dict(self.mem.data)
+        result._flags = copy.copy(self._flags[0]), copy.copy(self._flags[1])
+        result.ix_ptr = set(self.ix_ptr)
+        return result
+
+    def restore(self, state: CPUState) -> None:
+        """Sets this CPU state to the given snapshot (which is left untouched)"""
+        self.__dict__.update(state.snapshot().__dict__)
+
     def reset_flags(self) -> None:
         """Resets flags to an "unknown state" """
         self.C = None
@@ -644,16 +662,12 @@ class CPUState:
         """Tries to update the registers values with the given
         asm line.
         """
-        asm_ = asm.Asm(asm_code)
+        asm_ = asm.decode(asm_code)
         if asm_.is_label:
             return
 
         i = asm_.inst
-        o = asm_.oper
-
-        for ii in range(len(o)):
-            if is_register(o[ii]):
-                o[ii] = o[ii].lower()
+        o = asm_.regs_oper
 
         if i == "ld":
             self.set(o[0], o[1])
@@ -708,7 +722,7 @@ class CPUState:
             return
 
         if i == "ex":
-            if o == ["de", "hl"]:
+            if o == ("de", "hl"):
                 for a, b in [("de", "hl"), ("d", "h"), ("e", "l")]:
                     self.regs[a], self.regs[b] = self.regs[b], self.regs[a]
             else:
@@ -751,7 +765,7 @@ class CPUState:
 
         if i in ("adc", "sbc"):
             if len(o) == 1:
-                o = ["a", o[0]]
+                o = ("a", o[0])
 
             if self.C is None:
                 self.Z = None
@@ -785,7 +799,7 @@ class CPUState:
 
         if i in ("add", "sub"):
             if len(o) == 1:
-                o = ["a", o[0]]
+                o = ("a", o[0])
 
             if i == "sub" and o[0] == o[1]:
                 self.Z = 1
@@ -5,7 +5,10 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
+import itertools
+
 from src.api.debug import __DEBUG__
+from src.arch.z80.backend.common import ASMS
 
 from .basicblock import BasicBlock, DummyBasicBlock
 from .helpers import ALL_REGS
@@ -15,35 +18,67 @@ from .labels_dict import LabelsDict
 __all__ = ("get_basic_blocks",)
 
 
-def _split_block(block: BasicBlock, start_of_new_block: int, labels: LabelsDict) -> tuple[BasicBlock, BasicBlock]:
-    assert 0 <= start_of_new_block < len(block), f"Invalid split pos: {start_of_new_block}"
-    new_block = BasicBlock([], block.optimizer)
-    new_block.mem = block.mem[start_of_new_block:]
-    block.mem = block.mem[:start_of_new_block]
+def _get_leaders(block: BasicBlock) -> list[int]:
+    """Returns the (sorted) positions of the given block where a basic block starts.
+    These are the same positions block.get_first_partition_idx() would return after
+    splitting the block at every previous one.
+    """
+    result = [0]
+    last = len(block) - 1
+
+    for i, mem in enumerate(block):
+        if i > 0 and mem.is_label and mem.inst in block.jump_labels and result[-1] != i:
+            result.append(i)
 
-    new_block.next = block.next
-    block.next = new_block
-    new_block.prev = block
+        if (mem.is_ender or mem.code in ASMS) and i < last:
+            result.append(i + 1)
 
-    if new_block.next is not None:
-        new_block.next.prev = new_block
+    return result
 
-    for blk in list(block.goes_to):
+
+def _partition(block: BasicBlock, labels: LabelsDict) -> list[BasicBlock]:
+    """Splits the given block into basic blocks at once, linking them (next, prev) and
+    adding the fall-through edges between them. The first one is the given block, and the last
+    one goes to wherever the given block went. Labels are updated to point to their new block.
+    """
+    leaders = _get_leaders(block)
+    if len(leaders) == 1:
+        return [block]
+
+    mem = block.mem
+    ends = [*leaders[1:], len(mem)]
+    result = [block]
+
+    block.mem = mem[: ends[0]]
+    for start, end in zip(leaders[1:], ends[1:]):
+        new_block = BasicBlock([], block.optimizer)
+        new_block.mem = mem[start:end]
+        result.append(new_block)
+
+        for i, cell in enumerate(new_block):
+            if cell.is_label and cell.inst in labels:
+                labels[cell.inst].basic_block = new_block
+                labels[cell.inst].position = i
+
+    exits = list(block.goes_to)
+    for blk in exits:
         block.delete_goes_to(blk)
-        new_block.add_goes_to(blk)
 
-    block.add_goes_to(new_block)
+    last = result[-1]
+    last.next = block.next
+    if last.next is not None:
+        last.next.prev = last
 
-    for i, mem in enumerate(new_block):
-        if mem.is_label and mem.inst in labels:
-            labels[mem.inst].basic_block = new_block
-            labels[mem.inst].position = i
+    for prev, blk in itertools.pairwise(result):
+        prev.next = blk
+        blk.prev = prev
+        if not prev[-1].is_ender or prev[-1].condition_flag:  # Unless it's an unconditional jp, jr, call, ret
+            prev.add_goes_to(blk)
 
-    if block[-1].is_ender:
-        if not block[-1].condition_flag:  # If it's an unconditional jp, jr, call, ret
-            block.delete_goes_to(block.next)
+    for blk in exits:
+        last.add_goes_to(blk)
 
-    return block, new_block
+    return result
 
 
 def _compute_calls(
@@ -143,16 +178,11 @@ def get_basic_blocks(block: BasicBlock) -> list[BasicBlock]:
     """If a block is not partitionable, returns a list with the same block.
     Otherwise, returns a list with the resulting blocks.
     """
-    result: list[BasicBlock] = [block]
     block.jump_labels.clear()
     block.jump_labels.update(_get_jump_labels(block, block.opt_labels))
 
     # Split basic blocks per label or branch instruction
-    split_pos = block.get_first_partition_idx()
-    while split_pos is not None:
-        _, block = _split_block(block, split_pos, block.opt_labels)
-        result.append(block)
-        split_pos = block.get_first_partition_idx()
+    result = _partition(block, block.opt_labels)
 
     _compute_calls(result, block.opt_labels, block.jump_labels)
 
@@ -6,12 +6,14 @@
 # --------------------------------------------------------------------
 
 from collections.abc import Iterable, Mapping
+from functools import lru_cache
 from typing import Any, Final, cast
 
 from . import patterns
 
 __all__ = (
     "ALL_REGS",
+    "ALL_REGS_MASK",
     "END_PROGRAM_LABEL",
     "HI16",
     "HI16_val",
@@ -37,12 +39,15 @@ __all__ = (
     "is_unknown",
     "is_unknown8",
     "is_unknown16",
+    "mask_regs",
     "new_tmp_val",
     "new_tmp_val16",
     "new_tmp_val16_from_label",
+    "regs_mask",
     "simplify_arg",
     "simplify_asm_args",
     "single_registers",
+    "single_registers_mask",
     "to_int",
     "valnum",
 )
@@ -69,6 +74,17 @@ ALL_REGS: Final[frozenset[str]] = frozenset(
     ]
 )
 
+# Bit of each single register (ALL_REGS, plus the alternate a' and f') in a register mask.
+# Register masks (ints) are used for register sets in the optimizer inner loops.
+REG_BITS: Final[dict[str, int]] = {
+    reg: 1 << i
+    for i, reg in enumerate(
+        ["a", "f", "b", "c", "d", "e", "h", "l", "ixh", "ixl", "iyh", "iyl", "i", "r", "sp", "a'", "f'"]
+    )
+}
+
+ALL_REGS_MASK: Final[int] = sum(REG_BITS[x] for x in ALL_REGS)
+
 # The set of all registers as they can appear in any instruction as operands
 REGS_OPER_SET: Final[frozenset[str]] = frozenset(
     [
@@ -437,6 +453,37 @@ def single_registers(op: str | Iterable[str]) -> list[str]:
     return sorted(result)
 
 
+@lru_cache(maxsize=4096)
+def _single_registers_mask(op: str) -> int:
+    return regs_mask(single_registers(op))
+
+
+def single_registers_mask(op: str | Iterable[str]) -> int:
+    """Like single_registers(), but returns the register mask of the single registers"""
+    if isinstance(op, str):
+        return _single_registers_mask(op)
+
+    result = 0
+    for x in op:
+        result |= _single_registers_mask(x)
+
+    return result
+
+
+def regs_mask(regs: Iterable[str]) -> int:
+    """Returns the register mask of the given single registers. Other values are ignored."""
+    result = 0
+    for x in regs:
+        result |= REG_BITS.get(x.lower(), 0)
+
+    return result
+
+
+def mask_regs(mask: int) -> set[str]:
+    """Returns the set of single registers in the given register mask"""
+    return {reg for reg, bit in REG_BITS.items() if mask & bit}
+
+
 def idx_args(x: str) -> tuple[str, str, str] | None:
     """Given an argument x (string), returns None if it's not an index operation "ix/iy + n"
     Otherwise return a tuple (reg, oper, offset). It's case insensitive and the register is always returned
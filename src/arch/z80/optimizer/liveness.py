@@ -0,0 +1,129 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+from __future__ import annotations
+
+from .basicblock import BasicBlock, DummyBasicBlock
+
+__all__ = ("Liveness",)
+
+
+class Liveness:
+    """Registers liveness over the control flow graph of the basic blocks.
+
+    A register is live at the entry of a block if it might be read by it, or by any
+    block executed after it, before being overwritten. This is computed with a worklist
+    fixpoint over the blocks, which are analyzed (along with every block reachable
+    from them) the first time they're queried. Results are kept up to date when the
+    code of a block changes (see update()), and discarded when the graph changes.
+    Registers in loops not read before being written anywhere are not live (least fixpoint).
+    """
+
+    __slots__ = "_defs", "_live_in", "_uses"
+
+    def __init__(self) -> None:
+        # Register masks (see helpers.REG_BITS) of each block
+        self._uses: dict[BasicBlock, int] = {}  # Registers read by the block before writing them
+        self._defs: dict[BasicBlock, int] = {}  # Registers written by the block
+        self._live_in: dict[BasicBlock, int] = {}  # Registers live at the entry of the block
+
+    def reset(self) -> None:
+        """Discards every result (i.e. because the graph has changed)"""
+        self._uses.clear()
+        self._defs.clear()
+        self._live_in.clear()
+
+    def live_in(self, block: BasicBlock) -> int:
+        """Returns the register mask of the registers live at the entry of the given block"""
+        if block not in self._live_in:
+            self._analyze(block)
+
+        return self._live_in[block]
+
+    def live_out(self, block: BasicBlock) -> int:
+        """Returns the register mask of the registers live at the exit of the given block"""
+        if block not in self._live_in:
+            self._analyze(block)
+
+        result = 0
+        for x in block.goes_to:
+            result |= self._live_in[x]
+
+        return result
+
+    def update(self, block: BasicBlock) -> None:
+        """Updates the results once the code of the given block has changed"""
+        if block not in self._live_in:
+            return
+
+        uses, defs = self._uses[block], self._defs[block]
+        self._summarize(block)
+
+        if not uses & ~self._uses[block] and not self._defs[block] & ~defs:
+            # Registers can only become live: propagating from the current results is enough
+            self._propagate([block])
+            return
+
+        # Otherwise, discard this block and every one that can reach it, to be analyzed again
+        pending = [block]
+        while pending:
+            blk = pending.pop()
+            if blk not in self._live_in:
+                continue
+
+            del self._uses[blk], self._defs[blk], self._live_in[blk]
+            pending.extend(blk.comes_from)
+
+    def _summarize(self, block: BasicBlock) -> None:
+        self._uses[block] = block.requires_mask()
+        self._defs[block] = block.destroys_mask()
+
+    def _transfer(self, block: BasicBlock) -> int:
+        """Computes the registers live at the entry of the given block from those at its exit"""
+        if isinstance(block, DummyBasicBlock):  # Its requirements are given; its successors are ignored
+            return self._uses[block]
+
+        live_out = 0
+        for x in block.goes_to:
+            live_out |= self._live_in[x]
+
+        return self._uses[block] | (live_out & ~self._defs[block])
+
+    def _analyze(self, block: BasicBlock) -> None:
+        """Analyzes the given block and every (not yet analyzed) one reachable from it"""
+        new_blocks: list[BasicBlock] = []
+        pending = [block]
+
+        while pending:
+            blk = pending.pop()
+            if blk in self._live_in:
+                continue
+
+            self._summarize(blk)
+            self._live_in[blk] = 0
+            new_blocks.append(blk)
+            pending.extend(blk.goes_to)
+
+        self._propagate(new_blocks)
+
+    def _propagate(self, worklist: list[BasicBlock]) -> None:
+        """Recomputes the given blocks and, while their results change, their predecessors"""
+        queued = set(worklist)
+
+        while worklist:
+            block = worklist.pop()
+            queued.discard(block)
+
+            live_in = self._transfer(block)
+            if live_in == self._live_in[block]:
+                continue
+
+            self._live_in[block] = live_in
+            for pred in block.comes_from:
+                if pred in self._live_in and pred not in queued:
+                    queued.add(pred)
+                    worklist.append(pred)
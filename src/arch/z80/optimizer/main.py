@@ -11,14 +11,15 @@ from src.api.config import OPTIONS
 from src.api.debug import __DEBUG__
 from src.api.utils import flatten_list
 from src.arch.interface.optimizer import OptimizerInterface
-from src.arch.z80.peephole import engine
+from src.arch.z80.peephole import engine, stats
 
-from . import helpers
+from . import helpers, timing
 from .basicblock import BasicBlock, DummyBasicBlock
 from .flow_graph import get_basic_blocks
 from .helpers import ALL_REGS, END_PROGRAM_LABEL
 from .labelinfo import LabelInfo
 from .labels_dict import LabelsDict
+from .liveness import Liveness
 from .memcell import MemCell
 from .patterns import RE_LABEL, RE_PRAGMA
 
@@ -37,6 +38,7 @@ class Optimizer(OptimizerInterface):
 
     MEMORY: list[MemCell] = []  # Instructions emitted by the backend
     BLOCKS: list[BasicBlock] = []  # Memory blocks
+    liveness: Liveness  # Registers liveness of the BLOCKS
 
     _BASICBLOCK_TYPE: type[BasicBlock] = BasicBlock
 
@@ -51,6 +53,7 @@ class Optimizer(OptimizerInterface):
         self.MEMORY = []
         self.BLOCKS = []
         self.PROC_COUNTER = 0
+        self.liveness = Liveness()
 
         self.LABELS = LabelsDict(
             {
@@ -190,22 +193,27 @@ class Optimizer(OptimizerInterface):
         self.MEMORY[:] = basic_block.mem[:]
         self.get_labels(basic_block)
 
+    def _get_basic_blocks(self, initial_memory: list[str]) -> list[BasicBlock]:
+        """Partitions the given code into basic blocks"""
+        bb = self._BASICBLOCK_TYPE(initial_memory, self)
+        self.cleanup_local_labels(bb)
+        self.initialize_memory(bb)
+        return get_basic_blocks(bb)
+
     def optimize(self, initial_memory: list[str]) -> str:
         """This will remove useless instructions"""
         self.MEMORY.clear()
         self.PROC_COUNTER = 0
 
         self._cleanup_mem(initial_memory)
+        self._BASICBLOCK_TYPE.clean_asm_args = OPTIONS.optimization_level > 3
         if OPTIONS.optimization_level <= 2:  # if -O2 or lower, do nothing and return
+            if timing.ENABLED:
+                timing.record_blocks(self._get_basic_blocks(initial_memory))
             return "\n".join(x for x in initial_memory if not RE_PRAGMA.match(x))
 
-        self._BASICBLOCK_TYPE.clean_asm_args = OPTIONS.optimization_level > 3
-        bb = self._BASICBLOCK_TYPE(initial_memory, self)
-        self.cleanup_local_labels(bb)
-        self.initialize_memory(bb)
-
         # 1st partition the Basic Blocks
-        self.BLOCKS = basic_blocks = get_basic_blocks(bb)
+        self.BLOCKS = basic_blocks = self._get_basic_blocks(initial_memory)
 
         for b in basic_blocks:
             __DEBUG__(f"--- BASIC BLOCK: {b.id} ---", 1)
@@ -248,14 +256,20 @@ class Optimizer(OptimizerInterface):
         for x in basic_blocks:
             x.compute_cpu_state()
 
-        filtered_patterns_list = [p for p in engine.PATTERNS if OPTIONS.optimization_level >= p.level >= 3]
+        filtered_patterns_list = engine.get_patterns(3, OPTIONS.optimization_level)
         for x in basic_blocks:
             x.optimize(filtered_patterns_list)
 
+        applied = {fname: x.applications for fname, x in stats.STATS.items() if x.applications}
+        __DEBUG__(f"Patterns applied: {applied}", 2)
+
         for x in basic_blocks:
             if x.comes_from == [] and len([y for y in self.JUMP_LABELS if x is self.LABELS[y].basic_block]):
                 x.ignored = True
 
+        if timing.ENABLED:
+            timing.record_blocks(x for x in basic_blocks if not x.ignored)
+
         return "\n".join(
             y for y in flatten_list(x.code for x in basic_blocks if not x.ignored) if not RE_PRAGMA.match(y)
         )
@@ -320,25 +320,27 @@ class MemCell:
 
         return result
 
+    @cached_property
+    def destroys_mask(self) -> int:
+        """Register mask of the registers this instruction changes (see destroys)"""
+        return helpers.regs_mask(self.destroys)
+
+    @cached_property
+    def requires_mask(self) -> int:
+        """Register mask of the registers this instruction requires (see requires)"""
+        return helpers.regs_mask(self.requires)
+
     def affects(self, reglist: list[str] | str) -> bool:
         """Returns if this instruction affects any of the registers
         in reglist.
         """
-        if isinstance(reglist, str):
-            reglist = [reglist]
-
-        reglist = helpers.single_registers(reglist)
-        return any(x for x in self.destroys if x in reglist)
+        return bool(self.destroys_mask & helpers.single_registers_mask(reglist))
 
     def needs(self, reglist: list[str] | str) -> bool:
         """Returns if this instruction need any of the registers
         in reglist.
         """
-        if isinstance(reglist, str):
-            reglist = [reglist]
-
-        reglist = helpers.single_registers(reglist)
-        return any(x for x in self.requires if x in reglist)
+        return bool(self.requires_mask & helpers.single_registers_mask(reglist))
 
     @property
     def used_labels(self) -> list[str]:
@@ -0,0 +1,217 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Static timing report (zxbc --timing-report).
+
+Once enabled (see init()), the translator records where every label it emits comes from: the source
+line of the sentence being translated, and the SUB/FUNCTION and loops it is within. After the peephole
+optimization, every basic block of the program takes the place of the closest of these labels before it,
+and its size and worst-case T-states (conditional jumps taken) are added to that function and those loops.
+
+This is a static count: every instruction of a function or loop body is counted once (a single pass
+through all its paths), and the routines called (i.e. the runtime library) are not included.
+"""
+
+import itertools
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import NamedTuple
+
+from src.arch.z80.backend.common import ASMS
+from src.arch.z80.optimizer.basicblock import BasicBlock
+from src.arch.z80.peephole import stats
+
+__all__ = (
+    "MAIN_PROGRAM",
+    "BlockTiming",
+    "LabelSource",
+    "Region",
+    "add_label",
+    "init",
+    "loop_region",
+    "move_labels",
+    "record_blocks",
+    "report",
+    "write_report",
+)
+
+FRAME_TSTATES = 69888  # T-states of a frame (50Hz) in the 48K model
+
+
+@dataclass(eq=False)
+class Region:
+    """A SUB/FUNCTION, the main program or a loop (compared by identity)"""
+
+    kind: str  # "FUNCTION", "SUB", "PROGRAM" or the loop kind ("FOR", "WHILE", "DO")
+    name: str
+    filename: str
+    lineno: int
+
+
+MAIN_PROGRAM = Region("PROGRAM", "", "", 0)
+
+
+class LabelSource(NamedTuple):
+    filename: str
+    lineno: int
+    regions: tuple[Region, ...]  # Enclosing function (or the main program) and loops, outermost first
+
+
+@dataclass
+class BlockTiming:
+    label: str  # First label of the block, if any
+    source: LabelSource
+    size: int
+    tstates: int
+
+
+ENABLED: bool = False
+LABELS: dict[str, LabelSource] = {}  # Label -> where it was emitted
+LOOPS: dict[str, Region] = {}  # Exit label of the loop -> loop
+BLOCKS: list[BlockTiming] = []
+
+
+def init() -> None:
+    """Clears the report and enables recording labels"""
+    global ENABLED
+
+    ENABLED = True
+    LABELS.clear()
+    LOOPS.clear()
+    BLOCKS.clear()
+
+
+def loop_region(kind: str, end_label: str, filename: str, lineno: int) -> Region:
+    """Returns the loop with the given exit label. The first time, it's created at the given source line"""
+    result = LOOPS.get(end_label)
+    if result is None:
+        result = LOOPS[end_label] = Region(kind, "", filename, lineno)
+
+    return result
+
+
+def add_label(label: str, filename: str, lineno: int, regions: tuple[Region, ...]) -> None:
+    """Records the given label was emitted at the given source line, within the given regions"""
+    LABELS[label] = LabelSource(filename, lineno, regions)
+
+
+def move_labels(labels: Iterable[str], filename: str, lineno: int) -> None:
+    """Moves the given labels (if recorded) to the given source line"""
+    for label in labels:
+        if label in LABELS:
+            LABELS[label] = LABELS[label]._replace(filename=filename, lineno=lineno)
+
+
+def _cost(block: BasicBlock) -> tuple[int, int]:
+    """Size and worst-case T-states of the block, including inline asm"""
+    size, tstates = block.sizeof, block.max_tstates
+    for cell in block:
+        if cell.code in ASMS:
+            asm_size, asm_tstates = stats.cost(ASMS[cell.code])
+            size += asm_size
+            tstates += asm_tstates
+
+    return size, tstates
+
+
+def record_blocks(blocks: Iterable[BasicBlock]) -> None:
+    """Takes the size and time of the given basic blocks (the whole program, in order)"""
+    blocks = list(blocks)
+    positions = {label: i for i, block in enumerate(blocks) for label in block.labels}
+    source = LabelSource("", 0, (MAIN_PROGRAM,))
+
+    for i, block in enumerate(blocks):
+        labels = [x.inst for x in itertools.takewhile(attrgetter("is_label"), block) if x.inst in LABELS]
+        target = blocks[i - 1][-1].branch_arg if i and blocks[i - 1].mem else None
+        if labels:  # The last of the labels starting the block is the closest to its code
+            source = LABELS[labels[-1]]
+        elif target in LABELS and positions.get(target, i) < i:
+            # Falling through a jump backwards to a loop (its condition) exits that loop
+            loop = LABELS[target].regions[-1]
+            if loop in source.regions[1:]:
+                source = source._replace(regions=source.regions[: source.regions.index(loop)])
+
+        size, tstates = _cost(block)
+        if size or tstates:
+            BLOCKS.append(BlockTiming(block.labels[0] if block.labels else "", source, size, tstates))
+
+        labels = [x for x in block.labels if x in LABELS]
+        if labels:
+            source = LABELS[labels[-1]]
+
+
+def _location(filename: str, lineno: int) -> str:
+    return f"{filename}:{lineno}" if filename else ""
+
+
+def _table(header: tuple[str, ...], rows: list[tuple[str, ...]]) -> str:
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    return "".join(
+        "  ".join([row[0].ljust(widths[0]), *(x.rjust(w) for x, w in zip(row[1:], widths[1:]))]) + "\n"
+        for row in [header, *rows]
+    )
+
+
+def report() -> str:
+    """Returns the bytes and worst-case T-states of every SUB/FUNCTION (and the main program),
+    every loop body and every basic block, as text tables
+    """
+    totals: dict[Region, list[int]] = {}
+    for block in BLOCKS:
+        for region in block.source.regions:
+            total = totals.setdefault(region, [0, 0])
+            total[0] += block.size
+            total[1] += block.tstates
+
+    def frame(tstates: int) -> str:
+        return f"{100 * tstates / FRAME_TSTATES:.2f}"
+
+    functions = [
+        (x.kind, x.name or "(main)", _location(x.filename, x.lineno), str(size), str(t), frame(t))
+        for x, (size, t) in totals.items()
+        if x not in LOOPS.values()
+    ]
+    loops = [
+        (x.kind, _location(x.filename, x.lineno), str(size), str(t), frame(t))
+        for x, (size, t) in sorted(totals.items(), key=lambda item: (item[0].filename, item[0].lineno))
+        if x in LOOPS.values()
+    ]
+    blocks = [
+        (
+            x.label,
+            _location(x.source.filename, x.source.lineno),
+            x.source.regions[0].name or "(main)",
+            str(x.size),
+            str(x.tstates),
+        )
+        for x in BLOCKS
+    ]
+
+    return "\n".join(
+        [
+            _table(("Kind", "Name", "Source", "Bytes", "T-states", "% frame"), functions),
+            _table(("Loop", "Source", "Bytes", "T-states", "% frame"), loops),
+            _table(("Block", "Source", "Function", "Bytes", "T-states"), blocks),
+        ]
+    )
+
+
+def write_report(filename: str) -> None:
+    """Writes the report into the given file ("-" for stdout), and disables recording"""
+    global ENABLED
+
+    ENABLED = False
+    result = report()
+
+    if filename == "-":
+        sys.stdout.write(result)
+        return
+
+    with open(filename, "wt", encoding="utf-8") as f:
+        f.write(result)
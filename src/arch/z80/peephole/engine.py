@@ -5,12 +5,19 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
+import hashlib
 import os
-from collections.abc import Iterable
+import pickle
+import re
+import sys
+import tempfile
+import time
+from collections.abc import Iterable, Iterator
 from typing import NamedTuple
 
 from src.api import debug, errmsg
-from src.arch.z80.peephole import parser
+from src.api.config import OPTIONS
+from src.arch.z80.peephole import parser, stats
 from src.arch.z80.peephole.evaluator import Evaluator
 from src.arch.z80.peephole.parser import (
     O_FLAG,
@@ -36,6 +43,36 @@ class OptPattern(NamedTuple):
     fname: str
 
 
+class PatternIndex:
+    """A list of OptPatterns indexed by the first token (i.e. the mnemonic) of
+    the instructions they can match, so only the ones that might match at a given
+    position are tried. Patterns are always returned in their original order.
+    """
+
+    __slots__ = "_candidates", "patterns"
+
+    RE_FIRST_TOKEN = re.compile(r"\S*")
+
+    def __init__(self, patterns: Iterable[OptPattern]):
+        self.patterns = list(patterns)
+        self._candidates: dict[str, list[OptPattern]] = {}
+
+    def __iter__(self) -> Iterator[OptPattern]:
+        return iter(self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def candidates(self, asm: str) -> list[OptPattern]:
+        """Returns the patterns which might match a block starting with the given asm line"""
+        token = self.RE_FIRST_TOKEN.match(asm).group()
+        result = self._candidates.get(token)
+        if result is None:
+            result = self._candidates[token] = [p for p in self.patterns if p.patt.may_match(token)]
+
+        return result
+
+
 OPTS_PATH = os.path.join(os.path.dirname(__file__), "opts")
 
 # Global list of optimization patterns
@@ -44,6 +81,13 @@ PATTERNS: list[OptPattern] = []
 # Max len of any pattern read
 MAXLEN: int = 0
 
+# Directories given to main(), and those whose *.opt files are pending to be loaded
+_DIRECTORIES: list[str] = []
+_PENDING_DIRECTORIES: list[str] = []
+
+# Cache of PatternIndex by (min level, max level)
+_INDEXES: dict[tuple[int | None, int], PatternIndex] = {}
+
 
 def read_opt(opt_path: str) -> OptPattern | None:
     """Given a path to an opt file, parses it and returns an OptPattern
@@ -93,12 +137,7 @@ def read_opts(folder_path: str, result: list[OptPattern] | None = None) -> list[
     if result is None:
         result = []
 
-    try:
-        files_to_read = [f for f in os.listdir(folder_path) if f.endswith(".opt")]
-    except FileNotFoundError, NotADirectoryError, PermissionError:
-        return result
-
-    for fname in files_to_read:
+    for fname in _list_opts(folder_path):
         pattern_ = read_opt(os.path.join(folder_path, fname))
         if pattern_ is None:
             continue
@@ -109,6 +148,136 @@ def read_opts(folder_path: str, result: list[OptPattern] | None = None) -> list[
     return result
 
 
+def _list_opts(folder_path: str) -> list[str]:
+    """Returns the *.opt file names in the given directory (if any)"""
+    try:
+        return [f for f in os.listdir(folder_path) if f.endswith(".opt")]
+    except FileNotFoundError, NotADirectoryError, PermissionError:
+        return []
+
+
+def _cache_filename(cache_dir: str, list_of_directories: list[str]) -> str:
+    """Returns the cache file name (under cache_dir) for the patterns in the given directories.
+    It depends on their *.opt files, the peephole engine source code and the Python version.
+    """
+    hash_ = hashlib.sha256(sys.implementation.cache_tag.encode())
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = [os.path.join(this_dir, f) for f in sorted(os.listdir(this_dir)) if f.endswith(".py")]
+
+    for directory in list_of_directories:
+        hash_.update(os.path.abspath(directory).encode())
+        sources.extend(os.path.join(directory, f) for f in sorted(_list_opts(directory)))
+
+    for fname in sources:
+        hash_.update(fname.encode())
+        with open(fname, "rb") as f:
+            hash_.update(f.read())
+
+    return os.path.join(cache_dir, "peephole", f"{hash_.hexdigest()[:32]}.pickle")
+
+
+def _read_cache(cache_filename: str) -> tuple[int, list[OptPattern]] | None:
+    """Returns the (MAXLEN, PATTERNS) pair stored in the given cache file, or None"""
+    try:
+        with open(cache_filename, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:  # A broken cache can raise almost anything when unpickled. Just ignore it
+        debug.__DEBUG__(f"could not read peephole cache {cache_filename}", level=2)
+        return None
+
+
+def _write_cache(cache_filename: str, maxlen: int, patterns: list[OptPattern]) -> None:
+    """Stores the parsed patterns in the given file. Errors are ignored."""
+    try:
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(cache_filename), delete=False) as f:
+            pickle.dump((maxlen, patterns), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, cache_filename)
+    except OSError, pickle.PicklingError:
+        debug.__DEBUG__(f"could not write peephole cache {cache_filename}", level=2)
+
+
+def load_patterns() -> None:
+    """Loads the *.opt files of the directories given to main(), if not done yet.
+    If OPTIONS.cache_dir is given, parsed patterns are read from (or saved into) that
+    directory, so they are not parsed again on every run.
+    """
+    global MAXLEN
+
+    if not _PENDING_DIRECTORIES:
+        return
+
+    directories = list(_PENDING_DIRECTORIES)
+    _PENDING_DIRECTORIES.clear()
+
+    cache_filename = None
+    if OPTIONS.cache_dir:
+        try:
+            cache_filename = _cache_filename(OPTIONS.cache_dir, directories)
+        except OSError:
+            pass
+
+    cached = _read_cache(cache_filename) if cache_filename is not None else None
+    if cached is not None:
+        MAXLEN, PATTERNS[:] = cached
+        return
+
+    num_files = 0
+    for directory in directories:
+        num_files += len(_list_opts(directory))
+        read_opts(directory, PATTERNS)
+
+    # Files with errors are not cached, so their warnings are shown on every run
+    if cache_filename is not None and len(PATTERNS) == num_files:
+        _write_cache(cache_filename, MAXLEN, PATTERNS)
+
+
+def get_patterns(o_min: int | None, o_max: int) -> PatternIndex:
+    """Returns an (indexed) list of the PATTERNS having an O_LEVEL
+    between o_min and o_max (both included). If o_min is None, there's no lower bound.
+    """
+    load_patterns()
+    result = _INDEXES.get((o_min, o_max))
+    if result is None:
+        result = PatternIndex(p for p in PATTERNS if (o_min is None or o_min <= p.level) and p.level <= o_max)
+        _INDEXES[o_min, o_max] = result
+
+    return result
+
+
+def match_pattern(p: OptPattern, asm_list: list[str], index: int) -> dict[str, str] | None:
+    """Tries to match the given pattern against the ASM list block at offset `index`,
+    and evaluates its defines and condition. Updates its stats, if enabled.
+
+    :return: The matched variables (with the defined ones) or None if not matched
+    """
+    rule_stats = None
+    if stats.ENABLED:
+        rule_stats = stats.STATS[p.fname]
+        rule_stats.attempts += 1
+        start = time.perf_counter()
+
+    match = p.patt.match(asm_list, start=index)
+    if match is not None:  # HINT: {} is also a valid match
+        if rule_stats is not None:
+            rule_stats.matches += 1
+
+        for var, defline in p.defines:
+            match[var] = defline.expr.eval(match)
+
+        if not p.cond.eval(match):
+            if rule_stats is not None:
+                rule_stats.cond_failures += 1
+            match = None
+
+    if rule_stats is not None:
+        rule_stats.time += time.perf_counter() - start
+
+    return match
+
+
 def apply_match(asm_list: list[str], patterns_list: Iterable[OptPattern], index: int = 0) -> bool:
     """Tries to match optimization patterns against the given ASM list block, starting
     at offset `index` within that block.
@@ -121,21 +290,19 @@ def apply_match(asm_list: list[str], patterns_list: Iterable[OptPattern], index:
     :param index: Index to start matching from (defaults to 0)
     :return: True if there was a match and asm_list code was changed
     """
-    for p in patterns_list:
-        match = p.patt.match(asm_list, start=index)
-        if match is None:  # HINT: {} is also a valid match
-            continue
+    if not isinstance(patterns_list, PatternIndex):
+        patterns_list = PatternIndex(patterns_list)
 
-        for var, defline in p.defines:
-            match[var] = defline.expr.eval(match)
-
-        if not p.cond.eval(match):
+    for p in patterns_list.candidates(asm_list[index] if index < len(asm_list) else ""):
+        match = match_pattern(p, asm_list, index)
+        if match is None:  # HINT: {} is also a valid match
             continue
 
         # All patterns have matched successfully. Apply this pattern
         matched = asm_list[index : index + len(p.patt)]
         applied = p.template.filter(match)
         asm_list[index : index + len(p.patt)] = applied
+        stats.record_application(p.fname, matched, applied)
         errmsg.info("pattern applied [{}:{}]".format("%03i" % p.flag, p.fname))
         debug.__DEBUG__("matched: \n    {}".format("\n    ".join(matched)), level=1)
         return True
@@ -148,20 +315,21 @@ def init():
 
     MAXLEN = 0
     PATTERNS.clear()
+    _DIRECTORIES.clear()
+    _PENDING_DIRECTORIES.clear()
+    _INDEXES.clear()
+    stats.STATS.clear()
 
 
 def main(list_of_directories: list[str] | None = None, force: bool = False):
-    """Initializes the module and load all the *.opt files
-    containing patterns and parses them. Valid .opt files will be stored in
-    PATTERNS
+    """Initializes the module to use all the *.opt files containing patterns
+    in the given directories. They will be parsed (or read from the cache) and
+    stored in PATTERNS the first time they're needed (see load_patterns()).
     """
-    global PATTERNS
-    global MAXLEN
-
-    if not force and MAXLEN:  # If already loaded, don't reload (cache)
+    list_of_directories = list_of_directories or [OPTS_PATH]
+    if not force and list_of_directories == _DIRECTORIES:  # If already loaded, don't reload (cache)
         return
 
     init()
-
-    for directory in list_of_directories or [OPTS_PATH]:
-        read_opts(directory, PATTERNS)
+    _DIRECTORIES.extend(list_of_directories)
+    _PENDING_DIRECTORIES.extend(list_of_directories)
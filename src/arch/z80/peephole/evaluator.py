@@ -49,6 +49,7 @@ class FN(StrEnum):
     IS_REQUIRED = "IS_REQUIRED"
     CTEST = "CTEST"
     NEEDS = "NEEDS"
+    CHANGES = "CHANGES"
     FLAGVAL = "FLAGVAL"
     OP1 = "OP1"
     OP2 = "OP2"
@@ -81,6 +82,7 @@ UNARY: dict[FN, Callable[[str], str | None | bool]] = {
     FN.IS_REQUIRED: lambda x: True,  # by default always required
     FN.CTEST: lambda x: memcell.MemCell(x, 1).condition_flag,  # condition test, if any. E.g. retz returns 'z'
     FN.NEEDS: lambda x: memcell.MemCell(x[0], 1).needs(x[1]),
+    FN.CHANGES: lambda x: memcell.MemCell(x[0], 1).affects(x[1]),
     FN.FLAGVAL: lambda x: helpers.new_tmp_val(),
     FN.OP1: lambda x: (x.strip().replace(",", " ", 1).split() + [""])[1],  # 1st Operand of an instruction or ""
     FN.OP2: lambda x: (x.strip().replace(",", " ", 1).split() + ["", ""])[2],  # 2nd Operand of an instruction or ""
@@ -10,6 +10,7 @@ import re
 
 RE_SVAR = re.compile(r"(\$(?:\$|[0-9]+))")
 RE_PARSE = re.compile(r'(\s+|"(?:[^"]|"")*")')
+RE_BLANK = re.compile(r"\s")
 
 
 class BasicLinePattern:
@@ -17,7 +18,7 @@ class BasicLinePattern:
     $1 a pattern variable
     """
 
-    __slots__ = "line", "output", "re", "re_pattern", "vars"
+    __slots__ = "line", "output", "prefix", "prefix_is_token", "re", "re_pattern", "vars"
 
     @staticmethod
     def sanitize(pattern):
@@ -58,6 +59,38 @@ class BasicLinePattern:
 
         self.re = re.compile(self.re_pattern)
         self.vars = {x.replace("_", "$") for x in self.vars}
+        self.prefix, self.prefix_is_token = self._get_prefix()
+
+    def _get_prefix(self) -> tuple[str, bool]:
+        """Returns the literal text any matching line must start with, and whether
+        it must be followed by a blank (so it is the whole first token of the line).
+        I.e. for 'ld $1, a' returns ('ld', True); for 'ret' returns ('ret', False).
+        """
+        prefix = []
+        for tok in self.output:
+            if tok == " ":
+                return "".join(prefix), True
+
+            if RE_SVAR.fullmatch(tok):
+                break
+
+            blank = RE_BLANK.search(tok)  # Quoted strings might contain blanks
+            if blank is not None:
+                prefix.append(tok[: blank.start()])
+                return "".join(prefix), True
+
+            prefix.append(tok)
+
+        return "".join(prefix), False
+
+    def may_match(self, token: str) -> bool:
+        """Returns False if this pattern can't match a line whose first
+        token (text up to the first blank) is the given one.
+        """
+        if self.prefix_is_token:
+            return token == self.prefix
+
+        return token.startswith(self.prefix)
 
 
 class LinePattern(BasicLinePattern):
@@ -75,7 +108,7 @@ class LinePattern(BasicLinePattern):
     If it matched, the vars_ dictionary will be updated with unified vars.
     """
 
-    __slots__ = "line", "output", "re", "re_pattern", "vars"
+    __slots__ = "line", "output", "prefix", "prefix_is_token", "re", "re_pattern", "vars"
 
     def match(self, line: str, vars_: dict[str, str]) -> bool:
         match = self.re.match(line)
@@ -107,6 +140,12 @@ class BlockPattern:
     def __len__(self):
         return len(self.lines)
 
+    def may_match(self, token: str) -> bool:
+        """Returns False if this pattern can't match a list of instructions
+        whose first one starts with the given token. I.e. 'ld' for 'ld a, 5'
+        """
+        return not self.patterns or self.patterns[0].may_match(token)
+
     def match(self, instructions: list[str], start: int = 0) -> dict[str, str] | None:
         """Given a list of instructions and a starting point,
         returns whether this pattern matches or not from such point
@@ -120,7 +159,7 @@ class BlockPattern:
           pop af
         this pattern will match at position 1
         """
-        lines = instructions[start:]
+        lines = instructions[start : start + len(self)]
         if len(self) > len(lines):
             return None
 
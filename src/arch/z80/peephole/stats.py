@@ -0,0 +1,124 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Statistics of the peephole optimization rules (zxbc --peephole-stats).
+
+Once enabled (see init()), for every rule (.opt file) it counts how many times it was tried,
+how many times its pattern matched and how many of those its condition (IF) failed, and
+measures the time spent trying it and the bytes and T-states it saved. The number of times
+each rule was applied is always counted (it's cheap, and shown in the debug output).
+"""
+
+import sys
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from src.arch.z80.optimizer.memcell import MemCell
+
+__all__ = (
+    "RuleStats",
+    "cost",
+    "init",
+    "paused",
+    "record_application",
+    "report",
+    "write_report",
+)
+
+
+@dataclass
+class RuleStats:
+    attempts: int = 0  # Times the rule was tried (only if ENABLED)
+    matches: int = 0  # Times its pattern matched (only if ENABLED)
+    cond_failures: int = 0  # Times its pattern matched, but its condition failed (only if ENABLED)
+    applications: int = 0  # Times it was applied
+    time: float = 0.0  # Time spent trying it, in seconds (only if ENABLED)
+    bytes_saved: int = 0  # (only if ENABLED)
+    tstates_saved: int = 0  # (only if ENABLED)
+
+
+ENABLED: bool = False
+STATS: defaultdict[str, RuleStats] = defaultdict(RuleStats)
+
+
+def init() -> None:
+    """Clears the statistics and enables measuring time and savings"""
+    global ENABLED
+
+    ENABLED = True
+    STATS.clear()
+
+
+@contextmanager
+def paused() -> Iterator[None]:
+    """Within this context, the rules tried are not counted (i.e. on code which will be discarded)"""
+    global STATS
+
+    saved, STATS = STATS, defaultdict(RuleStats)
+    try:
+        yield
+    finally:
+        STATS = saved
+
+
+def cost(asm_lines: Iterable[str]) -> tuple[int, int]:
+    """Returns the size (in bytes) and the max number of T-states of the given asm lines"""
+    cells = [MemCell(x, 0) for x in asm_lines if x.strip()]
+    return sum(x.sizeof for x in cells), sum(x.max_tstates for x in cells)
+
+
+def record_application(fname: str, matched: list[str], applied: list[str]) -> None:
+    """Records the given rule replaced the `matched` asm lines with the `applied` ones"""
+    stats = STATS[fname]
+    stats.applications += 1
+
+    if ENABLED:
+        old_size, old_tstates = cost(matched)
+        new_size, new_tstates = cost(applied)
+        stats.bytes_saved += old_size - new_size
+        stats.tstates_saved += old_tstates - new_tstates
+
+
+def report() -> str:
+    """Returns a table with the statistics of every rule tried, slowest first"""
+    header = ("Rule", "Tried", "Matched", "Cond. failed", "Applied", "Time (ms)", "Bytes saved", "T-states saved")
+    rows = [
+        (
+            fname,
+            str(x.attempts),
+            str(x.matches),
+            str(x.cond_failures),
+            str(x.applications),
+            f"{x.time * 1000:.3f}",
+            str(x.bytes_saved),
+            str(x.tstates_saved),
+        )
+        for fname, x in sorted(STATS.items(), key=lambda item: (-item[1].time, item[0]))
+    ]
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+
+    return "".join(
+        "  ".join([row[0].ljust(widths[0]), *(x.rjust(w) for x, w in zip(row[1:], widths[1:]))]) + "\n"
+        for row in [header, *rows]
+    )
+
+
+def write_report(filename: str) -> None:
+    """Writes the report into the given file ("-" for stdout), and disables measuring"""
+    global ENABLED
+
+    ENABLED = False
+    result = report()
+
+    if filename == "-":
+        sys.stdout.write(result)
+        return
+
+    with open(filename, "wt", encoding="utf-8") as f:
+        f.write(result)
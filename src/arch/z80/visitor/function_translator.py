@@ -13,6 +13,7 @@ from src.api.debug import __DEBUG__
 from src.api.global_ import optemps
 from src.arch.z80 import backend
 from src.arch.z80.backend.runtime import Labels as RuntimeLabel
+from src.arch.z80.optimizer import timing
 from src.arch.z80.visitor.translator import LabelledData
 from src.arch.zx48k.backend import Backend
 from src.symbols import sym as symbols
@@ -49,6 +50,8 @@ class FunctionTranslator(Translator):
     def visit_FUNCTION(self, node):
         bound_tables = []
 
+        self.REGION = timing.Region(node.class_.upper(), node.name, node.filename, node.lineno)
+        self.SOURCE = node.filename, node.lineno
         self.ic_label(node.mangled)
         if node.convention == CONVENTION.fastcall:
             self.ic_enter("__fastcall__")
@@ -112,8 +115,7 @@ class FunctionTranslator(Translator):
                         q = self.default_value(local_var.type_, local_var.default_value)
                         self.ic_lvard(local_var.offset, q)
 
-        for i in node.ref.body:
-            yield self.visit(i)
+        yield from self.visit_sentences(node.ref.body)
 
         self.ic_label("%s__leave" % node.mangled)
 
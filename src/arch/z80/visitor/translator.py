@@ -265,6 +265,12 @@ class Translator(TranslatorVisitor):
         scope = node.entry.scope
 
         if node.offset is None:
+            if self.is_inline_array_access(node):
+                t = optemps.new_t()
+                yield from self.emit_array_address(node, t)
+                self.ic_load(node.type_, node.t, f"*{t}")
+                return
+
             yield self.visit(node.args)
 
             if scope == SCOPE.global_:
@@ -333,6 +339,13 @@ class Translator(TranslatorVisitor):
         scope = arr.scope
 
         if arr.offset is None:
+            if self.is_inline_array_access(arr):
+                yield self.visit(node.children[1])  # Right expression
+                t = optemps.new_t()
+                yield from self.emit_array_address(arr, t)
+                self.ic_istore(arr.type_, t, node.children[1].t)
+                return
+
             yield self.visit(node.children[1])  # Right expression
             yield self.visit(arr)
 
@@ -556,8 +569,8 @@ class Translator(TranslatorVisitor):
         if node.token == "WHILE_DO":
             self.ic_jump(continue_loop)
 
-        self.ic_label(loop_label)
         self.LOOPS.append(("DO", end_loop, continue_loop))  # Saves which labels to jump upon EXIT or CONTINUE
+        self.ic_label(loop_label)
 
         if len(node.children) > 1:
             yield self.visit(node.children[1])
@@ -712,8 +725,8 @@ class Translator(TranslatorVisitor):
         if node.token == "UNTIL_DO":
             self.ic_jump(continue_loop)
 
-        self.ic_label(loop_label)
         self.LOOPS.append(("DO", end_loop, continue_loop))  # Saves which labels to jump upon EXIT or CONTINUE
+        self.ic_label(loop_label)
 
         if len(node.children) > 1:
             yield self.visit(node.children[1])
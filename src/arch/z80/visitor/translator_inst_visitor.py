@@ -130,6 +130,9 @@ class TranslatorInstVisitor(NodeVisitor):
     def ic_inline(self, asm_code: str) -> None:
         self.emit("inline", asm_code)
 
+    def ic_istore(self, type_: TYPE | sym.BASICTYPE, addr: str, t) -> None:
+        self.emit(f"istore{self.TSUFFIX(type_)}", addr, t)
+
     def ic_jgezero(self, type_: TYPE | sym.BASICTYPE, t, label: str) -> None:
         self.emit(f"jgezero{self._no_bool(type_)}", t, label)
 
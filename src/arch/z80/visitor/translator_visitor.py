@@ -5,18 +5,22 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
+from collections.abc import Iterable
 from typing import NamedTuple
 
 import src.api.global_ as gl
-from src.api import string_labels
+from src.api import check, string_labels
 from src.api.config import OPTIONS
 from src.api.constants import SCOPE, TYPE
 from src.api.debug import __DEBUG__
 from src.api.errmsg import syntax_error_cant_convert_to_type, syntax_error_not_constant
 from src.api.exception import InvalidCONSTexpr, InvalidOperatorError
+from src.api.global_ import optemps
 from src.arch.z80 import backend
+from src.arch.z80.backend.icinstruction import ICInstruction
 from src.arch.z80.backend.runtime import LABEL_REQUIRED_MODULES, RUNTIME_LABELS
 from src.arch.z80.backend.runtime import Labels as RuntimeLabel
+from src.arch.z80.optimizer import timing
 from src.ast_.tree import ChildrenList
 from src.symbols import sym as symbols
 from src.symbols.symbol_ import Symbol
@@ -52,6 +56,10 @@ class TranslatorVisitor(TranslatorInstVisitor):
     LOOPS = []  # Defined LOOPS
     JUMP_TABLES: list[JumpTable] = []
 
+    # Where the code being emitted comes from (for the timing report): sentence source line and function
+    SOURCE: tuple[str, int] = ("", 0)
+    REGION: timing.Region = timing.MAIN_PROGRAM
+
     # Type code used in DATA
     DATA_TYPES = {"str": 1, "i8": 2, "u8": 3, "i16": 4, "u16": 5, "i32": 6, "u32": 7, "f16": 8, "f": 9}
 
@@ -93,11 +101,40 @@ class TranslatorVisitor(TranslatorInstVisitor):
         for x in MEMORY:
             yield str(x)
 
+    def ic_label(self, label: str) -> None:
+        super().ic_label(label)
+        if timing.ENABLED:
+            # Loops are created when their first label is emitted, which is always at the loop sentence.
+            # The exit label of a loop is already out of it.
+            loops = tuple(timing.loop_region(x[0], x[1], *self.SOURCE) for x in self.LOOPS if x[1] != label)
+            timing.add_label(label, *self.SOURCE, (self.REGION, *loops))
+
+    def _trailing_labels(self) -> list[str]:
+        """Returns the labels emitted after the last instruction so far"""
+        result = []
+        for quad in reversed(self.backend.MEMORY):
+            if quad.instr != ICInstruction.LABEL:
+                break
+            result.append(quad.args[0])
+
+        return result
+
+    def visit_sentences(self, sentences: Iterable[Symbol]):
+        """Visits the given sentences, keeping track of their source line"""
+        source = self.SOURCE
+        for sentence in sentences:
+            if isinstance(sentence, symbols.SENTENCE | symbols.ASM):
+                self.SOURCE = sentence.filename, sentence.lineno
+                if timing.ENABLED:  # Labels ending the previous sentence (e.g. END IF) start the code of this one
+                    timing.move_labels(self._trailing_labels(), *self.SOURCE)
+            yield self.visit(sentence)
+
+        self.SOURCE = source
+
     # Generic Visitor methods
     def visit_BLOCK(self, node):
         __DEBUG__("BLOCK", 2)
-        for child in node.children:
-            yield self.visit(child)
+        yield from self.visit_sentences(node.children)
 
     def visit_TYPECAST(self, node):
         yield self.visit(node.operand)
@@ -128,6 +165,76 @@ class TranslatorVisitor(TranslatorInstVisitor):
         if label in LABEL_REQUIRED_MODULES:
             backend.REQUIRES.add(LABEL_REQUIRED_MODULES[label])
 
+    def is_inline_array_access(self, node: symbols.ARRAYACCESS) -> bool:
+        """Whether the address of the given array element can be computed inline
+        instead of calling the __ARRAY runtime routine. This requires the bounds of the
+        array to be known at compile time (so not for parameters), and no bound checking,
+        which is done by the runtime. String arrays are left to the runtime too.
+        """
+        return (
+            self.O_LEVEL > 1
+            and not OPTIONS.array_check
+            and node.scope in (SCOPE.global_, SCOPE.local)
+            and node.type_ != Type.string
+        )
+
+    def emit_array_address(self, node: symbols.ARRAYACCESS, t: str):
+        """Emits the row-major address computation of the given array element into t.
+        Each variable index is multiplied by the (constant) size of the row it selects,
+        while constant indexes and the lower bounds are folded into a single offset.
+        """
+        bound_type = self.TYPE(gl.BOUND_TYPE)
+        strides = []
+        stride = node.type_.size
+        for bound in reversed(node.entry.bounds):
+            strides.append(stride)
+            stride *= bound.count
+
+        offset = 0
+        result = None
+        for arg, bound, stride in zip(node.args, node.entry.bounds, reversed(strides)):
+            offset -= bound.lower * stride
+            index = arg.value
+            if check.is_number(index) or check.is_const(index):
+                offset += index.value * stride
+                continue
+
+            yield self.visit(index)
+            term = index.t
+            if stride != 1:
+                term = optemps.new_t()
+                self.ic_mul(bound_type, term, index.t, stride)
+
+            if result is not None:
+                t1 = optemps.new_t()
+                self.ic_add(bound_type, t1, result, term)
+                term = t1
+
+            result = term
+
+        if node.scope == SCOPE.global_:
+            base = f"#{node.entry.data_label}"
+            if offset:
+                base += f" + {offset}" if offset > 0 else f" - {-offset}"
+
+            if result is None:
+                self.ic_load(gl.PTR_TYPE, t, base)
+            else:
+                self.ic_add(gl.PTR_TYPE, t, result, base)
+            return
+
+        if result is not None and offset:
+            t1 = optemps.new_t()
+            self.ic_add(bound_type, t1, result, offset)
+            result = t1
+
+        base = optemps.new_t()
+        self.ic_pload(gl.PTR_TYPE, base, -(node.entry.offset - self.TYPE(gl.PTR_TYPE).size))
+        if result is None:
+            self.ic_add(gl.PTR_TYPE, t, base, offset)
+        else:
+            self.ic_add(gl.PTR_TYPE, t, result, base)
+
     def emit_data_blocks(self):
         """Emits the DATA instruction blocks used by READ.
         This function must be called before emit_strings() because it will emit access to string variables,
@@ -35,6 +35,10 @@ class UnaryOpTranslator(TranslatorVisitor):
     def visit_ADDRESS(self, node):
         scope = node.operand.scope
         if node.operand.token == "ARRAYACCESS":
+            if self.is_inline_array_access(node.operand):
+                yield from self.emit_array_address(node.operand, node.t)
+                return
+
             yield self.visit(node.operand)
             # Address of an array element.
             if scope == SCOPE.global_:
@@ -49,7 +49,7 @@ class Backend(Z80Backend):
         # Flag for headerless mode (No prologue / epilogue)
         OPTIONS(Action.ADD_IF_NOT_DEFINED, name="headerless", type=bool, default=False, ignore_none=True)
 
-        engine.main([engine.OPTS_PATH, OPTS_PATH], force=True)  # inits the optimizer
+        engine.main([engine.OPTS_PATH, OPTS_PATH])  # inits the optimizer
 
     @staticmethod
     def emit_prologue() -> list[str]:
@@ -5,7 +5,7 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
-from src.arch.z80.optimizer.asm import Asm
+from src.arch.z80.optimizer.asm import decode
 from src.arch.z80.optimizer.cpustate import CPUState as CPUStateZ80
 
 __all__ = ("CPUState",)
@@ -15,7 +15,7 @@ class CPUState(CPUStateZ80):
     def execute(self, asm_code: str) -> None:
         """Execute the given assembly code."""
 
-        asm = Asm(asm_code)
+        asm = decode(asm_code)
         if asm.is_label:
             return
 
@@ -5,7 +5,7 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 from collections.abc import Callable, Generator
-from typing import Any, Final
+from typing import Any, ClassVar, Final
 
 from .tree import Tree
 from .visitor import GenericNodeVisitor
@@ -26,14 +26,44 @@ class Ast(Tree):
         return self.__class__
 
 
+VisitMethod = Callable[[Any, Ast], Generator[Ast | Any, Any]]
+
+
 class NodeVisitor(GenericNodeVisitor[Ast]):
+    # Dispatch tables of every visitor class, filled lazily: visit method (unbound) by node class.
+    # Node classes whose token is not a class attribute (i.e. depends on the instance) map to None,
+    # and their visit method is taken from the table by token.
+    _methods_by_class: ClassVar[dict[type, VisitMethod | None]] = {}
+    _methods_by_token: ClassVar[dict[Any, VisitMethod]] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._methods_by_class = {}
+        cls._methods_by_token = {}
+
     def _visit(self, node: Ast):
-        meth: Callable[[Ast], Generator[Ast | Any, Any]] = getattr(
-            self,
-            f"visit_{node.token}",
-            self.generic_visit,
-        )
-        return meth(node)
+        try:
+            meth = self._methods_by_class[node.__class__]
+        except KeyError:
+            meth = self._methods_by_class[node.__class__] = self._get_class_visit_method(node.__class__)
+
+        if meth is None:
+            meth = self._get_visit_method(node.token)
+
+        return meth(self, node)
+
+    @classmethod
+    def _get_class_visit_method(cls, node_class: type[Ast]) -> VisitMethod | None:
+        token = getattr(node_class, "token", None)
+        return cls._get_visit_method(token) if isinstance(token, str) else None
+
+    @classmethod
+    def _get_visit_method(cls, token: Any) -> VisitMethod:
+        try:
+            return cls._methods_by_token[token]
+        except KeyError:
+            meth = cls._methods_by_token[token] = getattr(cls, f"visit_{token}", cls.generic_visit)
+            return meth
 
     def generic_visit(self, node: Ast) -> Generator[Ast | Any, Any]:
         for i, child in enumerate(node.children):
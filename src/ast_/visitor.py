@@ -14,7 +14,7 @@ class ToVisit[T](NamedTuple):
 
 class GenericNodeVisitor[T]:
     def visit(self, node: T | None) -> T | Generator[T | None] | None:
-        stack: list[T | GeneratorType] = [ToVisit[T](node) if node is not None else None]
+        stack: list[T | GeneratorType] = [ToVisit(node) if node is not None else None]
         last_result: T | None = None
 
         while stack:
@@ -62,6 +62,13 @@ class Symbol(Ast):
         """token = AST Symbol class name, removing the 'Symbol' prefix."""
         return self.__class__.__name__[6:]  # e.g. 'CALL', 'NUMBER', etc...
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # Unless it's redefined as a property (i.e. depends on the instance), the token is a class constant
+        token = getattr(cls, "token", None)
+        if token is Symbol.token or not isinstance(token, property):
+            setattr(cls, "token", cls.__name__[6:])
+
     def __str__(self):
         return self.token
 
@@ -468,9 +468,10 @@ class Lexer:
         self.next_token = None  # if set to something, this will be returned once
 
     def input(self, s: str):
-        """Defines input string, removing current lexer."""
+        """Defines input string, resetting the current lexer."""
         self.input_data = s
-        self.lex = lex.lex(object=self)
+        if self.lex is None:
+            self.lex = lex.lex(object=self)
         self.lex.input(self.input_data)
 
     def token(self):
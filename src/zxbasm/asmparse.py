@@ -24,8 +24,10 @@ from src.zxbasm.memory import Memory
 from src.zxbpp import zxbpp
 
 from .asmparse_standalone import Lark_StandAlone as BaseLarkStandAlone
-from .asmparse_standalone import Lexer, Token, Transformer, UnexpectedInput
+from .asmparse_standalone import Lexer, Reduce, Token, Transformer, UnexpectedInput, UnexpectedToken
 from .asmparse_zxnext_standalone import Lark_StandAlone as ZXNextLarkStandAlone
+from .asmparse_zxnext_standalone import UnexpectedInput as ZXNextUnexpectedInput
+from .asmparse_zxnext_standalone import UnexpectedToken as ZXNextUnexpectedToken
 
 LEXER = asmlex.Lexer()
 
@@ -36,6 +38,9 @@ AUTORUN_ADDR = None  # Where to start the execution automatically
 
 REGS16 = {"BC", "DE", "HL", "SP", "IX", "IY"}  # 16 Bits registers
 
+# For every parse table, the LALR states with a single possible action, which is a reduction (see reduce_line())
+DEFAULT_REDUCTIONS: dict[int, dict[int, Any]] = {}
+
 
 def init():
     """Initializes this module"""
@@ -78,7 +83,7 @@ class AsmLarkLexerAdapter(Lexer):
             if tok is None:
                 break
 
-            t = AsmToken(tok.type, tok.value, line=tok.lineno, column=lexer.find_column(tok))
+            t = AsmToken(tok.type, tok.value, start_pos=tok.lexpos, line=tok.lineno, column=lexer.find_column(tok))
             yield t
 
 
@@ -517,9 +522,74 @@ class AsmTransformer(Transformer):
         return Expr.makenode(Container(MEMORY.org, items[0].line))
 
 
+def get_default_reductions(parse_conf: Any) -> dict[int, Any]:
+    """Returns the states of the given parse table whose only action is reducing a rule,
+    i.e. it doesn't depend on the next token (except for the start rule, which ends the parsing)
+    """
+    key = id(parse_conf.states)
+    result = DEFAULT_REDUCTIONS.get(key)
+    if result is not None:
+        return result
+
+    result = DEFAULT_REDUCTIONS[key] = {}
+    for state, actions in parse_conf.states.items():
+        if len(set(actions.values())) != 1:
+            continue
+
+        action, rule = next(iter(actions.values()))
+        if action == Reduce and rule.origin.name != parse_conf.start:
+            result[state] = rule
+
+    return result
+
+
+def reduce_line(parser_state: Any) -> None:
+    """Does the reductions pending once a line has been parsed, which don't depend on the next token.
+
+    This way, the actions of every line (i.e. defining an EQU label) are done before lexing the next one,
+    as if each line were parsed on its own.
+    """
+    parse_conf = parser_state.parse_conf
+    reductions = get_default_reductions(parse_conf)
+    state_stack = parser_state.state_stack
+    value_stack = parser_state.value_stack
+
+    while (rule := reductions.get(state_stack[-1])) is not None:
+        size = len(rule.expansion)
+        if size:
+            items = value_stack[-size:]
+            del state_stack[-size:]
+            del value_stack[-size:]
+        else:
+            items = []
+
+        _, new_state = parse_conf.states[state_stack[-1]][rule.origin.name]
+        state_stack.append(new_state)
+        value_stack.append(parse_conf.callbacks[rule](items))
+
+
+def syntax_error(e: UnexpectedInput | ZXNextUnexpectedInput, lineno: int) -> None:
+    """Reports the given parsing error, found at the (logical) line starting at lineno"""
+    if isinstance(e, UnexpectedToken | ZXNextUnexpectedToken):
+        tok = e.token
+        if tok.type == "$END":
+            OPTIONS.stderr.write("General syntax error at assembler (unexpected End of File?)")
+            gl.has_errors += 1
+        elif tok.type == "NEWLINE":
+            error(lineno, "Syntax error. Unexpected end of line [NEWLINE]")
+        else:
+            error(lineno, "Syntax error. Unexpected token '%s' [%s]" % (tok.value, tok.type))
+    else:
+        error(lineno, f"Syntax error at line {lineno}, column {e.column}")
+
+
 def assemble(input_):
     """Assembles input string, and leave the result in the
-    MEMORY global object
+    MEMORY global object.
+
+    The whole input is parsed in a single pass, feeding the tokens of every logical line
+    (lines ending with \\ continue in the next one) into the same parser. On a syntax error,
+    the rest of the line is skipped and the parsing starts again from the next one.
     """
     global MEMORY
 
@@ -544,28 +614,42 @@ def assemble(input_):
     if current_buffer:
         logical_lines.append("\n".join(current_buffer))
 
+    lexer_adapter = AsmLarkLexerAdapter(None)
+    interactive_parser = parser_.parse_interactive()
+    empty = True  # Whether nothing has been parsed since the parser was (re)started
+    token = None
+
     current_lineno = 1
     for line in logical_lines:
         LEXER.input(line + "\n")
         LEXER.lineno = current_lineno
         try:
-            parser_.parse(LEXER)
+            line_start = True
+            for token in lexer_adapter.lex(LEXER):
+                if line_start and not empty:
+                    parser_state = interactive_parser.parser_state
+                    actions = parser_state.parse_conf.states[parser_state.position]
+                    if token.type not in actions and "$END" in actions:
+                        # This line can't follow the previous ones (i.e. after END), so it's parsed on its own
+                        interactive_parser.feed_token(Token.new_borrow_pos("$END", "", token))
+                        interactive_parser = parser_.parse_interactive()
+
+                interactive_parser.feed_token(token)
+                empty = line_start = False
+
+            reduce_line(interactive_parser.parser_state)
             current_lineno = LEXER.lineno
-        except UnexpectedInput as e:
-            from .asmparse_standalone import UnexpectedToken
-
-            if isinstance(e, UnexpectedToken):
-                tok = e.token
-                if tok.type == "$END":
-                    OPTIONS.stderr.write("General syntax error at assembler (unexpected End of File?)")
-                    gl.has_errors += 1
-                elif tok.type == "NEWLINE":
-                    error(current_lineno, "Syntax error. Unexpected end of line [NEWLINE]")
-                else:
-                    error(current_lineno, "Syntax error. Unexpected token '%s' [%s]" % (tok.value, tok.type))
-            else:
-                error(current_lineno, f"Syntax error at line {current_lineno}, column {e.column}")
+        except (UnexpectedInput, ZXNextUnexpectedInput) as e:
+            syntax_error(e, current_lineno)
             current_lineno += line.count("\n") + 1
+            interactive_parser = parser_.parse_interactive()
+            empty = True
+
+    if not empty:
+        try:
+            interactive_parser.feed_token(Token.new_borrow_pos("$END", "", token))
+        except (UnexpectedInput, ZXNextUnexpectedInput) as e:
+            syntax_error(e, current_lineno)
 
     if len(MEMORY.scopes):
         error(MEMORY.scopes[-1], "Missing ENDP to close this scope")
@@ -29,16 +29,21 @@ class Memory:
         """Initializes the origin of code.
         0 by default"""
         self.index = org  # ORG address (can be changed on the fly)
-        self.memory_bytes: dict[int, int] = {}  # An array (associative) containing memory bytes
+        self.memory_bytes = bytearray(self.MAX_MEM + 1)  # Memory image
+        self.used = bytearray(self.MAX_MEM + 1)  # 1 for every address of the image in use
         self.local_labels: list[dict[str, Label]] = [{}]  # Local labels in the current memory scope
         self.global_labels = self.local_labels[0]  # Global memory labels
         self.ORG = org  # last ORG value set
         self.scopes: list[int] = []
         self.clear_temporary_labels()
 
-        # Origins of code for asm mnemonics.
-        # This will store corresponding asm instructions
-        self.orgs: dict[int, list[Asm]] = {}
+        # Origins of code for asm mnemonics (or labels).
+        # This will store the first asm instruction at every one of them (None for labels)
+        self.orgs: dict[int, Asm | None] = {}
+
+        # Instructions whose arguments could not be evaluated yet (i.e. forward references to labels),
+        # and their address. They're patched once all the labels are known (see dump())
+        self.fixups: list[tuple[int, Asm]] = []
 
     def enter_proc(self, lineno: int):
         """Enters (pushes) a new context"""
@@ -78,15 +83,38 @@ class Memory:
         """Returns current ORG index"""
         return self.index
 
-    def __set_byte(self, byte: int, lineno: int):
-        """Sets a byte at the current location,
-        and increments org in one. Raises an error if org > MAX_MEMORY
+    @property
+    def is_empty(self) -> bool:
+        """Whether nothing has been emitted (or declared) in memory yet"""
+        return not self.orgs
+
+    @property
+    def bytes_used(self) -> int:
+        """Returns the number of memory addresses in use"""
+        return len(self.used) - self.used.count(0)
+
+    @property
+    def min_address(self) -> int:
+        """Returns the lowest address in use"""
+        return len(self.used) - len(self.used.lstrip(b"\x00"))
+
+    @property
+    def max_address(self) -> int:
+        """Returns the highest address in use"""
+        return len(self.used.rstrip(b"\x00")) - 1
+
+    def __set_bytes(self, data: bytearray, lineno: int):
+        """Sets the given bytes at the current location,
+        and increments org accordingly. Raises an error if org > MAX_MEMORY
         """
-        if byte < 0 or byte > 255:
-            error(lineno, "Invalid byte value %i" % byte)
+        end = self.org + len(data)
+        if end > self.MAX_MEM + 1:
+            error(lineno, "Memory address out of range [0 .. 65535]. Current value: %i" % (end - 1))
+            return
 
-        self.memory_bytes[self.org] = byte
-        self.index += 1  # Increment current memory pointer
+        self.memory_bytes[self.org : end] = data
+        self.used[self.org : end] = b"\x01" * len(data)
+        self.index = end  # Increment current memory pointer
 
     def exit_proc(self, lineno: int):
         """Exits current procedure. Local labels are transferred to global
@@ -121,9 +149,10 @@ class Memory:
         self.scopes.pop()
 
     def set_memory_slot(self):
-        if self.org not in self.orgs:
-            self.orgs[self.org] = []  # Declares an empty memory slot if not already done
+        if self.org not in self.orgs and self.org <= self.MAX_MEM:
+            self.orgs[self.org] = None  # Declares an empty memory slot if not already done
             self.memory_bytes[self.org] = 0  # Declares an empty memory slot if not already done
+            self.used[self.org] = 1
 
     def resolve_temporary_label(self, fname: str, label: Label):
         if label.direction == -1:
@@ -155,18 +184,18 @@ class Memory:
 
         __DEBUG__("%04Xh [%04Xh] ASM: %s" % (self.org, self.org - self.ORG, instr.asm))
         self.set_memory_slot()
-        self.orgs[self.org].append(instr)
+        if self.orgs.get(self.org) is None:
+            self.orgs[self.org] = instr
+            if instr.pending:
+                self.fixups.append((self.org, instr))
 
-        for byte in instr.bytes():
-            self.__set_byte(byte, instr.lineno)
+        self.__set_bytes(instr.bytes(), instr.lineno)
 
-    def dump(self) -> tuple[int, list[int]]:
-        """Returns a tuple containing code ORG (origin address), and a list of bytes (OUTPUT)
-        self.orgs[ ] contains ADDRESS -> Mnemonic, where Mnemonic.arg[x].eval() is the value of the argument x.
+    def dump(self) -> tuple[int, bytearray]:
+        """Returns a tuple containing code ORG (origin address), and the bytes (OUTPUT) from there.
+        Instructions pending to be evaluated (self.fixups) are patched first.
         """
-        org = min(self.memory_bytes.keys())  # Org is the lowest one
-        OUTPUT: list[int] = []
-        align = []
+        org = self.min_address  # Org is the lowest one
 
         for filename in self._tmp_pending_labels:
             for label in self._tmp_pending_labels[filename]:
@@ -178,37 +207,25 @@ class Memory:
             if not label.defined:
                 error(label.lineno, "Undefined GLOBAL label '%s'" % label.name)
 
-        for i in range(org, max(self.memory_bytes.keys()) + 1):
+        self.fixups.sort(key=lambda x: x[0])
+        for addr, instr in self.fixups:
             if gl.has_errors:
-                return org, OUTPUT
-
-            try:
-                try:
-                    a = [x for x in self.orgs[i] if isinstance(x, Asm)]  # search for asm instructions
+                return org, bytearray()
 
-                    if not a:
-                        align.append(0)  # Fill with ZEROes not used memory regions
-                        continue
+            instr.arg = instr.argval()
+            instr.pending = False
+            data = instr.bytes()
+            self.memory_bytes[addr : addr + len(data)] = data
 
-                    OUTPUT += align
-                    align = []
-                    a = a[0]
-                    if a.pending:
-                        a.arg = a.argval()
-                        a.pending = False
-                        tmp = a.bytes()
-
-                        for r in range(len(tmp)):
-                            self.memory_bytes[i + r] = tmp[r]
-                except KeyError:
-                    pass
-
-                OUTPUT.append(self.memory_bytes[i])
+        if gl.has_errors:
+            return org, bytearray()
 
-            except KeyError:
-                OUTPUT.append(0)  # Fill with ZEROes not used memory regions
+        # Memory slots with no instructions (i.e. labels) after the last instruction are not emitted
+        end = self.max_address + 1
+        last_instr = max((addr for addr, instr in self.orgs.items() if instr is not None), default=org - 1)
+        end -= sum(1 for addr, instr in self.orgs.items() if instr is None and addr > last_instr)
 
-        return org, OUTPUT
+        return org, self.memory_bytes[org:end]
 
     def declare_label(
         self,
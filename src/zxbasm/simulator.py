@@ -0,0 +1,1259 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Headless Z80 simulator (zxbc --simulate).
+
+Runs an assembled program (the memory image of the assembler) decoding its instructions with the
+opcode table in z80.py, which also gives the T-states each one takes, and counts the T-states spent
+by label and by instruction. There is no machine around the CPU: no memory contention, no screen
+nor keyboard (ports read 0xFF), and no ROM. Calls to the ROM return immediately (they are reported
+apart), and the frame interrupt just increments the FRAMES system variable (IM 1) or calls the
+IM 2 routine.
+"""
+
+import re
+import sys
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cache
+from operator import attrgetter
+
+from src.zxbasm.asm_instruction import ARGre
+from src.zxbasm.memory import Memory
+from src.zxbasm.z80 import Z80SET, Opcode
+
+__all__ = (
+    "Instruction",
+    "Simulation",
+    "Simulator",
+    "StopSimulation",
+    "report",
+    "simulate",
+    "write_report",
+)
+
+# Flags
+FLAG_C: int = 0x01
+FLAG_N: int = 0x02
+FLAG_PV: int = 0x04
+FLAG_X: int = 0x08
+FLAG_H: int = 0x10
+FLAG_Y: int = 0x20
+FLAG_Z: int = 0x40
+FLAG_S: int = 0x80
+FLAGS_XY: int = FLAG_X | FLAG_Y
+FLAGS_SZP: int = FLAG_S | FLAG_Z | FLAG_PV
+
+# Sign, zero, undocumented bits 5 and 3, and parity flags of every byte
+SZ53: list[int] = [(x & (FLAG_S | FLAGS_XY)) | (0 if x else FLAG_Z) for x in range(256)]
+SZ53P: list[int] = [SZ53[x] | (0 if x.bit_count() & 1 else FLAG_PV) for x in range(256)]
+
+CONDITIONS: dict[str, Callable[[int], bool]] = {
+    "NZ": lambda f: not f & FLAG_Z,
+    "Z": lambda f: bool(f & FLAG_Z),
+    "NC": lambda f: not f & FLAG_C,
+    "C": lambda f: bool(f & FLAG_C),
+    "PO": lambda f: not f & FLAG_PV,
+    "PE": lambda f: bool(f & FLAG_PV),
+    "P": lambda f: not f & FLAG_S,
+    "M": lambda f: bool(f & FLAG_S),
+}
+
+# T-states of conditional instructions when the condition is false, and of repeating block instructions
+# on their last iteration. The opcode table holds the other (longest) case
+SHORT_TSTATES: dict[str, int] = {
+    "JR": 7,
+    "DJNZ": 8,
+    "CALL": 10,
+    "RET": 5,
+    "LDIR": 16,
+    "LDDR": 16,
+    "CPIR": 16,
+    "CPDR": 16,
+    "INIR": 16,
+    "INDR": 16,
+    "OTIR": 16,
+    "OTDR": 16,
+}
+
+FRAME_TSTATES: int = 69888  # T-states between interrupts (a ZX Spectrum 48K frame)
+FRAMES_ADDR: int = 23672  # FRAMES system variable, which the ROM interrupt routine increments
+ROM_SIZE: int = 0x4000
+MAX_TSTATES: int = 10**9  # Simulation stops after this many T-states (about 286 seconds of a 3.5MHz Z80)
+
+EXIT_ADDR: int = 0x0000  # Return address of the program. Reaching it ends the simulation
+
+# Operands, as they appear in the opcode table
+REGS8: dict[str, str] = {"A": "a", "B": "b", "C": "c", "D": "d", "E": "e", "H": "h", "L": "l", "I": "i"}
+REGS16: tuple[str, ...] = ("AF", "BC", "DE", "HL", "SP", "IX", "IY")
+RE_INDEXED = re.compile(r"^\((I[XY])\+N\)$")
+
+
+class StopSimulation(Exception):
+    """Raised to stop the simulation, with the reason"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+Execute = Callable[["Simulator"], int]  # Executes an instruction, returning the T-states it took
+Getter = Callable[["Simulator"], int]
+Setter = Callable[["Simulator", int], None]
+
+
+class Instruction:
+    """An instruction decoded at some address, and the times it was executed"""
+
+    __slots__ = "address", "count", "execute", "mnemonic", "size", "tstates"
+
+    def __init__(self, address: int, mnemonic: str, size: int, execute: Execute):
+        self.address = address
+        self.mnemonic = mnemonic  # As in the opcode table, i.e. "LD A,(IX+N)"
+        self.size = size
+        self.execute = execute
+        self.count = 0  # Times executed
+        self.tstates = 0  # T-states spent executing it
+
+
+class Simulator:
+    """Z80 CPU and its 64K of memory"""
+
+    def __init__(self, memory: bytes | bytearray, rom_size: int = ROM_SIZE):
+        assert len(memory) == 0x10000
+        self.mem = bytearray(memory)
+        self.rom_size = rom_size  # Addresses below are read-only, and calls there are not simulated
+
+        self.a = self.f = self.b = self.c = self.d = self.e = self.h = self.l = 0
+        self.a_ = self.f_ = self.b_ = self.c_ = self.d_ = self.e_ = self.h_ = self.l_ = 0
+        self.ix = self.iy = self.sp = self.pc = 0
+        self.i = self.r = self.im = 0
+        self.iff1 = self.iff2 = False
+
+        self.tstates = 0
+        self.next_interrupt = FRAME_TSTATES
+        self._r_tstates = 0  # T-states when R was set. R is approximated as a counter every 4 T-states
+
+        self.code: list[Instruction | None] = [None] * 0x10000  # Instruction decoded at every address
+        self.decoded: list[Instruction] = []  # Every instruction decoded (also those overwritten later)
+        self._code_bytes = bytearray(0x10000)  # 1 for bytes of decoded instructions
+        self.rom_calls: Counter[int] = Counter()  # Address of ROM routines called
+
+    # region memory access
+    def read16(self, addr: int) -> int:
+        return self.mem[addr] | (self.mem[(addr + 1) & 0xFFFF] << 8)
+
+    def write(self, addr: int, value: int) -> None:
+        if addr < self.rom_size:
+            return
+
+        self.mem[addr] = value
+        if self._code_bytes[addr]:  # Self-modifying code
+            for i in range(max(addr - 3, 0), addr + 1):
+                instr = self.code[i]
+                if instr is not None and i + instr.size > addr:
+                    self.code[i] = None
+
+    def write16(self, addr: int, value: int) -> None:
+        self.write(addr, value & 0xFF)
+        self.write((addr + 1) & 0xFFFF, value >> 8)
+
+    def push(self, value: int) -> None:
+        self.sp = (self.sp - 2) & 0xFFFF
+        self.write16(self.sp, value)
+
+    def pop(self) -> int:
+        result = self.read16(self.sp)
+        self.sp = (self.sp + 2) & 0xFFFF
+        return result
+
+    def in_port(self, port: int) -> int:
+        return 0xFF
+
+    def out_port(self, port: int, value: int) -> None:
+        pass
+
+    # endregion
+
+    @property
+    def bc(self) -> int:
+        return (self.b << 8) | self.c
+
+    @property
+    def de(self) -> int:
+        return (self.d << 8) | self.e
+
+    @property
+    def hl(self) -> int:
+        return (self.h << 8) | self.l
+
+    def run(self, entry: int, max_tstates: int = MAX_TSTATES) -> str:
+        """Runs the code from the given address until it returns, or it's stopped.
+        Returns the reason it stopped.
+        """
+        self.pc = entry
+        self.push(EXIT_ADDR)
+        code = self.code
+        next_event = min(self.next_interrupt, max_tstates)
+
+        try:
+            while True:
+                instr = code[self.pc] or self.decode(self.pc)
+                self.pc = (self.pc + instr.size) & 0xFFFF
+                t = instr.execute(self)
+                instr.count += 1
+                instr.tstates += t
+                self.tstates += t
+
+                if self.tstates >= next_event:
+                    if self.tstates >= max_tstates:
+                        raise StopSimulation("T-states limit reached")
+
+                    self.interrupt()
+                    next_event = min(self.next_interrupt, max_tstates)
+
+        except StopSimulation as e:
+            return e.reason
+
+    def interrupt(self) -> None:
+        """Frame interrupt"""
+        self.next_interrupt += FRAME_TSTATES
+        if not self.iff1:
+            return
+
+        if self.im != 2 and self.rom_size:  # What the ROM interrupt routine would do
+            frames = int.from_bytes(self.mem[FRAMES_ADDR : FRAMES_ADDR + 3], "little")
+            self.mem[FRAMES_ADDR : FRAMES_ADDR + 3] = ((frames + 1) & 0xFFFFFF).to_bytes(3, "little")
+            return
+
+        self.iff1 = self.iff2 = False
+        self.push(self.pc)
+        if self.im == 2:
+            self.pc = self.read16((self.i << 8) | 0xFF)
+            self.tstates += 19
+        else:
+            self.pc = 0x38
+            self.tstates += 13
+
+    def decode(self, addr: int) -> Instruction:
+        """Decodes the instruction at the given address, and caches it"""
+        if addr < self.rom_size:
+            instr = Instruction(addr, f"ROM {addr:04X}h", 0, _rom_routine(addr))
+            self.code[addr] = instr
+            self.decoded.append(instr)
+            return instr
+
+        mem = self.mem
+        b0 = mem[addr]
+        opcode = DECODE_TABLE.get((b0,))
+        if opcode is None:
+            b1 = mem[(addr + 1) & 0xFFFF]
+            key = (b0, b1, mem[(addr + 3) & 0xFFFF]) if b0 in (0xDD, 0xFD) and b1 == 0xCB else (b0, b1)
+            opcode = DECODE_TABLE.get(key)
+            if opcode is None:
+                raise StopSimulation(f"unknown opcode {' '.join('%02X' % x for x in key)} at {addr:04X}h")
+
+        args = _decode_args(opcode, mem[addr : addr + opcode.size])
+        instr = Instruction(addr, opcode.asm, opcode.size, _make_instruction(opcode.asm, opcode.T, args))
+        self.code[addr] = instr
+        self.decoded.append(instr)
+        self._code_bytes[addr : addr + opcode.size] = b"\x01" * opcode.size
+        return instr
+
+
+def _make_decode_table() -> dict[tuple[int, ...], Opcode]:
+    """Opcodes by their fixed bytes (i.e. excluding the operands)"""
+    return {tuple(int(x, 16) for x in op.opcode.split() if x != "XX"): op for op in Z80SET.values()}
+
+
+DECODE_TABLE: dict[tuple[int, ...], Opcode] = _make_decode_table()
+
+
+def _decode_args(opcode: Opcode, data: bytes | bytearray) -> tuple[int, ...]:
+    """Returns the values of the operands (N or NN) of the instruction, in order"""
+    operand_bytes = [x for x, y in zip(data, opcode.opcode.split()) if y == "XX"]
+    result = []
+    for arg in ARGre.findall(opcode.asm):
+        result.append(int.from_bytes(bytes(operand_bytes[: len(arg)]), "little"))
+        del operand_bytes[: len(arg)]
+
+    return tuple(result)
+
+
+def _signed(x: int) -> int:
+    return x - 256 if x > 127 else x
+
+
+def _rom_routine(addr: int) -> Execute:
+    """Executes a ROM routine at the given address: just returns, except for RST 0 (the program returns there),
+    RST 8 (error report) and RST 28h (the calculator, whose literals are skipped)
+    """
+
+    def execute(cpu: Simulator) -> int:
+        if addr == EXIT_ADDR:
+            raise StopSimulation("program finished")
+
+        cpu.rom_calls[addr] += 1
+        cpu.pc = cpu.pop()
+        if addr == 0x08:
+            raise StopSimulation(f"error report {cpu.mem[cpu.pc]} (RST 8 at {(cpu.pc - 1) & 0xFFFF:04X}h)")
+
+        if addr == 0x28:
+            cpu.pc = _skip_calculator_literals(cpu.mem, cpu.pc)
+
+        return 0
+
+    return execute
+
+
+def _skip_calculator_literals(mem: bytearray, addr: int) -> int:
+    """Returns the address after the calculator literals (RST 28h ... end-calc) starting at addr"""
+    while (op := mem[addr]) != 0x38:  # end-calc
+        addr += 1
+        if op in (0x00, 0x33):  # jump-true, jump: followed by an offset
+            addr += 1
+        elif op == 0x34:  # stk-data: followed by a number (first byte has its length)
+            length = (mem[addr] >> 6) + 2
+            if not mem[addr] & 0x3F:
+                length += 1
+            addr += length
+
+    return (addr + 1) & 0xFFFF
+
+
+# region operands
+def _getter8(operand: str, args: list[int]) -> Getter:
+    """Getter of an 8-bit operand. Values of immediate operands are taken from args"""
+    if operand in REGS8:
+        return attrgetter(REGS8[operand])
+
+    match operand:
+        case "N":
+            n = args.pop(0)
+            return lambda cpu: n
+        case "R":
+            return lambda cpu: (cpu.r & 0x80) | ((cpu.r + ((cpu.tstates - cpu._r_tstates) >> 2)) & 0x7F)
+        case "IXH" | "IYH":
+            get16 = attrgetter(operand[:2].lower())
+            return lambda cpu: get16(cpu) >> 8
+        case "IXL" | "IYL":
+            get16 = attrgetter(operand[:2].lower())
+            return lambda cpu: get16(cpu) & 0xFF
+        case "(NN)":
+            nn = args.pop(0)
+            return lambda cpu: cpu.mem[nn]
+
+    addr = _address(operand, args)
+    return lambda cpu: cpu.mem[addr(cpu)]
+
+
+def _setter8(operand: str, args: list[int]) -> Setter:
+    """Setter of an 8-bit operand. Values of immediate operands are taken from args"""
+    if operand in REGS8:
+        attr = REGS8[operand]
+        return lambda cpu, value: setattr(cpu, attr, value)
+
+    match operand:
+        case "R":
+
+            def set_r(cpu: Simulator, value: int) -> None:
+                cpu.r = value
+                cpu._r_tstates = cpu.tstates
+
+            return set_r
+        case "IXH" | "IYH":
+            attr = operand[:2].lower()
+            return lambda cpu, value: setattr(cpu, attr, (value << 8) | (getattr(cpu, attr) & 0xFF))
+        case "IXL" | "IYL":
+            attr = operand[:2].lower()
+            return lambda cpu, value: setattr(cpu, attr, (getattr(cpu, attr) & 0xFF00) | value)
+        case "(NN)":
+            nn = args.pop(0)
+            return lambda cpu, value: cpu.write(nn, value)
+
+    addr = _address(operand, args)
+    return lambda cpu, value: cpu.write(addr(cpu), value)
+
+
+def _address(operand: str, args: list[int]) -> Getter:
+    """Address of a memory operand, i.e. (HL) or (IX+N)"""
+    match operand:
+        case "(HL)":
+            return lambda cpu: (cpu.h << 8) | cpu.l
+        case "(BC)":
+            return lambda cpu: (cpu.b << 8) | cpu.c
+        case "(DE)":
+            return lambda cpu: (cpu.d << 8) | cpu.e
+
+    m = RE_INDEXED.match(operand)
+    assert m is not None, f"Unknown operand {operand}"
+    get16 = attrgetter(m.group(1).lower())
+    d = _signed(args.pop(0))
+    return lambda cpu: (get16(cpu) + d) & 0xFFFF
+
+
+def _getter16(operand: str, args: list[int]) -> Getter:
+    if operand in ("SP", "IX", "IY"):
+        return attrgetter(operand.lower())
+
+    if operand in REGS16:
+        hi, lo = operand[0].lower(), operand[1].lower()
+        get_hi, get_lo = attrgetter(hi), attrgetter(lo)
+        return lambda cpu: (get_hi(cpu) << 8) | get_lo(cpu)
+
+    nn = args.pop(0)
+    if operand == "NN":
+        return lambda cpu: nn
+
+    assert operand == "(NN)", f"Unknown operand {operand}"
+    return lambda cpu: cpu.read16(nn)
+
+
+def _setter16(operand: str, args: list[int]) -> Setter:
+    if operand in ("SP", "IX", "IY"):
+        attr = operand.lower()
+        return lambda cpu, value: setattr(cpu, attr, value)
+
+    if operand in REGS16:
+        hi, lo = operand[0].lower(), operand[1].lower()
+
+        def set_pair(cpu: Simulator, value: int) -> None:
+            setattr(cpu, hi, value >> 8)
+            setattr(cpu, lo, value & 0xFF)
+
+        return set_pair
+
+    assert operand == "(NN)", f"Unknown operand {operand}"
+    nn = args.pop(0)
+    return lambda cpu, value: cpu.write16(nn, value)
+
+
+def _is16(operand: str) -> bool:
+    return operand in REGS16
+
+
+# endregion
+
+
+# region ALU
+def _add8(cpu: Simulator, a: int, value: int, carry: int) -> int:
+    r = a + value + carry
+    res = r & 0xFF
+    cpu.f = SZ53[res] | (r >> 8) | ((a ^ value ^ res) & FLAG_H) | (((a ^ value ^ 0x80) & (a ^ res) & 0x80) >> 5)
+    return res
+
+
+def _sub8(cpu: Simulator, a: int, value: int, carry: int) -> int:
+    r = a - value - carry
+    res = r & 0xFF
+    cpu.f = (
+        SZ53[res]
+        | ((r >> 8) & FLAG_C)
+        | FLAG_N
+        | ((a ^ value ^ res) & FLAG_H)
+        | (((a ^ value) & (a ^ res) & 0x80) >> 5)
+    )
+    return res
+
+
+def _alu8(op: str, get: Getter, tstates: int) -> Execute:
+    """8-bit arithmetic and logic operations with the accumulator"""
+    match op:
+        case "ADD" | "ADC":
+            use_carry = op == "ADC"
+
+            def add(cpu: Simulator) -> int:
+                cpu.a = _add8(cpu, cpu.a, get(cpu), cpu.f & FLAG_C if use_carry else 0)
+                return tstates
+
+            return add
+        case "SUB" | "SBC":
+            use_carry = op == "SBC"
+
+            def sub(cpu: Simulator) -> int:
+                cpu.a = _sub8(cpu, cpu.a, get(cpu), cpu.f & FLAG_C if use_carry else 0)
+                return tstates
+
+            return sub
+        case "CP":
+
+            def cp(cpu: Simulator) -> int:
+                value = get(cpu)
+                _sub8(cpu, cpu.a, value, 0)
+                cpu.f = (cpu.f & ~FLAGS_XY) | (value & FLAGS_XY)
+                return tstates
+
+            return cp
+        case "AND":
+
+            def and_(cpu: Simulator) -> int:
+                cpu.a &= get(cpu)
+                cpu.f = SZ53P[cpu.a] | FLAG_H
+                return tstates
+
+            return and_
+        case "OR":
+
+            def or_(cpu: Simulator) -> int:
+                cpu.a |= get(cpu)
+                cpu.f = SZ53P[cpu.a]
+                return tstates
+
+            return or_
+
+    assert op == "XOR"
+
+    def xor(cpu: Simulator) -> int:
+        cpu.a ^= get(cpu)
+        cpu.f = SZ53P[cpu.a]
+        return tstates
+
+    return xor
+
+
+def _alu16(op: str, dst: str, src: str, args: list[int], tstates: int) -> Execute:
+    """16-bit ADD, ADC and SBC"""
+    get_dst, set_dst = _getter16(dst, []), _setter16(dst, [])
+    if src in ("A", "NN"):  # ZX Next ADD rr,A and ADD rr,NN: flags are not affected
+        get_src = attrgetter("a") if src == "A" else _getter16(src, args)
+
+        def add_next(cpu: Simulator) -> int:
+            set_dst(cpu, (get_dst(cpu) + get_src(cpu)) & 0xFFFF)
+            return tstates
+
+        return add_next
+
+    get_src = _getter16(src, args)
+
+    if op == "ADD":
+
+        def add(cpu: Simulator) -> int:
+            a, b = get_dst(cpu), get_src(cpu)
+            r = a + b
+            cpu.f = (cpu.f & FLAGS_SZP) | (r >> 16) | (((a ^ b ^ r) >> 8) & FLAG_H) | ((r >> 8) & FLAGS_XY)
+            set_dst(cpu, r & 0xFFFF)
+            return tstates
+
+        return add
+
+    is_sbc = op == "SBC"
+
+    def adc_sbc(cpu: Simulator) -> int:
+        a, b = get_dst(cpu), get_src(cpu)
+        if is_sbc:
+            r = a - b - (cpu.f & FLAG_C)
+            overflow = ((a ^ b) & (a ^ r) & 0x8000) >> 13
+        else:
+            r = a + b + (cpu.f & FLAG_C)
+            overflow = ((a ^ b ^ 0x8000) & (a ^ r) & 0x8000) >> 13
+
+        res = r & 0xFFFF
+        cpu.f = (
+            ((res >> 8) & (FLAG_S | FLAGS_XY))
+            | (0 if res else FLAG_Z)
+            | ((r >> 16) & FLAG_C)
+            | (((a ^ b ^ res) >> 8) & FLAG_H)
+            | overflow
+            | (FLAG_N if is_sbc else 0)
+        )
+        set_dst(cpu, res)
+        return tstates
+
+    return adc_sbc
+
+
+def _inc_dec(op: str, operand: str, args: list[int], tstates: int) -> Execute:
+    delta = 1 if op == "INC" else -1
+
+    if _is16(operand):
+        get16, set16 = _getter16(operand, []), _setter16(operand, [])
+
+        def inc_dec16(cpu: Simulator) -> int:
+            set16(cpu, (get16(cpu) + delta) & 0xFFFF)
+            return tstates
+
+        return inc_dec16
+
+    get, set_ = _getter8(operand, list(args)), _setter8(operand, args)
+
+    def inc_dec8(cpu: Simulator) -> int:
+        value = get(cpu)
+        res = (value + delta) & 0xFF
+        if delta > 0:
+            f = (FLAG_H if value & 0x0F == 0x0F else 0) | (FLAG_PV if value == 0x7F else 0)
+        else:
+            f = FLAG_N | (FLAG_H if not value & 0x0F else 0) | (FLAG_PV if value == 0x80 else 0)
+
+        cpu.f = (cpu.f & FLAG_C) | SZ53[res] | f
+        set_(cpu, res)
+        return tstates
+
+    return inc_dec8
+
+
+# Shifts and rotations (CB prefix): operation -> (value, carry flag) -> (result, new carry)
+SHIFTS: dict[str, Callable[[int, int], tuple[int, int]]] = {
+    "RLC": lambda v, c: (((v << 1) | (v >> 7)) & 0xFF, v >> 7),
+    "RRC": lambda v, c: ((v >> 1) | ((v & 1) << 7), v & 1),
+    "RL": lambda v, c: (((v << 1) | c) & 0xFF, v >> 7),
+    "RR": lambda v, c: ((v >> 1) | (c << 7), v & 1),
+    "SLA": lambda v, c: ((v << 1) & 0xFF, v >> 7),
+    "SRA": lambda v, c: ((v >> 1) | (v & 0x80), v & 1),
+    "SLL": lambda v, c: (((v << 1) | 1) & 0xFF, v >> 7),
+    "SRL": lambda v, c: (v >> 1, v & 1),
+}
+
+
+def _shift(op: str, operand: str, args: list[int], tstates: int) -> Execute:
+    shift = SHIFTS[op]
+    get, set_ = _getter8(operand, list(args)), _setter8(operand, args)
+
+    def execute(cpu: Simulator) -> int:
+        res, carry = shift(get(cpu), cpu.f & FLAG_C)
+        cpu.f = SZ53P[res] | carry
+        set_(cpu, res)
+        return tstates
+
+    return execute
+
+
+def _shift_a(op: str, tstates: int) -> Execute:
+    """RLCA, RRCA, RLA and RRA: like the CB ones, but only affecting H, N and C flags"""
+    shift = SHIFTS[op[:-1]]
+
+    def execute(cpu: Simulator) -> int:
+        cpu.a, carry = shift(cpu.a, cpu.f & FLAG_C)
+        cpu.f = (cpu.f & FLAGS_SZP) | (cpu.a & FLAGS_XY) | carry
+        return tstates
+
+    return execute
+
+
+def _bit(op: str, bit: int, operand: str, args: list[int], tstates: int) -> Execute:
+    mask = 1 << bit
+    get = _getter8(operand, list(args))
+
+    if op == "BIT":
+
+        def bit_(cpu: Simulator) -> int:
+            value = get(cpu)
+            m = value & mask
+            cpu.f = (cpu.f & FLAG_C) | FLAG_H | (m & FLAG_S) | (0 if m else FLAG_Z | FLAG_PV) | (value & FLAGS_XY)
+            return tstates
+
+        return bit_
+
+    set_ = _setter8(operand, args)
+    if op == "SET":
+
+        def set_bit(cpu: Simulator) -> int:
+            set_(cpu, get(cpu) | mask)
+            return tstates
+
+        return set_bit
+
+    def res_bit(cpu: Simulator) -> int:
+        set_(cpu, get(cpu) & ~mask)
+        return tstates
+
+    return res_bit
+
+
+def _daa(cpu: Simulator) -> int:
+    a, f = cpu.a, cpu.f
+    correction = 0
+    carry = f & FLAG_C
+    if f & FLAG_H or a & 0x0F > 9:
+        correction = 0x06
+    if carry or a > 0x99:
+        correction |= 0x60
+        carry = FLAG_C
+
+    if f & FLAG_N:
+        half = f & FLAG_H and a & 0x0F < 6
+        res = (a - correction) & 0xFF
+    else:
+        half = a & 0x0F > 9
+        res = (a + correction) & 0xFF
+
+    cpu.a = res
+    cpu.f = SZ53P[res] | (FLAG_H if half else 0) | (f & FLAG_N) | carry
+    return 4
+
+
+# endregion
+
+
+# region block instructions
+def _block(op: str, tstates: int) -> Execute:
+    """LDI, CPI, INI, OUTI, their decrementing versions, and the repeating ones (which execute an iteration
+    every time)
+    """
+    repeat = op.endswith("R") and op != "OUTR"
+    base = op[:-1] if repeat else op
+    if base in ("OTI", "OTD"):
+        base = "OUT" + base[-1]
+    delta = -1 if base.endswith("D") else 1
+    short = SHORT_TSTATES.get(op, tstates)
+
+    if base in ("LDI", "LDD"):
+
+        def ld(cpu: Simulator) -> int:
+            hl, de, bc = cpu.hl, cpu.de, (cpu.bc - 1) & 0xFFFF
+            value = cpu.mem[hl]
+            cpu.write(de, value)
+            hl, de = (hl + delta) & 0xFFFF, (de + delta) & 0xFFFF
+            cpu.h, cpu.l, cpu.d, cpu.e, cpu.b, cpu.c = hl >> 8, hl & 0xFF, de >> 8, de & 0xFF, bc >> 8, bc & 0xFF
+            n = value + cpu.a
+            cpu.f = (cpu.f & (FLAG_S | FLAG_Z | FLAG_C)) | (FLAG_PV if bc else 0) | (n & FLAG_X) | ((n << 4) & FLAG_Y)
+            if repeat and bc:
+                cpu.pc = (cpu.pc - 2) & 0xFFFF
+                return tstates
+            return short
+
+        return ld
+
+    if base in ("CPI", "CPD"):
+
+        def cp(cpu: Simulator) -> int:
+            hl, bc = cpu.hl, (cpu.bc - 1) & 0xFFFF
+            value = cpu.mem[hl]
+            res = (cpu.a - value) & 0xFF
+            half = (cpu.a ^ value ^ res) & FLAG_H
+            hl = (hl + delta) & 0xFFFF
+            cpu.h, cpu.l, cpu.b, cpu.c = hl >> 8, hl & 0xFF, bc >> 8, bc & 0xFF
+            n = res - (1 if half else 0)
+            cpu.f = (
+                (cpu.f & FLAG_C)
+                | FLAG_N
+                | (SZ53[res] & ~FLAGS_XY)
+                | half
+                | (FLAG_PV if bc else 0)
+                | (n & FLAG_X)
+                | ((n << 4) & FLAG_Y)
+            )
+            if repeat and bc and res:
+                cpu.pc = (cpu.pc - 2) & 0xFFFF
+                return tstates
+            return short
+
+        return cp
+
+    is_in = base in ("INI", "IND")
+
+    def io(cpu: Simulator) -> int:
+        hl = cpu.hl
+        if is_in:
+            cpu.write(hl, cpu.in_port(cpu.bc))
+            cpu.b = (cpu.b - 1) & 0xFF
+        else:
+            cpu.b = (cpu.b - 1) & 0xFF
+            cpu.out_port(cpu.bc, cpu.mem[hl])
+
+        hl = (hl + delta) & 0xFFFF
+        cpu.h, cpu.l = hl >> 8, hl & 0xFF
+        cpu.f = SZ53[cpu.b] | FLAG_N | (cpu.f & FLAG_C)
+        if repeat and cpu.b:
+            cpu.pc = (cpu.pc - 2) & 0xFFFF
+            return tstates
+        return short
+
+    return io
+
+
+# endregion
+
+
+# region control flow
+def _jump(op: str, operands: list[str], args: list[int], tstates: int) -> Execute:
+    """JP, JR, DJNZ, CALL, RET and RST"""
+    cond = CONDITIONS[operands[0]] if len(operands) > 1 or (op == "RET" and operands) else None
+    short = SHORT_TSTATES.get(op, tstates)
+
+    match op:
+        case "JP" if operands[-1] in ("(HL)", "(IX)", "(IY)"):
+            get16 = _getter16(operands[-1][1:-1], [])
+
+            def jp_reg(cpu: Simulator) -> int:
+                cpu.pc = get16(cpu)
+                return tstates
+
+            return jp_reg
+        case "JP":
+            nn = args[0]
+
+            def jp(cpu: Simulator) -> int:
+                if cond is None or cond(cpu.f):
+                    cpu.pc = nn
+                return tstates
+
+            return jp
+        case "JR":
+            d = _signed(args[0])
+
+            def jr(cpu: Simulator) -> int:
+                if cond is None or cond(cpu.f):
+                    cpu.pc = (cpu.pc + d) & 0xFFFF
+                    return tstates
+                return short
+
+            return jr
+        case "DJNZ":
+            d = _signed(args[0])
+
+            def djnz(cpu: Simulator) -> int:
+                cpu.b = (cpu.b - 1) & 0xFF
+                if cpu.b:
+                    cpu.pc = (cpu.pc + d) & 0xFFFF
+                    return tstates
+                return short
+
+            return djnz
+        case "CALL":
+            nn = args[0]
+
+            def call(cpu: Simulator) -> int:
+                if cond is None or cond(cpu.f):
+                    cpu.push(cpu.pc)
+                    cpu.pc = nn
+                    return tstates
+                return short
+
+            return call
+        case "RET" | "RETI" | "RETN":
+            restore_iff = op != "RET"
+
+            def ret(cpu: Simulator) -> int:
+                if cond is None or cond(cpu.f):
+                    cpu.pc = cpu.pop()
+                    if restore_iff:
+                        cpu.iff1 = cpu.iff2
+                    return tstates
+                return short
+
+            return ret
+
+    assert op == "RST"
+    addr = int(operands[0][:-1], 16)
+
+    def rst(cpu: Simulator) -> int:
+        cpu.push(cpu.pc)
+        cpu.pc = addr
+        return tstates
+
+    return rst
+
+
+# endregion
+
+
+def _ld(dst: str, src: str, args: list[int], tstates: int) -> Execute:
+    if _is16(dst) or _is16(src):
+        get16 = _getter16(src, args)
+        set16 = _setter16(dst, args)
+
+        def ld16(cpu: Simulator) -> int:
+            set16(cpu, get16(cpu))
+            return tstates
+
+        return ld16
+
+    # The order of the operands in args is the one in the mnemonic
+    set_ = _setter8(dst, args)
+    get = _getter8(src, args)
+    if dst == "A" and src in ("I", "R"):
+
+        def ld_a_ir(cpu: Simulator) -> int:
+            cpu.a = get(cpu)
+            cpu.f = (cpu.f & FLAG_C) | SZ53[cpu.a] | (FLAG_PV if cpu.iff2 else 0)
+            return tstates
+
+        return ld_a_ir
+
+    def ld8(cpu: Simulator) -> int:
+        set_(cpu, get(cpu))
+        return tstates
+
+    return ld8
+
+
+def _ex(dst: str, src: str, tstates: int) -> Execute:
+    match dst, src:
+        case "DE", "HL":
+
+            def ex_de_hl(cpu: Simulator) -> int:
+                cpu.d, cpu.e, cpu.h, cpu.l = cpu.h, cpu.l, cpu.d, cpu.e
+                return tstates
+
+            return ex_de_hl
+        case "AF", "AF'":
+
+            def ex_af(cpu: Simulator) -> int:
+                cpu.a, cpu.f, cpu.a_, cpu.f_ = cpu.a_, cpu.f_, cpu.a, cpu.f
+                return tstates
+
+            return ex_af
+
+    get16, set16 = _getter16(src, []), _setter16(src, [])
+
+    def ex_sp(cpu: Simulator) -> int:
+        value = cpu.read16(cpu.sp)
+        cpu.write16(cpu.sp, get16(cpu))
+        set16(cpu, value)
+        return tstates
+
+    return ex_sp
+
+
+def _exx(cpu: Simulator) -> int:
+    cpu.b, cpu.c, cpu.d, cpu.e, cpu.h, cpu.l, cpu.b_, cpu.c_, cpu.d_, cpu.e_, cpu.h_, cpu.l_ = (
+        cpu.b_,
+        cpu.c_,
+        cpu.d_,
+        cpu.e_,
+        cpu.h_,
+        cpu.l_,
+        cpu.b,
+        cpu.c,
+        cpu.d,
+        cpu.e,
+        cpu.h,
+        cpu.l,
+    )
+    return 4
+
+
+def _unsupported(mnemonic: str) -> Execute:
+    def execute(cpu: Simulator) -> int:
+        raise StopSimulation(f"unsupported instruction {mnemonic} at {(cpu.pc - Z80SET[mnemonic].size) & 0xFFFF:04X}h")
+
+    return execute
+
+
+def _const(tstates: int, func: Callable[[Simulator], None]) -> Execute:
+    """Instruction taking always the same T-states"""
+
+    def execute(cpu: Simulator) -> int:
+        func(cpu)
+        return tstates
+
+    return execute
+
+
+def _set_attrs(**values) -> Callable[[Simulator], None]:
+    def func(cpu: Simulator) -> None:
+        for k, v in values.items():
+            setattr(cpu, k, v)
+
+    return func
+
+
+def _halt(cpu: Simulator) -> int:
+    """Waits for the next interrupt"""
+    if not cpu.iff1:
+        raise StopSimulation(f"HALT with interrupts disabled at {(cpu.pc - 1) & 0xFFFF:04X}h")
+
+    return max(cpu.next_interrupt - cpu.tstates, 4)
+
+
+def _cpl(cpu: Simulator) -> None:
+    cpu.a ^= 0xFF
+    cpu.f = (cpu.f & (FLAGS_SZP | FLAG_C)) | FLAG_H | FLAG_N | (cpu.a & FLAGS_XY)
+
+
+def _neg(cpu: Simulator) -> None:
+    cpu.a = _sub8(cpu, 0, cpu.a, 0)
+
+
+def _scf(cpu: Simulator) -> None:
+    cpu.f = (cpu.f & FLAGS_SZP) | (cpu.a & FLAGS_XY) | FLAG_C
+
+
+def _ccf(cpu: Simulator) -> None:
+    carry = cpu.f & FLAG_C
+    cpu.f = (cpu.f & FLAGS_SZP) | (cpu.a & FLAGS_XY) | (FLAG_H if carry else 0) | (carry ^ FLAG_C)
+
+
+def _rld(cpu: Simulator) -> None:
+    hl, a = cpu.hl, cpu.a
+    value = cpu.mem[hl]
+    cpu.write(hl, ((value << 4) | (a & 0x0F)) & 0xFF)
+    cpu.a = (a & 0xF0) | (value >> 4)
+    cpu.f = (cpu.f & FLAG_C) | SZ53P[cpu.a]
+
+
+def _rrd(cpu: Simulator) -> None:
+    hl, a = cpu.hl, cpu.a
+    value = cpu.mem[hl]
+    cpu.write(hl, ((a & 0x0F) << 4) | (value >> 4))
+    cpu.a = (a & 0xF0) | (value & 0x0F)
+    cpu.f = (cpu.f & FLAG_C) | SZ53P[cpu.a]
+
+
+# region ZX Next
+def _mul_de(cpu: Simulator) -> None:
+    de = cpu.d * cpu.e
+    cpu.d, cpu.e = de >> 8, de & 0xFF
+
+
+def _swapnib(cpu: Simulator) -> None:
+    cpu.a = ((cpu.a << 4) | (cpu.a >> 4)) & 0xFF
+
+
+def _mirror(cpu: Simulator) -> None:
+    cpu.a = int(f"{cpu.a:08b}"[::-1], 2)
+
+
+def _pixelad(cpu: Simulator) -> None:
+    d, e = cpu.d, cpu.e
+    hl = 0x4000 | ((d & 0xC0) << 5) | ((d & 0x07) << 8) | ((d & 0x38) << 2) | (e >> 3)
+    cpu.h, cpu.l = hl >> 8, hl & 0xFF
+
+
+def _pixeldn(cpu: Simulator) -> None:
+    hl = cpu.hl
+    if (hl & 0x0700) != 0x0700:
+        hl += 0x100
+    elif (hl & 0xE0) != 0xE0:
+        hl = (hl & 0xF8FF) + 0x20
+    else:
+        hl = (hl & 0xF81F) + 0x800
+    cpu.h, cpu.l = (hl >> 8) & 0xFF, hl & 0xFF
+
+
+def _setae(cpu: Simulator) -> None:
+    cpu.a = 0x80 >> (cpu.e & 7)
+
+
+# Barrel shifts of DE by B: (DE, shift) -> DE
+BARREL_SHIFTS: dict[str, Callable[[int, int], int]] = {
+    "BSLA": lambda de, n: (de << n) & 0xFFFF,
+    "BSRA": lambda de, n: ((de - 0x10000 if de & 0x8000 else de) >> n) & 0xFFFF,
+    "BSRL": lambda de, n: de >> n,
+    "BSRF": lambda de, n: ((de | 0xFFFF0000) >> n) & 0xFFFF,
+    "BRLC": lambda de, n: ((de << (n & 15)) | (de >> (16 - (n & 15)))) & 0xFFFF,
+}
+
+
+def _barrel_shift(op: str) -> Callable[[Simulator], None]:
+    shift = BARREL_SHIFTS[op]
+
+    def func(cpu: Simulator) -> None:
+        de = shift(cpu.de, cpu.b & 0x1F)
+        cpu.d, cpu.e = de >> 8, de & 0xFF
+
+    return func
+
+
+# endregion
+
+
+# Instructions with no operands
+SIMPLE: dict[str, Callable[[Simulator], None]] = {
+    "NOP": lambda cpu: None,
+    "DI": _set_attrs(iff1=False, iff2=False),
+    "EI": _set_attrs(iff1=True, iff2=True),
+    "IM 0": _set_attrs(im=0),
+    "IM 1": _set_attrs(im=1),
+    "IM 2": _set_attrs(im=2),
+    "CPL": _cpl,
+    "NEG": _neg,
+    "SCF": _scf,
+    "CCF": _ccf,
+    "RLD": _rld,
+    "RRD": _rrd,
+    "MUL D,E": _mul_de,
+    "SWAPNIB": _swapnib,
+    "MIRROR": _mirror,
+    "PIXELAD": _pixelad,
+    "PIXELDN": _pixeldn,
+    "SETAE": _setae,
+    **{f"{x} DE,B": _barrel_shift(x) for x in BARREL_SHIFTS},
+}
+
+
+@cache
+def _parse_mnemonic(mnemonic: str) -> tuple[str, list[str]]:
+    op, _, operands = mnemonic.partition(" ")
+    return op, operands.split(",") if operands else []
+
+
+def _make_instruction(mnemonic: str, tstates: int, args_: tuple[int, ...]) -> Execute:
+    """Returns a function executing the given instruction (as in the opcode table) with the given operands"""
+    if mnemonic in SIMPLE:
+        return _const(tstates, SIMPLE[mnemonic])
+
+    op, operands = _parse_mnemonic(mnemonic)
+    args = list(args_)
+
+    match op:
+        case "LD" if len(operands) == 2:
+            return _ld(operands[0], operands[1], args, tstates)
+        case "ADD" | "ADC" | "SBC" if _is16(operands[0]):
+            return _alu16(op, operands[0], operands[1], args, tstates)
+        case "ADD" | "ADC" | "SUB" | "SBC" | "AND" | "OR" | "XOR" | "CP":
+            return _alu8(op, _getter8(operands[-1], args), tstates)
+        case "INC" | "DEC":
+            return _inc_dec(op, operands[0], args, tstates)
+        case "RLCA" | "RRCA" | "RLA" | "RRA":
+            return _shift_a(op, tstates)
+        case op if op in SHIFTS:
+            return _shift(op, operands[0], args, tstates)
+        case "BIT" | "SET" | "RES":
+            return _bit(op, int(operands[0]), operands[1], args, tstates)
+        case "JP" | "JR" | "DJNZ" | "CALL" | "RET" | "RETI" | "RETN" | "RST" if mnemonic != "JP (C)":
+            return _jump(op, operands, args, tstates)
+        case "PUSH" if operands[0] == "NN":  # ZX Next PUSH NN stores the operand big-endian
+            value = ((args[0] & 0xFF) << 8) | (args[0] >> 8)
+            return _const(tstates, lambda cpu: cpu.push(value))
+        case "PUSH":
+            get16 = _getter16(operands[0], args)
+            return _const(tstates, lambda cpu: cpu.push(get16(cpu)))
+        case "POP":
+            set16 = _setter16(operands[0], args)
+            return _const(tstates, lambda cpu: set16(cpu, cpu.pop()))
+        case "EX":
+            return _ex(operands[0], operands[1], tstates)
+        case "EXX":
+            return _exx
+        case "DAA":
+            return _daa
+        case "HALT":
+            return _halt
+        case "LDI" | "LDD" | "LDIR" | "LDDR" | "CPI" | "CPD" | "CPIR" | "CPDR":
+            return _block(op, tstates)
+        case "INI" | "IND" | "INIR" | "INDR" | "OUTI" | "OUTD" | "OTIR" | "OTDR":
+            return _block(op, tstates)
+        case "IN":
+            return _in(operands[0], operands[1], args, tstates)
+        case "OUT":
+            return _out(operands[0], operands[1], args, tstates)
+        case "NEXTREG":  # Next registers are not simulated
+            return _const(tstates, lambda cpu: None)
+        case "TEST":
+            n = args[0]
+            return _const(tstates, lambda cpu: setattr(cpu, "f", SZ53P[cpu.a & n] | FLAG_H))
+
+    return _unsupported(mnemonic)
+
+
+def _in(dst: str, src: str, args: list[int], tstates: int) -> Execute:
+    set_ = _setter8(dst, [])
+    if src == "(C)":
+
+        def in_c(cpu: Simulator) -> int:
+            value = cpu.in_port(cpu.bc)
+            set_(cpu, value)
+            cpu.f = (cpu.f & FLAG_C) | SZ53P[value]
+            return tstates
+
+        return in_c
+
+    n = args[0]
+    return _const(tstates, lambda cpu: set_(cpu, cpu.in_port((cpu.a << 8) | n)))
+
+
+def _out(dst: str, src: str, args: list[int], tstates: int) -> Execute:
+    get = _getter8(src, [])
+    if dst == "(C)":
+        return _const(tstates, lambda cpu: cpu.out_port(cpu.bc, get(cpu)))
+
+    n = args[0]
+    return _const(tstates, lambda cpu: cpu.out_port((cpu.a << 8) | n, get(cpu)))
+
+
+@dataclass
+class Simulation:
+    """Result of a simulation"""
+
+    stop_reason: str
+    tstates: int
+    instructions: int
+    by_label: dict[str, tuple[int, int]] = field(default_factory=dict)  # Label -> (instructions, T-states)
+    histogram: dict[str, tuple[int, int]] = field(default_factory=dict)  # Mnemonic -> (count, T-states)
+    rom_calls: dict[int, int] = field(default_factory=dict)  # ROM address -> times called
+
+
+def simulate(memory: Memory, entry: int, max_tstates: int = MAX_TSTATES) -> Simulation:
+    """Runs the program assembled in the given memory, starting at entry, and returns the result.
+    T-states spent in every instruction are attributed to the closest label before it.
+    """
+    rom_size = min(ROM_SIZE, memory.min_address)  # No ROM if the program is there
+    cpu = Simulator(memory.memory_bytes, rom_size)
+    stop_reason = cpu.run(entry, max_tstates)
+
+    labels = sorted((x.value, x.name) for x in memory.global_labels.values() if x.is_address and x.defined)
+    addresses = [x[0] for x in labels]
+
+    by_label: Counter[str] = Counter()
+    by_label_count: Counter[str] = Counter()
+    histogram: Counter[str] = Counter()
+    histogram_count: Counter[str] = Counter()
+    for instr in cpu.decoded:
+        if not instr.count:
+            continue
+
+        if instr.address < rom_size:
+            label = instr.mnemonic
+        else:
+            i = bisect_right(addresses, instr.address)
+            label = labels[i - 1][1] if i else f"{instr.address:04X}h"
+
+        by_label[label] += instr.tstates
+        by_label_count[label] += instr.count
+        histogram[instr.mnemonic] += instr.tstates
+        histogram_count[instr.mnemonic] += instr.count
+
+    return Simulation(
+        stop_reason=stop_reason,
+        tstates=cpu.tstates,
+        instructions=sum(histogram_count.values()),
+        by_label={k: (by_label_count[k], v) for k, v in by_label.most_common()},
+        histogram={k: (histogram_count[k], v) for k, v in histogram.most_common()},
+        rom_calls=dict(cpu.rom_calls),
+    )
+
+
+def _table(header: tuple[str, ...], rows: list[tuple[str, ...]]) -> str:
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    return "".join(
+        "  ".join([row[0].ljust(widths[0]), *(x.rjust(w) for x, w in zip(row[1:], widths[1:]))]) + "\n"
+        for row in [header, *rows]
+    )
+
+
+def report(simulation: Simulation, program: str) -> str:
+    """Returns the result of the simulation as text: totals, T-states by label and by instruction"""
+    total = simulation.tstates or 1
+
+    def rows(items: dict[str, tuple[int, int]]) -> list[tuple[str, ...]]:
+        return [(k, str(count), str(t), f"{100 * t / total:.2f}") for k, (count, t) in items.items()]
+
+    return "\n".join(
+        [
+            f"Program: {program}\n"
+            f"Stopped: {simulation.stop_reason}\n"
+            f"T-states: {simulation.tstates} ({simulation.tstates / FRAME_TSTATES:.2f} frames)\n"
+            f"Instructions: {simulation.instructions}\n",
+            _table(("Label", "Instructions", "T-states", "%"), rows(simulation.by_label)),
+            _table(("Instruction", "Count", "T-states", "%"), rows(simulation.histogram)),
+        ]
+    )
+
+
+def write_report(filename: str, simulation: Simulation, program: str) -> None:
+    """Writes the report into the given file ("-" for stdout)"""
+    result = report(simulation, program)
+
+    if filename == "-":
+        sys.stdout.write(result)
+        return
+
+    with open(filename, "wt", encoding="utf-8") as f:
+        f.write(result)
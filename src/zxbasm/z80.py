@@ -773,8 +773,8 @@ Z80SET = {
     "LD IYH,C": Opcode("LD IYH,C", 8, 2, "FD 61"),
     "LD IYH,D": Opcode("LD IYH,D", 8, 2, "FD 62"),
     "LD IYH,E": Opcode("LD IYH,E", 8, 2, "FD 63"),
-    "LD IYH,IYH": Opcode("LD IYH,IYH", 8, 2, "DD 64"),
-    "LD IYH,IYL": Opcode("LD IYH,IYL", 8, 2, "DD 65"),
+    "LD IYH,IYH": Opcode("LD IYH,IYH", 8, 2, "FD 64"),
+    "LD IYH,IYL": Opcode("LD IYH,IYL", 8, 2, "FD 65"),
     "LD IYH,A": Opcode("LD IYH,A", 8, 2, "FD 67"),
     "LD IYL,B": Opcode("LD IYL,B", 8, 2, "FD 68"),
     "LD IYL,C": Opcode("LD IYL,C", 8, 2, "FD 69"),
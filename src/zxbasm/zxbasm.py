@@ -180,16 +180,16 @@ def main(args=None):
     zxbpp.main([OPTIONS.input_filename])
 
     # Now output the result
-    asm_output = zxbpp.OUTPUT
+    asm_output = zxbpp.OUTPUT.getvalue()
     asmparse.assemble(asm_output)
     if global_.has_errors:
         return 1
 
-    if not asmparse.MEMORY.memory_bytes:  # empty seq.
+    if asmparse.MEMORY.is_empty:
         errmsg.warning(0, "Nothing to assemble. Exiting...")
         return 0
 
-    current_org = max(asmparse.MEMORY.memory_bytes.keys() or [0]) + 1
+    current_org = asmparse.MEMORY.max_address + 1
 
     for label, line in asmparse.INITS:
         expr_label = expr.Expr.makenode(asmparse.Container(asmparse.MEMORY.get_label(label, line), line))
@@ -200,7 +200,7 @@ def main(args=None):
             asmparse.MEMORY.add_instruction(asmparse.Asm(0, "JP NN", asmparse.AUTORUN_ADDR))
         else:
             asmparse.MEMORY.add_instruction(
-                asmparse.Asm(0, "JP NN", min(asmparse.MEMORY.orgs.keys()))
+                asmparse.Asm(0, "JP NN", asmparse.MEMORY.min_address)
             )  # To the beginning of binary
 
         asmparse.AUTORUN_ADDR = current_org
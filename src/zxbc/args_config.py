@@ -58,6 +58,7 @@ def parse_options(args: list[str] | None = None) -> Namespace:
     OPTIONS.expected_warnings = gl.EXPECTED_WARNINGS = options.expect_warnings
     OPTIONS.hide_warning_codes = options.hide_warning_codes
     OPTIONS.opt_strategy = options.opt_strategy
+    OPTIONS.cache_dir = options.cache_dir
 
     if options.arch not in arch.AVAILABLE_ARCHITECTURES:
         parser.error(f"Invalid architecture '{options.arch}'")
@@ -154,6 +155,12 @@ def parse_options(args: list[str] | None = None) -> Namespace:
     if OPTIONS.output_file_type == FileType.ASM and options.memory_map:
         parser.error("Option --asm and --mmap cannot be used together")
 
+    if options.timing_report is not None and (options.parse_only or OPTIONS.output_file_type == FileType.IR):
+        parser.error(f"Option --timing-report cannot be used with --parse-only or -f {FileType.IR}")
+
+    if options.simulate is not None and (options.parse_only or OPTIONS.output_file_type in {FileType.ASM, FileType.IR}):
+        parser.error("Option --simulate requires a binary output format")
+
     args = [options.PROGRAM]
     if not os.path.exists(options.PROGRAM):
         parser.error("No such file or directory: '%s'" % args[0])
@@ -8,7 +8,9 @@
 from __future__ import annotations
 
 import argparse
+from collections.abc import Container
 from enum import StrEnum
+from typing import Any
 
 from src import arch
 from src.api import errmsg
@@ -34,12 +36,56 @@ def parse_warning_option(code: str) -> str:
     return code
 
 
+class ArgumentParser(argparse.ArgumentParser):
+    """An argparse.ArgumentParser which keeps the list of its options,
+    so parsed ones can be written back as command line arguments (see to_args).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.options: list[argparse.Action] = []
+        super().__init__(*args, **kwargs)
+
+    def add_argument(self, *args: Any, **kwargs: Any) -> argparse.Action:
+        action = super().add_argument(*args, **kwargs)
+        if action.option_strings:
+            self.options.append(action)
+
+        return action
+
+    def to_args(self, options: argparse.Namespace, exclude: Container[str] = ()) -> list[str]:
+        """Returns the command line arguments (using the long option names) for the
+        options not in their default value, and whose dest is not in exclude.
+        """
+        result = []
+
+        for action in self.options:
+            value = getattr(options, action.dest, action.default)  # i.e. --help is not set
+            if action.dest in exclude or value == action.default:
+                continue
+
+            option = action.option_strings[-1]
+            if action.nargs == 0:  # Flags (counted for -d)
+                result.extend([option] * (value if type(value) is int else 1))
+            elif isinstance(value, list):  # Appended
+                result.extend(f"{option}={x}" for x in value)
+            else:
+                result.append(f"{option}={value}")
+
+        return result
+
+
 # ------------------------------------------------------------
 # Command line parser
 # ------------------------------------------------------------
-def parser() -> argparse.ArgumentParser:
-    parser_ = argparse.ArgumentParser(prefix_chars="-+")
-    parser_.add_argument("PROGRAM", type=str, help="BASIC program file")
+def parser(*, batch: bool = False) -> ArgumentParser:
+    """Returns the zxbc command line parser.
+    If batch is True, several PROGRAMs can be given (see --jobs).
+    """
+    parser_ = ArgumentParser(prefix_chars="-+")
+    if batch:
+        parser_.add_argument("PROGRAM", type=str, nargs="+", help="BASIC program files")
+    else:
+        parser_.add_argument("PROGRAM", type=str, help="BASIC program file")
     parser_.add_argument(
         "-d",
         "--debug",
@@ -62,40 +108,44 @@ def parser() -> argparse.ArgumentParser:
     )
 
     output_file_type_group = parser_.add_mutually_exclusive_group()
-    output_file_type_group.add_argument(
-        "-T",
-        "--tzx",
-        action="store_true",
-        help="Sets output format to .tzx (default is .bin). DEPRECATED. Use -f",
-    )
-    output_file_type_group.add_argument(
-        "-t",
-        "--tap",
-        action="store_true",
-        help="Sets output format to .tap (default is .bin). DEPRECATED. Use -f",
-    )
-    output_file_type_group.add_argument(
-        "-A",
-        "--asm",
-        action="store_true",
-        help="Sets output format to .asm. DEPRECATED. Use -f",
-    )
-    output_file_type_group.add_argument(
-        "-E",
-        "--emit-backend",
-        action="store_true",
-        help="Emits backend code (IR) instead of ASM or binary. DEPRECATED. Use -f",
-    )
-    output_file_type_group.add_argument(
-        "--parse-only", action="store_true", help="Only parses to check for syntax and semantic errors"
-    )
-    output_file_type_group.add_argument(
-        "-f",
-        "--output-format",
-        type=str,
-        choices=[str(x) for x in FileType],
-        required=False,
-        help="Output format",
+    parser_.options.extend(  # Options in groups are not added with parser_.add_argument()
+        [
+            output_file_type_group.add_argument(
+                "-T",
+                "--tzx",
+                action="store_true",
+                help="Sets output format to .tzx (default is .bin). DEPRECATED. Use -f",
+            ),
+            output_file_type_group.add_argument(
+                "-t",
+                "--tap",
+                action="store_true",
+                help="Sets output format to .tap (default is .bin). DEPRECATED. Use -f",
+            ),
+            output_file_type_group.add_argument(
+                "-A",
+                "--asm",
+                action="store_true",
+                help="Sets output format to .asm. DEPRECATED. Use -f",
+            ),
+            output_file_type_group.add_argument(
+                "-E",
+                "--emit-backend",
+                action="store_true",
+                help="Emits backend code (IR) instead of ASM or binary. DEPRECATED. Use -f",
+            ),
+            output_file_type_group.add_argument(
+                "--parse-only", action="store_true", help="Only parses to check for syntax and semantic errors"
+            ),
+            output_file_type_group.add_argument(
+                "-f",
+                "--output-format",
+                type=str,
+                choices=[str(x) for x in FileType],
+                required=False,
+                help="Output format",
+            ),
+        ]
     )
 
     parser_.add_argument(
@@ -217,5 +267,59 @@ def parser() -> argparse.ArgumentParser:
         default=OptimizationStrategy.Auto,
         help=f"Optimization strategy (optimize for speed or size). Default: {OptimizationStrategy.Auto}",
     )
+    parser_.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="Reuses the results of previous compilations (of the same preprocessed program with the same options) "
+        "stored in the given directory, and stores new ones there",
+    )
+    parser_.add_argument(
+        "--profile-passes",
+        type=str,
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="FILE",
+        help="Reports time, peak memory and number of items produced by each compiler pass, as JSON, "
+        "into the given FILE (default: standard output)",
+    )
+    parser_.add_argument(
+        "--peephole-stats",
+        type=str,
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="FILE",
+        help="Reports how many times each peephole optimization rule was tried, matched and applied, the time "
+        "spent on it and the bytes and T-states it saved, into the given FILE (default: standard output)",
+    )
+    parser_.add_argument(
+        "--timing-report",
+        type=str,
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="FILE",
+        help="Reports the size and worst-case T-states of every SUB/FUNCTION, loop body and basic block of the "
+        "optimized program, with their source lines, into the given FILE (default: standard output)",
+    )
+    parser_.add_argument(
+        "--simulate",
+        type=str,
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="FILE",
+        help="Runs the compiled program in a Z80 simulator, and reports the T-states it took, by label and by "
+        "instruction, into the given FILE (default: standard output)",
+    )
+    parser_.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Compiles several PROGRAMs in parallel using the given number of processes (0 = one per CPU)",
+    )
 
     return parser_
@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Batch compilation (zxbc --jobs N PROGRAM...).
+
+Compiles several programs with the same options using a pool of worker processes.
+Since the compiler state is global, every program is compiled in its own job, as
+a compile server does (see server.py). Where available, workers are forked from
+this process, so they start with the compiler already imported and initialized.
+
+The output (stdout and stderr) of every program is written in the order they
+were given once finished, and the exit code is the one of the first program
+that failed (or 0 if none did).
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from src.zxbc import args_parser, server
+
+__all__ = (
+    "is_batch",
+    "main",
+)
+
+
+def is_batch(args: list[str]) -> bool:
+    """Whether the given command line arguments request a batch compilation (-j / --jobs)"""
+    # Cheap check first: -j can only be given as --j[obs][=N] or within -...j[N] short options
+    if not any(x.startswith("--j") or (x[:1] == "-" and x[1:2] != "-" and "j" in x) for x in args):
+        return False
+
+    if any(x in ("-h", "--help", "--version") for x in args):
+        return False  # Handled by the usual (single program) parser
+
+    parser = args_parser.parser(batch=True)
+    parser.exit_on_error = False
+
+    try:
+        options, _ = parser.parse_known_args(args)
+    except argparse.ArgumentError:
+        return False  # Reported when parsing them as a single program
+
+    return options.jobs is not None
+
+
+def _run_job(job: tuple[Callable[[list[str]], int], list[str]]) -> dict[str, Any]:
+    compile_, args = job
+    return server.run_job({"args": args}, compile_)
+
+
+def main(args: list[str], compile_: Callable[[list[str]], int]) -> int:
+    """Entry point for zxbc --jobs N [options] PROGRAM..."""
+    parser = args_parser.parser(batch=True)
+    options = parser.parse_args(args)
+
+    if options.jobs < 0:
+        parser.error("--jobs must be 0 or greater")
+
+    if options.output_file is not None and len(options.PROGRAM) > 1:
+        parser.error("--output cannot be used when compiling several programs")
+
+    common_args = parser.to_args(options, exclude={"jobs"})
+    jobs = [(compile_, [*common_args, "--", program]) for program in options.PROGRAM]
+    num_processes = min(options.jobs or os.cpu_count() or 1, len(jobs))
+
+    if num_processes == 1:
+        return _output_results(map(_run_job, jobs))
+
+    # Forked workers inherit the already imported (and initialized) compiler
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    with multiprocessing.get_context(start_method).Pool(num_processes) as pool:
+        return _output_results(pool.imap(_run_job, jobs))
+
+
+def _output_results(results: Iterable[dict[str, Any]]) -> int:
+    """Outputs every job result in order, and returns the first non-zero exit code (if any)"""
+    exit_code = 0
+
+    for result in results:
+        sys.stdout.write(result["stdout"])
+        sys.stdout.flush()
+        sys.stderr.write(result["stderr"])
+        sys.stderr.flush()
+        exit_code = exit_code or result["exit_code"]
+
+    return exit_code
@@ -0,0 +1,147 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Content-addressed compilation cache (zxbc --cache-dir).
+
+Compilation results (output files and messages) are stored under a key computed from
+everything the compilation depends on once the program has been preprocessed: the
+preprocessed source, the compiler options, the binary files appended to the output
+and the compiler itself (its version and files, including the runtime library).
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+from argparse import Namespace
+from functools import cache
+from typing import Any
+
+from src.api.config import OPTION, OPTIONS
+
+from .version import VERSION
+
+__all__ = (
+    "compute_key",
+    "record_messages",
+    "restore",
+    "store",
+)
+
+# Options not affecting the compilation result
+IGNORED_OPTIONS = {
+    OPTION.STDIN,
+    OPTION.STDOUT,
+    OPTION.STDERR,
+    OPTION.STDERR_FILENAME,
+    OPTION.PROJECT_FILENAME,
+    OPTION.CACHE_DIR,
+}
+
+# Root directory of the compiler files
+COMPILER_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _RecordingStream:
+    """Wraps a text stream, recording everything written to it"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.recorded = io.StringIO()
+
+    def write(self, text: str) -> int:
+        self.recorded.write(text)
+        return self.stream.write(text)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.stream, item)
+
+
+@cache
+def _compiler_signature() -> bytes:
+    """Returns a hash of the compiler version, and the name, size and modification time of every compiler file.
+    It's computed once per process (a running process keeps using the code it loaded anyway).
+    """
+    hash_ = hashlib.sha256(VERSION.encode())
+
+    for root, dirs, files in os.walk(COMPILER_PATH):
+        dirs[:] = sorted(x for x in dirs if x != "__pycache__")
+        for fname in sorted(files):
+            path = os.path.join(root, fname)
+            st = os.stat(path)
+            hash_.update(f"{os.path.relpath(path, COMPILER_PATH)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+
+    return hash_.digest()
+
+
+def compute_key(source: str, options: Namespace) -> str:
+    """Returns the cache key for the given preprocessed source code with the current OPTIONS
+    and the given command line options.
+    """
+    hash_ = hashlib.sha256(_compiler_signature())
+
+    for name, option in sorted(OPTIONS().items()):
+        if name not in IGNORED_OPTIONS:
+            hash_.update(f"{name}={option.value!r}\n".encode())
+
+    for fname in (options.append_binary or []) + [""] + (options.append_headless_binary or []):
+        hash_.update(fname.encode())
+        if fname:
+            with open(fname, "rb") as f:
+                hash_.update(hashlib.sha256(f.read()).digest())
+
+    hash_.update(source.encode())
+    return hash_.hexdigest()
+
+
+def _cache_filename(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}.pickle")
+
+
+def record_messages() -> None:
+    """Starts recording messages written to OPTIONS.stderr, to be stored in the cache"""
+    OPTIONS.stderr = _RecordingStream(OPTIONS.stderr)
+
+
+def restore(cache_dir: str, key: str) -> bool:
+    """Writes the output files and messages stored for the given key, if found.
+    Returns whether it was found.
+    """
+    try:
+        with open(_cache_filename(cache_dir, key), "rb") as f:
+            files, messages = pickle.load(f)
+    except Exception:  # Not found, or broken (might raise almost anything when unpickled). Just ignore it
+        return False
+
+    for fname, content in files.items():
+        with open(fname, "wb") as f:
+            f.write(content)
+
+    OPTIONS.stderr.write(messages)
+    return True
+
+
+def store(cache_dir: str, key: str, filenames: list[str]) -> None:
+    """Stores the given output files, and the messages recorded so far, under the given key.
+    Errors are ignored.
+    """
+    messages = OPTIONS.stderr.recorded.getvalue() if isinstance(OPTIONS.stderr, _RecordingStream) else ""
+    cache_filename = _cache_filename(cache_dir, key)
+
+    try:
+        files = {}
+        for fname in filenames:
+            with open(fname, "rb") as f:
+                files[fname] = f.read()
+
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(cache_filename), delete=False) as f:
+            pickle.dump((files, messages), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, cache_filename)
+    except OSError:
+        pass
@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Compiler passes instrumentation (zxbc --profile-passes).
+
+Measures wall time, peak memory (with tracemalloc) and the number of items produced
+by every pass of the compilation, and reports them as JSON. Passes are delimited
+with begin() / end() calls, which do nothing unless the profiler has been initialized.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from src.ast_ import Tree
+
+from .version import VERSION
+
+__all__ = (
+    "begin",
+    "count_nodes",
+    "end",
+    "init",
+    "report",
+    "write_report",
+)
+
+
+@dataclass
+class PassStats:
+    name: str
+    time: float  # Wall time, in seconds
+    peak_memory: int  # Peak memory traced during this pass, in bytes
+    items: int | None  # Number of items this pass produced (lines, nodes, quads...)
+
+
+ENABLED: bool = False
+PASSES: list[PassStats] = []
+
+_current: tuple[str, float] | None = None  # Pass being measured and its start time
+_started_tracemalloc: bool = False
+
+
+def init() -> None:
+    """Enables the profiler and starts tracing memory allocations"""
+    global ENABLED, _current, _started_tracemalloc
+
+    ENABLED = True
+    PASSES.clear()
+    _current = None
+    _started_tracemalloc = not tracemalloc.is_tracing()
+    if _started_tracemalloc:
+        tracemalloc.start()
+
+
+def begin(name: str) -> None:
+    """Starts measuring the given pass (ending the current one, if any)"""
+    global _current
+
+    if not ENABLED:
+        return
+
+    end()
+    tracemalloc.reset_peak()
+    _current = name, time.perf_counter()
+
+
+def end(items: int | Callable[[], int] | None = None) -> None:
+    """Ends measuring the current pass. items can be a function, which will be only called if enabled"""
+    global _current
+
+    if not ENABLED or _current is None:
+        return
+
+    name, start = _current
+    elapsed = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    _current = None
+
+    if callable(items):
+        items = items()
+
+    PASSES.append(PassStats(name=name, time=elapsed, peak_memory=peak_memory, items=items))
+
+
+def count_nodes(tree: Tree | None) -> int:
+    """Returns the number of nodes of the given AST"""
+    result = 0
+    pending = [tree] if tree is not None else []
+
+    while pending:
+        node = pending.pop()
+        result += 1
+        pending.extend(x for x in node.children if x is not None)
+
+    return result
+
+
+def report(program: str) -> dict[str, Any]:
+    """Ends the current pass, and returns the report of all the measured ones"""
+    end()
+
+    return {
+        "version": VERSION,
+        "program": program,
+        "total_time": sum(x.time for x in PASSES),
+        "peak_memory": max((x.peak_memory for x in PASSES), default=0),
+        "passes": [asdict(x) for x in PASSES],
+    }
+
+
+def write_report(filename: str, program: str) -> None:
+    """Writes the report (as JSON) into the given file ("-" for stdout), and disables the profiler"""
+    global ENABLED
+
+    result = json.dumps(report(program), indent=2) + "\n"
+    ENABLED = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+
+    if filename == "-":
+        sys.stdout.write(result)
+        return
+
+    with open(filename, "wt", encoding="utf-8") as f:
+        f.write(result)
@@ -0,0 +1,176 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Compile server (zxbc --server).
+
+Keeps the compiler (parsers, lexer tables, peephole patterns...) loaded in memory
+and runs compile jobs requested as JSON lines, either from stdin or from a local
+UNIX socket. Each request is a JSON object like:
+
+    {"args": ["-taB", "program.bas"], "cwd": "/path/to/dir"}
+
+where args are the usual zxbc command line arguments and cwd the directory they're
+relative to. Each response is a JSON line with the result of the job:
+
+    {"exit_code": 0, "stdout": "...", "stderr": "..."}
+
+Jobs are run one at a time, since the compiler state is global.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import traceback
+from collections.abc import Callable
+from typing import IO, Any, cast
+
+__all__ = (
+    "connect",
+    "main",
+    "run_job",
+    "serve",
+    "serve_unix",
+)
+
+
+def _response(exit_code: int, stdout: str = "", stderr: str = "") -> dict[str, Any]:
+    return {"exit_code": exit_code, "stdout": stdout, "stderr": stderr}
+
+
+def run_job(request: dict[str, Any], compile_: Callable[[list[str]], int]) -> dict[str, Any]:
+    """Runs a single compile job, capturing its output, and returns the response.
+    compile_ is the compiler entry point: takes the command line arguments and returns the exit code.
+    Errors (even unexpected exceptions) are reported in the response, so the server keeps running.
+    """
+    args = request.get("args")
+    if not isinstance(args, list) or not all(isinstance(x, str) for x in args):
+        return _response(2, stderr="zxbc: error: invalid request: 'args' must be a list of strings\n")
+
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    cwd = os.getcwd()
+
+    try:
+        # stderr is redirected before compiling, so config.init() sets OPTIONS.stderr to it
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                os.chdir(request.get("cwd") or cwd)
+                exit_code = compile_(args)
+            except SystemExit as e:  # i.e. Command line errors or too many syntax errors
+                if e.code is None or isinstance(e.code, int):
+                    exit_code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    exit_code = 1
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+    finally:
+        os.chdir(cwd)
+
+    return _response(int(exit_code or 0), stdout.getvalue(), stderr.getvalue())
+
+
+def serve(input_: IO[str], output: IO[str], compile_: Callable[[list[str]], int]) -> None:
+    """Reads requests (one JSON per line) from input_ and writes
+    their responses into output, until EOF is reached.
+    """
+    for line in input_:
+        if not line.strip():
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = _response(2, stderr=f"zxbc: error: invalid request: {e}\n")
+        else:
+            if isinstance(request, dict):
+                response = run_job(request, compile_)
+            else:
+                response = _response(2, stderr="zxbc: error: invalid request: a JSON object was expected\n")
+
+        output.write(json.dumps(response) + "\n")
+        output.flush()
+
+
+def serve_unix(socket_path: str, compile_: Callable[[list[str]], int]) -> None:
+    """Listens to requests in the given UNIX socket. Every connection can
+    send any number of requests. Runs forever (until interrupted).
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            # Both are binary streams, typed as BufferedIOBase (not accepted by TextIOWrapper)
+            input_ = io.TextIOWrapper(cast(IO[bytes], self.rfile), encoding="utf-8")
+            output = io.TextIOWrapper(cast(IO[bytes], self.wfile), encoding="utf-8", write_through=True)
+            with contextlib.suppress(OSError):  # Client gone
+                serve(input_, output, compile_)
+
+    # Removes a stale socket from a previous server, if any
+    with contextlib.suppress(FileNotFoundError):
+        if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def connect(socket_path: str, args: list[str]) -> int:
+    """Thin client: sends the given command line arguments to the server
+    listening in socket_path, and outputs its response as if zxbc had been run.
+    """
+    request = {"args": args, "cwd": os.getcwd()}
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            with client.makefile("rw", encoding="utf-8") as f:
+                f.write(json.dumps(request) + "\n")
+                f.flush()
+                response = json.loads(f.readline())
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"zxbc: error: could not connect to server at '{socket_path}': {e}", file=sys.stderr)
+        return 1
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+
+def main(args: list[str], compile_: Callable[[list[str]], int]) -> int:
+    """Entry point for
+    zxbc --server [SOCKET]: serves requests from stdin (or the given UNIX socket), and
+    zxbc --connect SOCKET [zxbc arguments...]: compiles using the server listening at SOCKET
+    """
+    mode, *args = args
+
+    if mode == "--connect":
+        if not args:
+            print("zxbc: error: --connect requires the server SOCKET path", file=sys.stderr)
+            return 2
+        return connect(args[0], args[1:])
+
+    if len(args) > 1:
+        print("zxbc: error: usage: zxbc --server [SOCKET]", file=sys.stderr)
+        return 2
+
+    if not args:
+        serve(sys.stdin, sys.stdout, compile_)
+    else:
+        serve_unix(args[0], compile_)
+
+    return 0
@@ -18,8 +18,10 @@ from src.api import config, debug
 from src.api import global_ as gl
 from src.api.config import OPTIONS
 from src.api.utils import open_file
-from src.zxbasm import asmparse
-from src.zxbc import zxblex, zxbparser
+from src.arch.z80.optimizer import timing
+from src.arch.z80.peephole import stats as peephole_stats
+from src.zxbasm import asmparse, simulator
+from src.zxbc import batch, build_cache, pass_profiler, server, zxblex, zxbparser
 from src.zxbc.args_config import parse_options, set_option_defines
 from src.zxbc.args_parser import FileType
 from src.zxbpp import zxbpp
@@ -28,6 +30,7 @@ from src.zxbpp.zxbpp import PreprocMode
 RE_INIT = re.compile(
     r'^#[ \t]*init[ \t]+((?:[._a-zA-Z][._a-zA-Z0-9]*)|(?:"[._a-zA-Z][._a-zA-Z0-9]*"))[ \t]*$', re.IGNORECASE
 )
+RE_INCLUDE_ONCE = re.compile(r"^#include once <[^>]+>$")
 
 
 def get_inits(memory):
@@ -73,11 +76,22 @@ def save_config(options: Namespace) -> None:
         src.api.config.save_config_into_file(options.save_config, src.api.config.ConfigSections.ZXBC)
 
 
+def global_variables() -> set[str]:
+    """Returns the labels of the global variables with their own memory (i.e. not DIM AT)"""
+    return {x.entry.mangled for x in zxbparser.data_ast.children if x.token == "VARDECL" and x.entry.addr is None}
+
+
 def main(args=None, emitter=None) -> int:
     """Entry point when executed from command line.
     zxbc can be used as python module. If so, bear in mind this function
     won't be executed unless explicitly called.
     """
+    if args is None:
+        args = sys.argv[1:]
+
+    if args[:1] in (["--server"], ["--connect"]):  # Compile server mode (or its client)
+        return server.main(args, compile_=main)
+
     # region [Initialization]
     config.init()
     zxbparser.init()
@@ -85,6 +99,9 @@ def main(args=None, emitter=None) -> int:
     arch.target.Translator.reset()
     asmparse.init()
 
+    if batch.is_batch(args):  # Compiles several programs in parallel
+        return batch.main(args, compile_=main)
+
     options = parse_options(args)
     zxbpp.init()
     arch.set_target_arch(OPTIONS.architecture)
@@ -93,35 +110,92 @@ def main(args=None, emitter=None) -> int:
     backend.init()  # Must reinitialize it again
     # endregion
 
+    if options.profile_passes is not None:
+        pass_profiler.init()
+
+    if options.peephole_stats is not None:
+        peephole_stats.init()
+
+    if options.timing_report is not None:
+        timing.init()
+
+    try:
+        return compile_program(options, backend, emitter)
+    finally:
+        if options.profile_passes is not None:
+            pass_profiler.write_report(options.profile_passes, program=options.PROGRAM)
+
+        if options.peephole_stats is not None:
+            peephole_stats.write_report(options.peephole_stats)
+
+        if options.timing_report is not None:
+            timing.write_report(options.timing_report)
+
+
+def compile_program(options: Namespace, backend, emitter=None) -> int:
+    """Compiles the program with the given command line options (already set in OPTIONS)
+    using the given (already initialized) backend. See main().
+    """
     args = [options.PROGRAM]  # Strip out other options, because they're already set in the OPTIONS container
     input_filename = options.PROGRAM
 
+    pass_profiler.begin("preprocess")
     zxbpp.setMode(PreprocMode.BASIC)
     zxbpp.main(args)
+    pass_profiler.end(items=zxbpp.OUTPUT.line_count)
 
     if gl.has_errors:
         debug.__DEBUG__("exiting due to errors.")
         return 1  # Exit with errors
 
-    input_ = zxbpp.OUTPUT
+    input_ = zxbpp.OUTPUT.getvalue()
+
+    # Compilation cache: can't be used with custom emitters, nor with reports about the compilation itself
+    cache_key = None
+    if (
+        OPTIONS.cache_dir
+        and emitter is None
+        and not options.parse_only
+        and options.simulate is None
+        and options.timing_report is None
+        and options.peephole_stats is None
+        and options.profile_passes is None
+    ):
+        cache_key = build_cache.compute_key(input_, options)
+        if build_cache.restore(OPTIONS.cache_dir, cache_key):
+            debug.__DEBUG__("output restored from the compilation cache.")
+            save_config(options)
+            return 0  # Exit success
+
+        build_cache.record_messages()
+
+    pass_profiler.begin("parse")
     zxbparser.parser.parse(input_, lexer=zxblex.lexer, tracking=True, debug=(OPTIONS.debug_level > 1))
+    pass_profiler.end(items=lambda: pass_profiler.count_nodes(zxbparser.ast))
     if gl.has_errors:
         debug.__DEBUG__("exiting due to errors.")
         return 1  # Exit with errors
 
     # Unreachable code removal
+    pass_profiler.begin("unreachable_code")
     unreachable_code_visitor = src.api.optimize.UnreachableCodeVisitor()
     unreachable_code_visitor.visit(zxbparser.ast)
+    pass_profiler.end(items=lambda: pass_profiler.count_nodes(zxbparser.ast))
 
     # Function calls graph
+    pass_profiler.begin("function_graph")
     func_call_visitor = src.api.optimize.FunctionGraphVisitor()
     func_call_visitor.visit(zxbparser.ast)
+    pass_profiler.end(items=lambda: pass_profiler.count_nodes(zxbparser.ast))
 
     # Optimizations
+    pass_profiler.begin("ast_optimizer")
     optimizer = src.api.optimize.OptimizerVisitor()
     optimizer.visit(zxbparser.ast)
+    pass_profiler.end(items=lambda: pass_profiler.count_nodes(zxbparser.ast))
 
     # Emits intermediate code
+    pass_profiler.begin("translation")
     translator = arch.target.Translator(backend)
     translator.visit(zxbparser.ast)
 
@@ -148,6 +222,7 @@ def main(args=None, emitter=None) -> int:
     translator.emit_jump_tables()
     # Signals end of user code
     translator.ic_inline(";; --- end of user code ---")
+    pass_profiler.end(items=len(backend.MEMORY))
 
     if gl.has_errors:
         debug.__DEBUG__("exiting due to errors.")
@@ -165,11 +240,19 @@ def main(args=None, emitter=None) -> int:
 
             for quad in translator.dumpMemory(backend.MEMORY):
                 output_file.write(str(quad) + "\n")
+
+        if cache_key is not None:
+            build_cache.store(OPTIONS.cache_dir, cache_key, [OPTIONS.output_filename])
         return 0  # Exit success
 
     # Join all lines into a single string and ensures an INTRO at end of file
-    asm_output = backend.emit(optimize=OPTIONS.optimization_level > 0)
+    pass_profiler.begin("backend_emit")
+    asm_output = backend.emit(optimize=OPTIONS.optimization_level > 0, variables=global_variables())
+    pass_profiler.end(items=len(asm_output))
+
+    pass_profiler.begin("peephole_optimizer")
     asm_output = arch.target.optimizer.Optimizer().optimize(asm_output) + "\n"  # invoke the peephole optimizer
+    pass_profiler.end(items=lambda: asm_output.count("\n"))
 
     asm_output = asm_output.split("\n")
     for i in range(len(asm_output)):
@@ -180,18 +263,33 @@ def main(args=None, emitter=None) -> int:
     asm_output = "\n".join(asm_output)
 
     # Now filter them against the preprocessor again
+    pass_profiler.begin("asm_preprocess")
     set_option_defines()  # Needed for zxbpp.init()
     zxbpp.reset_id_table()
     zxbpp.setMode(zxbpp.PreprocMode.ASM)
-    zxbpp.OUTPUT = ""
-    zxbpp.filter_(asm_output, filename=input_filename)
+    zxbpp.OUTPUT.clear()
+
+    # Required runtime modules are included at the end. Preprocess them apart, so their result can be cached
+    asm_lines = asm_output.split("\n")
+    i = len(asm_lines)
+    while i and (not asm_lines[i - 1] or RE_INCLUDE_ONCE.match(asm_lines[i - 1])):
+        i -= 1
+
+    if all(not x for x in asm_lines[i:]):
+        zxbpp.filter_(asm_output, filename=input_filename)
+    else:
+        zxbpp.filter_("\n".join(asm_lines[:i]) + "\n", filename=input_filename)
+        zxbpp.filter_includes("\n".join(asm_lines[i:]), filename=input_filename, lineno=i + 1)
+
+    pass_profiler.end(items=zxbpp.OUTPUT.line_count)
 
     # Now output the result
-    asm_output = zxbpp.OUTPUT.split("\n")
+    asm_output = list(zxbpp.OUTPUT.lines())
     get_inits(asm_output)  # Find out remaining inits
     backend.MEMORY[:] = []
 
     # This will fill MEMORY with global declared variables
+    pass_profiler.begin("variables_translation")
     var_checker = src.api.optimize.VariableVisitor()
     var_checker.visit(zxbparser.data_ast)
     translator = arch.target.VarTranslator(backend=backend)
@@ -208,15 +306,20 @@ def main(args=None, emitter=None) -> int:
         + asm_output
         + backend.emit_epilogue()
     )
+    pass_profiler.end(items=len(asm_output))
 
     if OPTIONS.output_file_type == FileType.ASM:  # Only output assembler file
         with open_file(OPTIONS.output_filename, "wt", "utf-8") as output_file:
             output(asm_output, output_file)
     elif not options.parse_only:
+        pass_profiler.begin("assembly")
         fout = StringIO()
         output(asm_output, fout)
         asmparse.assemble(fout.getvalue())
         fout.close()
+        pass_profiler.end(items=lambda: asmparse.MEMORY.bytes_used if asmparse.MEMORY is not None else 0)
+
+        pass_profiler.begin("binary_generation")
         asmparse.generate_binary(
             OPTIONS.output_filename,
             OPTIONS.output_file_type,
@@ -224,14 +327,24 @@ def main(args=None, emitter=None) -> int:
             headless_binary_files=options.append_headless_binary,
             emitter=emitter,
         )
+        pass_profiler.end()
         if gl.has_errors:
             return 5  # Error in assembly
 
+        if options.simulate is not None:
+            assert asmparse.MEMORY is not None and asmparse.AUTORUN_ADDR is not None
+            simulation = simulator.simulate(asmparse.MEMORY, asmparse.AUTORUN_ADDR)
+            simulator.write_report(options.simulate, simulation, program=options.PROGRAM)
+
     if OPTIONS.memory_map:
         if asmparse.MEMORY is not None:
             with open_file(OPTIONS.memory_map, "wt", "utf-8") as f:
                 f.write(asmparse.MEMORY.memory_map)
 
+    if cache_key is not None and not gl.has_errors:
+        output_files = [OPTIONS.output_filename] + ([OPTIONS.memory_map] if OPTIONS.memory_map else [])
+        build_cache.store(OPTIONS.cache_dir, cache_key, output_files)
+
     save_config(options)
 
     return gl.has_errors  # Exit success
@@ -9,5 +9,6 @@ from .args import Arg, ArgList
 from .definestable import DefinesTable
 from .id_ import ID
 from .macrocall import MacroCall
+from .outputbuffer import OutputBuffer
 
-__all__ = "ID", "Arg", "ArgList", "DefinesTable", "MacroCall"
+__all__ = "ID", "Arg", "ArgList", "DefinesTable", "MacroCall", "OutputBuffer"
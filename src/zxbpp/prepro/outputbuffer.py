@@ -0,0 +1,70 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Output of the preprocessor.
+It's kept as a list of text chunks, so appending to it does not copy the text already written.
+"""
+
+from collections.abc import Iterator
+
+
+class OutputBuffer:
+    """A string builder for the preprocessor output"""
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, text: str = ""):
+        self._chunks: list[str] = []
+        self.write(text)
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def write(self, text: str) -> None:
+        """Appends the given text"""
+        if text:
+            self._chunks.append(text)
+
+    def end_line(self) -> None:
+        """Appends a newline, unless the output is empty or already ends with one"""
+        if self._chunks and self._chunks[-1][-1] != "\n":
+            self._chunks.append("\n")
+
+    def clear(self) -> None:
+        self._chunks.clear()
+
+    def getvalue(self) -> str:
+        """Returns the whole output as a single string"""
+        if len(self._chunks) > 1:
+            self._chunks[:] = ["".join(self._chunks)]
+
+        return self._chunks[0] if self._chunks else ""
+
+    def line_count(self) -> int:
+        """Returns the number of newlines in the output"""
+        return sum(x.count("\n") for x in self._chunks)
+
+    def lines(self) -> Iterator[str]:
+        """Yields the lines of the output (without the newline), as getvalue().split("\\n") would return them,
+        without building the whole string
+        """
+        pending: list[str] = []  # Beginning of the current line, if it spans several chunks
+        for chunk in self._chunks:
+            lines = chunk.split("\n")
+            if len(lines) == 1:
+                pending.append(chunk)
+                continue
+
+            if pending:
+                pending.append(lines[0])
+                lines[0] = "".join(pending)
+                pending.clear()
+
+            pending.append(lines.pop())
+            yield from lines
+
+        yield "".join(pending)
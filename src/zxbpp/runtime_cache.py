@@ -0,0 +1,93 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+"""Cache of preprocessed runtime modules (see zxbpp.filter_includes()).
+
+Entries are kept in memory (useful for the compile server and batch modes) and,
+if a cache directory is given, also on disk. An entry is only valid while
+every file it was preprocessed from keeps the same size and modification time.
+Every key might have several entries (i.e. the same module preprocessed after
+different ones), the caller chooses the one matching the files already included.
+"""
+
+import os
+import pickle
+import tempfile
+from typing import Any, Final, NamedTuple
+
+__all__ = (
+    "Entry",
+    "MAX_ENTRIES",
+    "file_signature",
+    "get",
+    "put",
+)
+
+
+# Max number of entries kept for the same key
+MAX_ENTRIES: Final[int] = 8
+
+
+class Entry(NamedTuple):
+    files: list[tuple[str, int, int]]  # (path, size, mtime) of every file preprocessed
+    requires: dict[str, tuple[bool, bool] | None]  # State of the files included (or skipped) before preprocessing
+    output: str  # Preprocessed output
+    included: dict[str, tuple[bool, list[tuple[str, int]]]]  # Files included: whether once, and parents added
+    defines: dict[str, tuple[Any, ...] | None]  # Defines set (or removed, if None)
+
+
+# Entries in memory, by key
+_ENTRIES: dict[str, list[Entry]] = {}
+
+
+def file_signature(path: str) -> tuple[str, int, int]:
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns
+
+
+def _is_valid(entry: Entry) -> bool:
+    try:
+        return all(file_signature(path) == (path, size, mtime) for path, size, mtime in entry.files)
+    except OSError:
+        return False
+
+
+def _cache_filename(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, "zxbpp", f"{key}.pickle")
+
+
+def get(key: str, cache_dir: str | None = None) -> list[Entry]:
+    """Returns the entries for the given key still valid, if any"""
+    entries = _ENTRIES.get(key)
+
+    if entries is None and cache_dir:
+        try:
+            with open(_cache_filename(cache_dir, key), "rb") as f:
+                entries = pickle.load(f)
+        except Exception:  # Not found, or broken (might raise almost anything when unpickled). Just ignore it
+            return []
+
+    entries = [x for x in entries or () if _is_valid(x)]
+    _ENTRIES[key] = entries
+    return entries
+
+
+def put(key: str, entry: Entry, cache_dir: str | None = None) -> None:
+    """Adds the entry for the given key. Errors writing it on disk are ignored."""
+    entries = _ENTRIES[key] = [entry, *_ENTRIES.get(key, ())][:MAX_ENTRIES]
+
+    if not cache_dir:
+        return
+
+    cache_filename = _cache_filename(cache_dir, key)
+    try:
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(cache_filename), delete=False) as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, cache_filename)
+    except OSError:
+        pass
@@ -8,6 +8,7 @@
 # --------------------------------------------------------------------
 
 import argparse
+import hashlib
 import os
 import re
 import sys
@@ -16,9 +17,9 @@ from enum import StrEnum, unique
 from typing import Any, Final, NamedTuple
 
 from src.api import config, global_, utils
-from src.zxbpp import zxbasmpplex, zxbpplex
+from src.zxbpp import runtime_cache, zxbasmpplex, zxbpplex
 from src.zxbpp.base_pplex import STDIN
-from src.zxbpp.prepro import ID, Arg, ArgList, DefinesTable, MacroCall, output
+from src.zxbpp.prepro import ID, Arg, ArgList, DefinesTable, MacroCall, OutputBuffer, output
 from src.zxbpp.prepro.builtinmacro import BuiltinMacro
 from src.zxbpp.prepro.exceptions import PreprocError
 from src.zxbpp.prepro.operators import Concatenation, Stringizing
@@ -38,7 +39,7 @@ class PreprocMode(StrEnum):
 AVAILABLE_ARCHITECTURES: Final[list[str]] = []
 
 # Generated output
-OUTPUT = ""
+OUTPUT = OutputBuffer()
 
 # Global macro (#defines) table
 ID_TABLE = DefinesTable()
@@ -57,6 +58,14 @@ INCLUDEPATH: list[str] = ["stdlib", "runtime"]
 # Include paths for every arch
 INCLUDE_MAP: Final[dict[str, list[str]]] = {}
 
+# Resolved include file names: (name, local_first, arch, current dir, include path, working dir) -> absolute path
+SEARCH_CACHE: dict[tuple[str, bool, str, str, tuple[str, ...], str, str], str] = {}
+
+# File names (normalized) in each dir of the library (stdlib, runtime) already looked into.
+# These are read-only, so they're listed once and kept across runs.
+# None if the listing can't be trusted (see _get_dir_listing())
+DIR_LISTINGS: dict[str, frozenset[str] | None] = {}
+
 # Enabled to FALSE if IFDEF failed
 ENABLED: bool = True
 
@@ -85,6 +94,9 @@ class IncludedFileInfo:
 # included, since a file can be included more than once.
 INCLUDED: dict[str, IncludedFileInfo] = {}
 
+# Files skipped because they were already included (see filter_includes())
+SKIPPED: set[str] = set()
+
 # IFDEFS array
 IFDEFS: list[IfDef] = []  # Push (Line, state here)
 
@@ -124,11 +136,13 @@ def init():
 
     config.OPTIONS(config.Action.ADD_IF_NOT_DEFINED, name="debug_zxbpp", type=bool, default=False)
     global_.FILENAME = STDIN
-    OUTPUT = ""
+    OUTPUT = OutputBuffer()
     INCLUDED = {}
+    SKIPPED.clear()
     CURRENT_DIR = ""
     ENABLED = True
     IFDEFS = []
+    SEARCH_CACHE.clear()
     global_.has_errors = 0
     global_.error_msg_cache.clear()
     parser.defaulted_states = {}
@@ -192,23 +206,87 @@ def search_filename(fname: str, lineno: int, local_first: bool, arch: str = "")
 
     assert CURRENT_DIR is not None
     include_path = INCLUDE_MAP.get(arch, INCLUDEPATH)
+    user_path = config.OPTIONS.include_path or ""
+
+    key = fname, local_first, arch, CURRENT_DIR, tuple(include_path), user_path, os.getcwd()
+    result = SEARCH_CACHE.get(key)
+    if result is not None:
+        return result
 
     i_path: list[str] = [CURRENT_DIR] + include_path if local_first else list(include_path)
-    i_path.extend(config.OPTIONS.include_path.split(":") if config.OPTIONS.include_path else [])
+    i_path.extend(user_path.split(":") if user_path else [])
 
     if os.path.isabs(fname):
         if os.path.isfile(fname):
-            return fname
+            result = fname
     else:
-        for dir_ in i_path:
-            path = utils.get_absolute_filename_path(utils.sanitize_filename(os.path.join(dir_, fname)))
-            if os.path.exists(path):
-                return path
+        # Library dirs are first checked against their listings, which will skip those not containing the file.
+        # If that fails (i.e. the file was created after listing the dir), tries again with every dir
+        result = _search_in_path(fname, i_path, use_listings=True) or _search_in_path(fname, i_path)
+
+    if result:
+        SEARCH_CACHE[key] = result
+        return result
 
     error(lineno, "file '%s' not found" % fname)
     return ""
 
 
+def _search_in_path(fname: str, i_path: list[str], use_listings: bool = False) -> str:
+    """Returns the absolute path of the relative filename fname in the first dir of i_path containing it,
+    or "" if not found.
+    """
+    subdir, basename = os.path.split(os.path.normpath(fname))
+    basename = os.path.normcase(basename)
+
+    for dir_ in i_path:
+        if use_listings:
+            listing = _get_dir_listing(dir_, subdir)
+            if listing is not None and basename not in listing:
+                continue
+
+        path = utils.get_absolute_filename_path(utils.sanitize_filename(os.path.join(dir_, fname)))
+        if os.path.exists(path):
+            return path
+
+    return ""
+
+
+def _is_case_sensitive(dir_: str) -> bool:
+    """Returns whether file names under the given dir can be compared once normalized with normcase():
+    that is, the file system is case-sensitive, or normcase() folds the case (i.e. Windows).
+    Case-insensitive file systems where it does not (i.e. macOS) would find names differing in case.
+    """
+    if os.path.normcase("A") != "A":
+        return True
+
+    head, tail = os.path.split(os.path.normpath(dir_))
+    if tail.swapcase() == tail:
+        return False  # Can't tell
+
+    return not os.path.exists(os.path.join(head, tail.swapcase()))
+
+
+def _get_dir_listing(dir_: str, subdir: str) -> frozenset[str] | None:
+    """Returns the file names (normalized) in the subdir of the given library dir,
+    or None if it's not a library dir, or it's not case-sensitive (the file must be looked for).
+    """
+    if subdir.startswith(os.pardir) or not any(dir_ in path for path in INCLUDE_MAP.values()):
+        return None
+
+    path = os.path.normpath(os.path.join(dir_, subdir))
+    if path in DIR_LISTINGS:
+        return DIR_LISTINGS[path]
+
+    try:
+        result = frozenset(os.path.normcase(x) for x in os.listdir(path)) if _is_case_sensitive(path) else None
+    except OSError:
+        result = frozenset()  # I.e. the subdir does not exist
+
+    DIR_LISTINGS[path] = result
+    return result
+
+
 def include_file(filename: str, lineno: int, local_first: bool, arch: str = "") -> str:
     """Performs a file inclusion (#include) in the preprocessor.
     Writes down that "filename" was included in the current file,
@@ -227,6 +305,7 @@ def include_file(filename: str, lineno: int, local_first: bool, arch: str = "")
         INCLUDED[abs_filename] = IncludedFileInfo(once=False, parents=[])
     elif INCLUDED[abs_filename].once:
         # Empty file (already included)
+        SKIPPED.add(abs_filename)
         LEXER.next_token = "_ENDFILE_"
         return ""
 
@@ -261,6 +340,7 @@ def include_once(filename: str, lineno: int, local_first: bool, arch: str = "")
         warning(lineno, f"file '{filename}' already included more than once, in file '{parent_file}' at line {lineno}")
 
     # Empty file (already included)
+    SKIPPED.add(abs_filename)
     LEXER.next_token = "_ENDFILE_"
     return ""
 
@@ -328,8 +408,7 @@ class LarkLexerAdapter(Lexer):
 
 class ZxbppTransformer(Transformer):
     def start(self, items):
-        global OUTPUT
-        OUTPUT += "".join(items[0])
+        OUTPUT.write("".join(items[0]))
         return items[0]
 
     def program(self, items):
@@ -762,9 +841,9 @@ def parse_with_lark():
         parse_with_lark()
 
 
-def filter_(input_, filename="<internal>", state="INITIAL"):
+def filter_(input_, filename="<internal>", state="INITIAL", lineno: int = 1):
     """Filter the input string thought the preprocessor.
-    result is appended to OUTPUT global str
+    result is appended to OUTPUT global buffer
     """
     global CURRENT_DIR
 
@@ -773,16 +852,154 @@ def filter_(input_, filename="<internal>", state="INITIAL"):
     CURRENT_DIR = os.path.dirname(output.CURRENT_FILE[-1])
     LEXER.input(input_, filename)
     LEXER.lex.begin(state)
+    LEXER.lineno = lineno
     parse_with_lark()
     output.CURRENT_FILE.pop()
     CURRENT_DIR = prev_dir
 
 
+def _defines_state() -> dict[str, tuple[Any, ...]] | None:
+    """Returns the current defines as a dict of plain values, or None if any of them is not plain
+    (i.e. it's a macro with arguments or its value contains macro calls).
+    """
+    result = {}
+    for name, id_ in ID_TABLE.table.items():
+        if isinstance(id_, BuiltinMacro):
+            result[name] = ()
+            continue
+
+        if not isinstance(id_, ID) or id_.args is not None or not all(isinstance(x, str | int) for x in id_.value):
+            return None
+
+        result[name] = (list(id_.value), id_.lineno, id_.fname)
+
+    return result
+
+
+def _includes_cache_key(line: str) -> str | None:
+    """Returns the cache key for the given #include line (see filter_includes()), or None if it cannot be cached"""
+    if not ENABLED or IFDEFS:
+        return None
+
+    defines = _defines_state()
+    if defines is None:
+        return None
+
+    key = (line, type(LEXER).__module__, os.getcwd(), INCLUDEPATH, config.OPTIONS.include_path, defines)
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def _included_state(info: IncludedFileInfo | None) -> tuple[bool, bool] | None:
+    """Returns what matters of an included file to preprocess it again:
+    whether it was included at all, it's #pragma once, and it was included more than once (emits a warning)
+    """
+    if info is None:
+        return None
+
+    return info.once, len(info.parents) > 1
+
+
+def _relocate_lines(text: str, filename: str, new_filename: str, offset: int) -> str:
+    """Replaces every #line directive in the given filename with the new one, adding offset to its line number"""
+    return re.sub(
+        rf'^#line (\d+) "{re.escape(filename)}"$',
+        lambda x: f'#line {int(x.group(1)) + offset} "{new_filename}"',
+        text,
+        flags=re.MULTILINE,
+    )
+
+
+def _relocate_parents(
+    parents: list[ParentIncludingFile], filename: str, new_filename: str, offset: int
+) -> list[ParentIncludingFile]:
+    """Like _relocate_lines(), for the places where a file was included"""
+    return [
+        x._replace(file_name=new_filename, lineno=x.lineno + offset) if x.file_name == filename else x for x in parents
+    ]
+
+
+def _filter_include(line: str, filename: str, lineno: int) -> None:
+    """Preprocesses a single #include line (see filter_includes()), using the cache if possible"""
+    global OUTPUT
+
+    cache_dir = config.OPTIONS.cache_dir
+    key = _includes_cache_key(line)
+    entries = runtime_cache.get(key, cache_dir) if key is not None else []
+
+    for entry in entries:
+        if any(_included_state(INCLUDED.get(name)) != state for name, state in entry.requires.items()):
+            continue  # Preprocessed after other modules
+
+        OUTPUT.write(_relocate_lines(entry.output, "", filename, lineno - 1))
+        for name, (once, parents) in entry.included.items():
+            info = INCLUDED.setdefault(name, IncludedFileInfo(once=False, parents=[]))
+            info.once = once
+            info.parents.extend(_relocate_parents([ParentIncludingFile(*x) for x in parents], "", filename, lineno - 1))
+
+        for name, state in entry.defines.items():
+            if state is None:
+                ID_TABLE.undef(name)
+            else:
+                value, lineno_, fname = state
+                ID_TABLE.set(name, lineno=lineno_, value=list(value), fname=fname)
+        return
+
+    prev_output = OUTPUT
+    prev_included = {name: IncludedFileInfo(info.once, list(info.parents)) for name, info in INCLUDED.items()}
+    prev_defines = _defines_state()
+    prev_messages = global_.has_errors, global_.has_warnings
+    SKIPPED.clear()
+
+    OUTPUT = OutputBuffer()
+    filter_(line + "\n", filename=filename, lineno=lineno)
+    result = OUTPUT.getvalue()
+    OUTPUT = prev_output
+    OUTPUT.write(result)
+
+    defines = _defines_state()
+    if key is None or defines is None or (global_.has_errors, global_.has_warnings) != prev_messages:
+        return  # Only cache results with no messages
+
+    assert prev_defines is not None
+    included = {name: info for name, info in INCLUDED.items() if prev_included.get(name) != info}
+    entry = runtime_cache.Entry(
+        files=[runtime_cache.file_signature(x) for x in included],
+        requires={name: _included_state(prev_included.get(name)) for name in [*included, *SKIPPED]},
+        output=_relocate_lines(result, filename, "", 1 - lineno),
+        included={
+            name: (
+                info.once,
+                _relocate_parents(
+                    info.parents[len(prev_included[name].parents) if name in prev_included else 0 :],
+                    filename,
+                    "",
+                    1 - lineno,
+                ),
+            )
+            for name, info in included.items()
+        },
+        defines={k: v for k, v in defines.items() if prev_defines.get(k) != v}
+        | {k: None for k in prev_defines if k not in defines},
+    )
+    runtime_cache.put(key, entry, cache_dir)
+
+
+def filter_includes(input_: str, filename: str, lineno: int = 1) -> None:
+    """Like filter_(), for input_ made only of #include lines starting at the given line.
+    This is used for the runtime modules required by a program, which are preprocessed
+    in ASM mode at the end of every compilation. Since they rarely change, every module
+    is cached apart (see runtime_cache.py), so it's reused by programs requiring others.
+    """
+    for i, line in enumerate(input_.split("\n")):
+        if line:
+            _filter_include(line, filename, lineno + i)
+
+
 def main(argv):
     global OUTPUT, ID_TABLE, ENABLED, CURRENT_DIR
 
     ENABLED = True
-    OUTPUT = ""
+    OUTPUT = OutputBuffer()
     set_include_path()
 
     if argv:
@@ -797,9 +1014,8 @@ def main(argv):
         if not included_file:
             return None
 
-        OUTPUT += include_once(included_file, 0, local_first=False)
-        if OUTPUT and OUTPUT[-1] != "\n":
-            OUTPUT += "\n"
+        OUTPUT.write(include_once(included_file, 0, local_first=False))
+        OUTPUT.end_line()
 
         parse_with_lark()
         output.CURRENT_FILE.pop()
@@ -807,9 +1023,8 @@ def main(argv):
 
     prev_file = global_.FILENAME
     global_.FILENAME = output.CURRENT_FILE[-1]
-    OUTPUT += LEXER.include(output.CURRENT_FILE[-1])
-    if OUTPUT and OUTPUT[-1] != "\n":
-        OUTPUT += "\n"
+    OUTPUT.write(LEXER.include(output.CURRENT_FILE[-1]))
+    OUTPUT.end_line()
 
     parse_with_lark()
     output.CURRENT_FILE.pop()
@@ -901,9 +1116,9 @@ def entry_point(args=None):
     if not global_.has_errors:  # ok?
         if options.output_file:
             with utils.open_file(options.output_file, "wt", "utf-8") as output_file:
-                output_file.write(OUTPUT)
+                output_file.write(OUTPUT.getvalue())
         else:
-            config.OPTIONS.stdout.write(OUTPUT)
+            config.OPTIONS.stdout.write(OUTPUT.getvalue())
 
     return result
 
@@ -60,6 +60,7 @@ class TestConfig(unittest.TestCase):
             config.OPTION.ARRAY_BASE,
             config.OPTION.CHECK_ARRAYS,
             config.OPTION.AUTORUN,
+            config.OPTION.CACHE_DIR,
             config.OPTION.CASE_INS,
             config.OPTION.DEBUG,
             config.OPTION.DEFAULT_BYREF,
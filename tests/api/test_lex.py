@@ -0,0 +1,86 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import pytest
+
+from src.api import lex
+
+
+class Rules:
+    states = (("comment", "exclusive"),)
+    tokens = ("ID", "NUMBER", "LE", "LT", "COMMENT")
+
+    t_LE = r"<="
+    t_LT = r"<"
+    t_comment_COMMENT = r"[^*]+"
+
+    def t_NUMBER(self, t):
+        r"[0-9]+"
+        t.value = int(t.value)
+        return t
+
+    def t_ID(self, t):
+        r"[a-z][a-z0-9]*"
+        return t
+
+    def t_BLANK(self, t):
+        r"[ \t]+"
+
+    def t_begin_comment(self, t):
+        r"/\*"
+        t.lexer.push_state("comment")
+
+    def t_comment_end(self, t):
+        r"\*/"
+        t.lexer.pop_state()
+
+    def t_error(self, t):
+        t.lexer.skip(1)
+
+
+def tokenize(data: str) -> list[tuple[str | None, object, int]]:
+    lexer = lex.lex(object=Rules())
+    lexer.input(data)
+    result = []
+    while (tok := lexer.token()) is not None:
+        result.append((tok.type, tok.value, tok.lexpos))
+
+    return result
+
+
+def test_rules_order():
+    # Functions are tried first (in definition order), then strings (longest first)
+    assert tokenize("a1 12<=<") == [("ID", "a1", 0), ("NUMBER", 12, 3), ("LE", "<=", 5), ("LT", "<", 7)]
+
+
+def test_ignored_tokens_and_states():
+    assert tokenize("a /* b 1 */ 2") == [("ID", "a", 0), ("COMMENT", " b 1 ", 4), ("NUMBER", 2, 12)]
+
+
+def test_error_handler():
+    assert tokenize("a ? b") == [("ID", "a", 0), ("ID", "b", 4)]
+
+
+def test_no_error_handler():
+    lexer = lex.lex(object={"tokens": ("ID",), "t_ID": r"[a-z]+"})
+    lexer.input("ab?")
+    assert lexer.token().value == "ab"
+    with pytest.raises(lex.LexError):
+        lexer.token()
+
+
+def test_state_with_no_rules():
+    lexer = lex.lex(object={"tokens": ("ID",), "states": (("empty", "exclusive"),), "t_ID": r"[a-z]+"})
+    lexer.input("ab")
+    lexer.begin("empty")
+    with pytest.raises(lex.LexError):
+        lexer.token()
+
+    lexer.input("ab")
+    lexer.statestack.append("undeclared")
+    with pytest.raises(lex.LexError):
+        lexer.token()
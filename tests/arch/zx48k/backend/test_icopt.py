@@ -0,0 +1,138 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+from src.arch.z80.backend import icopt
+from src.arch.z80.backend.icinstruction import ICInstruction
+from src.arch.z80.backend.icopt.basicblock import get_basic_blocks
+from src.arch.z80.backend.quad import Quad
+
+VARS = [Quad(ICInstruction.VAR, f"_{x}", "2") for x in "abcd"]
+
+
+def optimize(*quads: tuple[str, ...]) -> list[tuple[str, ...]]:
+    return [tuple(x) for x in icopt.optimize([*(Quad(*x) for x in quads), *VARS])][: -len(VARS)]
+
+
+class TestBasicBlocks:
+    def test_partition_and_cfg(self):
+        quads = [
+            Quad(ICInstruction.STOREU8, "_a", "1"),
+            Quad(ICInstruction.JZEROU8, "_a", "L1"),
+            Quad(ICInstruction.STOREU8, "_a", "2"),
+            Quad(ICInstruction.JUMP, "L2"),
+            Quad(ICInstruction.LABEL, "L1"),
+            Quad(ICInstruction.STOREU8, "_a", "3"),
+            Quad(ICInstruction.LABEL, "L2"),
+        ]
+        blocks = get_basic_blocks(quads)
+        assert [len(x) for x in blocks] == [2, 2, 2, 1]
+        assert blocks[0].goes_to == {blocks[1], blocks[2]}
+        assert blocks[1].goes_to == {blocks[3]}
+        assert blocks[3].comes_from == {blocks[1], blocks[2]}
+        assert blocks[2].label == "L1"
+
+
+class TestICOptimizer:
+    def test_constant_propagation(self):
+        """a = 5: b = a + 3"""
+        assert optimize(
+            ("storeu16", "_a", "5"),
+            ("addu16", "t1", "_a", "3"),
+            ("storeu16", "_b", "t1"),
+        ) == [("storeu16", "_a", "5"), ("storeu16", "_b", "8")]
+
+    def test_variables_declared_apart(self):
+        """Global variables are declared after the code is emitted, so they're given apart"""
+        quads = [Quad(*x) for x in (("storeu16", "_a", "5"), ("addu16", "t1", "_a", "3"), ("storeu16", "_b", "t1"))]
+        assert icopt.optimize(quads) == quads
+        assert [tuple(x) for x in icopt.optimize(quads, ("_a", "_b"))] == [
+            ("storeu16", "_a", "5"),
+            ("storeu16", "_b", "8"),
+        ]
+
+    def test_constants_forgotten_after_label(self):
+        quads = ("storeu16", "_a", "5"), ("label", "L1"), ("addu16", "t1", "_a", "3"), ("storeu16", "_b", "t1")
+        assert optimize(*quads) == list(quads)
+
+    def test_constants_forgotten_after_unknown_store(self):
+        """POKE might write anywhere"""
+        quads = (
+            ("storeu16", "_a", "5"),
+            ("storeu8", "16384", "0"),
+            ("addu16", "t1", "_a", "3"),
+            ("storeu16", "_b", "t1"),
+        )
+        assert optimize(*quads) == list(quads)
+
+    def test_copy_propagation(self):
+        assert optimize(("loadu16", "t1", "_a"), ("storeu16", "_b", "t1")) == [("storeu16", "_b", "_a")]
+
+    def test_not_propagated_across_stores(self):
+        quads = (
+            ("loadu16", "t1", "_a"),
+            ("storeu16", "_a", "_c"),
+            ("addu16", "t2", "t1", "_a"),
+            ("storeu16", "_b", "t2"),
+        )
+        assert optimize(*quads) == list(quads)
+
+    def test_identity(self):
+        """(a * b) + 0 = a * b"""
+        assert optimize(
+            ("mulu16", "t1", "_a", "_b"),
+            ("addu16", "t2", "t1", "0"),
+            ("storeu16", "_c", "t2"),
+        ) == [("mulu16", "t1", "_a", "_b"), ("storeu16", "_c", "t2")]
+
+    def test_absorbing_removes_dead_temporaries(self):
+        """(a * b) * 0 = 0"""
+        assert optimize(
+            ("mulu16", "t1", "_a", "_b"),
+            ("mulu16", "t2", "t1", "0"),
+            ("storeu16", "_c", "t2"),
+        ) == [("storeu16", "_c", "0")]
+
+    def test_booleans_only_folded_if_normalized(self):
+        """Comparisons might return any non-zero value for True, unless it's converted to 0/1 later"""
+        quads = ("gtu8", "t1", "5", "3"), ("storeu8", "_a", "t1")
+        assert optimize(*quads) == list(quads)
+        assert optimize(("gtu8", "t1", "5", "3"), ("jzerou8", "t1", "L1")) == [("jzerou8", "1", "L1")]
+
+    def test_signed_division_not_folded(self):
+        quads = ("divi16", "t1", "-7", "2"), ("storei16", "_a", "t1")
+        assert optimize(*quads) == list(quads)
+
+    def test_common_subexpression(self):
+        """b = a + c: d = (a + c) * 2"""
+        assert optimize(
+            ("addu16", "t1", "_a", "_c"),
+            ("storeu16", "_b", "t1"),
+            ("loadu16", "t2", "_a"),
+            ("addu16", "t3", "t2", "_c"),
+            ("mulu16", "t4", "t3", "2"),
+            ("storeu16", "_d", "t4"),
+        ) == [
+            ("addu16", "t1", "_a", "_c"),
+            ("storeu16", "_b", "t1"),
+            ("mulu16", "t4", "_b", "2"),
+            ("storeu16", "_d", "t4"),
+        ]
+
+    def test_common_subexpression_killed(self):
+        quads = (
+            ("addu16", "t1", "_a", "_c"),
+            ("storeu16", "_b", "t1"),
+            ("storeu16", "_a", "_d"),
+            ("addu16", "t2", "_a", "_c"),
+            ("storeu16", "_d", "t2"),
+        )
+        assert optimize(*quads) == list(quads)
+
+    def test_aliases_not_tracked(self):
+        """DIM x AT @a: writing into _x changes _a"""
+        quads = ("storeu16", "_a", "5"), ("storeu16", "_x", "6"), ("addu16", "t1", "_a", "3"), ("storeu16", "_b", "t1")
+        assert optimize(*quads) == list(quads)
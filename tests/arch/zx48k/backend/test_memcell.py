@@ -9,7 +9,7 @@ import unittest
 
 import src.arch
 import src.arch.z80.backend.common
-from src.arch.z80.optimizer import memcell
+from src.arch.z80.optimizer import helpers, memcell
 
 
 class TestMemCell(unittest.TestCase):
@@ -76,6 +76,17 @@ class TestMemCell(unittest.TestCase):
         self.assertSetEqual(c.requires, {"h", "l", "d", "e"})
         self.assertSetEqual(c.destroys, {"h", "l", "d", "e"})
 
+    def test_register_masks(self):
+        """Test register masks of requires and destroys"""
+        c = memcell.MemCell("ld (ix + 3), a", 1)
+        self.assertEqual(c.requires_mask, helpers.regs_mask(["a", "ixh", "ixl"]))
+        self.assertEqual(c.destroys_mask, 0)
+        c = memcell.MemCell("out (c), a", 1)
+        self.assertEqual(c.requires_mask, helpers.regs_mask(["a", "b", "c"]))
+
+        self.assertTrue(memcell.MemCell("inc hl", 1).affects("hl"))
+        self.assertFalse(memcell.MemCell("inc hl", 1).needs(["a", "de"]))
+
     def test_require_add_hl(self):
         """Test requires of add hl, NN instruction"""
         c = memcell.MemCell("add hl, de", 1)
@@ -0,0 +1,125 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+import re
+
+from src.arch.z80.backend import Backend, regalloc
+from src.arch.z80.backend.icinstruction import ICInstruction
+from src.arch.z80.backend.quad import Quad
+from src.zxbc import zxbc
+from tests.arch.zx48k.optimizer.common import mock_options_level
+
+LOOP_PROGRAM = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "functional", "arch", "zx48k", "opt2_regalloc_loop.bas"
+)
+
+
+class TestRegAlloc:
+    def setup_method(self) -> None:
+        self.backend = Backend()
+        self.backend.init()
+
+    def allocate(self, *quads: Quad) -> list[list[str]]:
+        chunks = [self.backend._QUAD_TABLE[quad.instr].func(quad) for quad in quads]
+        with mock_options_level(3):
+            regalloc.allocate(quads, chunks, self.backend._peephole)
+
+        return chunks
+
+    def test_16bit_operand_kept_in_bc(self):
+        """(a + b) + (c - d): the 1st operand is kept in BC while the 2nd one is computed"""
+        chunks = self.allocate(
+            Quad(ICInstruction.ADDU16, "t1", "_a", "_b"),
+            Quad(ICInstruction.SUBU16, "t2", "_c", "_d"),
+            Quad(ICInstruction.ADDU16, "t3", "t1", "t2"),
+        )
+        assert chunks[0][-2:] == ["ld b, h", "ld c, l"]
+        assert chunks[2] == ["pop hl", "add hl, bc", "push hl"]
+
+    def test_16bit_operand_copied_back(self):
+        """(a + b) - (c - d): the 1st operand is copied from BC into HL"""
+        chunks = self.allocate(
+            Quad(ICInstruction.ADDU16, "t1", "_a", "_b"),
+            Quad(ICInstruction.SUBU16, "t2", "_c", "_d"),
+            Quad(ICInstruction.SUBU16, "t3", "t1", "t2"),
+        )
+        assert chunks[0][-2:] == ["ld b, h", "ld c, l"]
+        assert chunks[2][:3] == ["pop de", "ld h, b", "ld l, c"]
+
+    def test_8bit_operand_kept_in_b(self):
+        chunks = self.allocate(
+            Quad(ICInstruction.ADDU8, "t1", "_a", "_b"),
+            Quad(ICInstruction.SUBU8, "t2", "_c", "_d"),
+            Quad(ICInstruction.SUBU8, "t3", "t1", "t2"),
+        )
+        assert chunks[0][-1] == "ld b, a"
+        assert chunks[2] == ["pop hl", "ld a, b", "sub h", "push af"]
+
+    def test_2nd_operand_not_a_temporary(self):
+        """The 2nd operand might be pushed by a quad not defining a temporary: it's popped first"""
+        chunks = self.allocate(
+            Quad(ICInstruction.ADDU16, "t1", "_a", "_b"),
+            Quad(ICInstruction.LOADU16, "_c", "_c"),
+            Quad(ICInstruction.SUBU16, "t3", "t1", "t2"),
+        )
+        assert chunks[0][-2:] == ["ld b, h", "ld c, l"]
+        assert chunks[2][:3] == ["pop de", "ld h, b", "ld l, c"]
+
+    def test_not_kept_across_calls(self):
+        """BC is not preserved by the runtime routines"""
+        quads = (
+            Quad(ICInstruction.ADDU16, "t1", "_a", "_b"),
+            Quad(ICInstruction.MULU16, "t2", "_c", "_d"),
+            Quad(ICInstruction.ADDU16, "t3", "t1", "t2"),
+        )
+        chunks = self.allocate(*quads)
+        assert chunks == [self.backend._QUAD_TABLE[quad.instr].func(quad) for quad in quads]
+
+    def test_not_kept_if_used_twice(self):
+        quads = (
+            Quad(ICInstruction.ADDU16, "t1", "_a", "_b"),
+            Quad(ICInstruction.SUBU16, "t2", "_c", "_d"),
+            Quad(ICInstruction.ADDU16, "t3", "t1", "t2"),
+            Quad(ICInstruction.STOREU16, "_e", "t1"),
+        )
+        chunks = self.allocate(*quads)
+        assert chunks == [self.backend._QUAD_TABLE[quad.instr].func(quad) for quad in quads]
+
+    def test_peephole_runs(self):
+        """The whole code is optimized once, and then the code of both quads, both ways"""
+        quads = (
+            Quad(ICInstruction.ADDU16, "t1", "_a", "_b"),
+            Quad(ICInstruction.SUBU16, "t2", "_c", "_d"),
+            Quad(ICInstruction.ADDU16, "t3", "t1", "t2"),
+        )
+        original = [self.backend._QUAD_TABLE[quad.instr].func(quad) for quad in quads]
+        optimized: list[list[str]] = []
+
+        def optimize(code: list[str]) -> list[str]:
+            optimized.append(list(code))
+            return self.backend._peephole(code)
+
+        chunks = [list(x) for x in original]
+        with mock_options_level(3):
+            regalloc.allocate(quads, chunks, optimize)
+
+        assert optimized == [[*original[0], *original[1], *original[2]], original[0], original[2], chunks[0], chunks[2]]
+
+    def test_arithmetic_loop_is_faster(self, tmp_path, monkeypatch):
+        """The loop of opt2_regalloc_loop.bas, simulated with and without keeping temporaries in BC"""
+
+        def tstates(name: str) -> int:
+            report = tmp_path / f"{name}.txt"
+            assert zxbc.main([LOOP_PROGRAM, "-O2", "-o", str(tmp_path / f"{name}.bin"), "--simulate", str(report)]) == 0
+            match = re.search(r"^T-states: (\d+)", report.read_text(), re.MULTILINE)
+            assert match is not None
+            return int(match.group(1))
+
+        allocated = tstates("allocated")
+        monkeypatch.setattr(regalloc, "allocate", lambda *args: None)
+        assert allocated < tstates("stack") * 0.95
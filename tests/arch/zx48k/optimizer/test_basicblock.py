@@ -161,6 +161,12 @@ class TestBasicBlock(unittest.TestCase):
         self.assertFalse(blks[1] in blks[3].goes_to)
         self.assertFalse(blks[5].goes_to)  # empty
 
+        self.assertEqual([x.next for x in blks], [*blks[1:], None])
+        self.assertEqual([x.prev for x in blks[1:]], blks[:-1])
+        for label, blk in ("__LABEL0", blks[1]), ("__LABEL1", blks[3]), ("__LABEL2", blks[4]):
+            self.assertIs(self.optimizer.LABELS[label].basic_block, blk)
+            self.assertEqual(self.optimizer.LABELS[label].position, 0)
+
     def test_basic_block_clean_ld_hl(self):
         code = """
         ld hl, (30001 - 1)
@@ -170,6 +176,29 @@ class TestBasicBlock(unittest.TestCase):
         self.assertEqual(1, len(self.blk))
         self.assertEqual(["ld hl, (30000)"], self.blk.code)
 
+    def test_destroys_in_order(self):
+        code = """
+        ld l, 1
+        ld r, a
+        ex af, af'
+        ld b, h
+        xor a
+        ld l, a
+        """
+        self.blk.code = [x for x in code.split("\n") if x.strip()]
+        self.assertEqual(self.blk.destroys(), ["l", "a", "f", "b"])
+        self.assertEqual(self.blk.destroys(3), ["b", "a", "f", "l"])
+
+    def test_requires_only_block_regs(self):
+        """r and the alternate a' and f' are not reported"""
+        code = """
+        ld a, r
+        ex af, af'
+        ld b, h
+        """
+        self.blk.code = [x for x in code.split("\n") if x.strip()]
+        self.assertEqual(self.blk.requires(), {"f", "h"})
+
     def test_mempos_requires(self):
         code = """
         ld hl, (_k - 1)
@@ -98,3 +98,10 @@ def test_single_registers():
     """Flags also for f must be passed"""
     assert helpers.single_registers("af") == ["a", "f"]
     assert helpers.single_registers(["f", "sp"]) == ["f", "sp"]
+
+
+def test_register_masks():
+    assert helpers.mask_regs(helpers.regs_mask(["a", "F", "sp", "5", "a'"])) == {"a", "f", "sp", "a'"}
+    assert helpers.mask_regs(helpers.ALL_REGS_MASK) == helpers.ALL_REGS
+    assert helpers.single_registers_mask("hl") == helpers.regs_mask(["h", "l"])
+    assert helpers.single_registers_mask(["ix", "af'", "(hl)"]) == helpers.regs_mask(["ixh", "ixl", "a'", "f'"])
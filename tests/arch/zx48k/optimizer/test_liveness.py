@@ -0,0 +1,68 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import unittest
+
+import src.arch.z80.optimizer.flow_graph
+import src.arch.z80.optimizer.main
+from src.arch.z80.optimizer import basicblock
+from src.arch.z80.optimizer.helpers import mask_regs
+
+
+class TestLiveness(unittest.TestCase):
+    CODE = """
+    ld c, 1
+    loop:
+    ld a, (_x)
+    add a, b
+    ld (_x), a
+    djnz loop
+    ld h, d
+    ret
+    """
+
+    def setUp(self) -> None:
+        self.optimizer = src.arch.z80.optimizer.Optimizer()
+        blk = basicblock.BasicBlock([x for x in self.CODE.split("\n") if x.strip()], optimizer=self.optimizer)
+        self.optimizer.initialize_memory(blk)
+        self.blks = src.arch.z80.optimizer.flow_graph.get_basic_blocks(blk)
+        self.liveness = self.optimizer.liveness
+
+    def live_in(self, block: basicblock.BasicBlock) -> set[str]:
+        return mask_regs(self.liveness.live_in(block))
+
+    def live_out(self, block: basicblock.BasicBlock) -> set[str]:
+        return mask_regs(self.liveness.live_out(block))
+
+    def test_loop(self):
+        self.assertEqual(len(self.blks), 3)
+        loop = self.blks[1]
+        self.assertIn(loop, loop.goes_to)
+        self.assertTrue({"b", "d"} <= self.live_in(loop))
+        self.assertTrue({"b", "d"} <= self.live_out(loop))
+        self.assertNotIn("a", self.live_in(loop))
+        self.assertNotIn("c", self.live_out(loop))  # Not used by the loop nor after it
+
+    def test_is_used(self):
+        self.assertTrue(self.blks[0].is_used(["d"], 0))
+        self.assertFalse(self.blks[0].is_used(["c"], 0))
+        self.assertFalse(self.blks[1].is_used(["a"], 4))
+        self.assertFalse(self.blks[1].is_used(["hl"], 0))
+
+    def test_update_on_code_change(self):
+        self.assertNotIn("c", self.live_out(self.blks[0]))
+        self.blks[2].code = ["ld h, c", "ret"]
+        self.assertIn("c", self.live_out(self.blks[0]))
+        self.assertNotIn("d", self.live_in(self.blks[1]))
+
+        self.blks[2].code = ["ld h, c", "ld l, e", "ret"]
+        self.assertIn("e", self.live_in(self.blks[0]))
+
+    def test_reset_on_graph_change(self):
+        self.assertIn("d", self.live_out(self.blks[1]))
+        self.blks[1].delete_goes_to(self.blks[2])
+        self.assertNotIn("d", self.live_out(self.blks[1]))
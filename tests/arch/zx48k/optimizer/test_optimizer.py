@@ -58,3 +58,24 @@ class TestOptimizer:
         with mock_options_level(3):
             optimized_code = optimizer.Optimizer().optimize(code)
             assert optimized_code.split("\n") == ["add hl, sp", "pop iy", "jp (hl)"]
+
+    def test_rewrite_revisits_previous_is_required_checks(self):
+        code_src = """
+        ld a, 5
+        ld hl, (_a)
+        ld de, (_b)
+        add hl, de
+        ld (_c), hl
+        ld hl, (_d)
+        ld de, (_e)
+        add hl, de
+        ld (_f), hl
+        ld b, a
+        ld b, 3
+        ret
+        """
+        code = [x.strip() for x in code_src.split("\n") if x.strip()]
+
+        with mock_options_level(3):
+            optimized_code = optimizer.Optimizer().optimize(code)
+            assert optimized_code.split("\n") == code[1:9] + ["ld b, 3", "ret"]
@@ -5,9 +5,11 @@
 # See https://www.gnu.org/licenses/agpl-3.0.html for details.
 # --------------------------------------------------------------------
 
+import re
 import unittest
 
 from src.arch.z80.optimizer import asm, helpers
+from src.zxbasm import z80
 
 
 class TestASM(unittest.TestCase):
@@ -36,3 +38,41 @@ class TestASM(unittest.TestCase):
 
         a = helpers.simplify_asm_args("ld de, (30) + (40)")
         self.assertEqual("ld de, (70)", a)
+
+    def test_opcode_lookup_matches_linear_scan(self):
+        """The indexed opcode lookup must return the same as trying every
+        pattern in Z80_PATTERN in order
+        """
+
+        def linear_scan(instr: str):
+            return next((opcode for patt, opcode in asm.Z80_PATTERN.items() if patt.match(instr)), None)
+
+        literals = "5", "255", "0FFh", "_label", ".core.__LABEL0", "$ + 2", "(_a + 1)", "_x - 3", "ix + 1", "a"
+        re_n = re.compile(r"\bN+\b")
+        instructions = ["unknown instr", "label:", "ld a,", "defb 1, 2, 3", "defw _a, _b", "rst 38h", "im 3"]
+        for mnemonic in z80.Z80SET:
+            instructions.append(mnemonic)
+            for literal in literals:
+                instr = re_n.sub(literal, mnemonic)
+                instructions.extend((instr, instr.lower(), instr.lower().replace(",", ", ")))
+
+        for instr in instructions:
+            self.assertEqual(linear_scan(instr), asm.Asm.opcode(instr), instr)
+            self.assertEqual(linear_scan(instr), asm.Asm.opcode(instr), instr)  # cached
+
+    def test_decode_is_shared(self):
+        decoded = asm.decode("  LD A, (HL)")
+        self.assertIs(decoded, asm.decode("ld A, (HL)"))
+        self.assertIs(decoded, asm.decode("  LD A, (HL)"))
+        self.assertEqual(decoded.regs_oper, ("a", "(hl)"))
+
+        a = asm.Asm("  LD A, (HL)")
+        self.assertEqual((a.asm, a.inst, a.oper, a.cond), (decoded.asm, decoded.inst, list(decoded.oper), None))
+        a.oper.append("b")  # Asm operands are not shared
+        self.assertEqual(asm.Asm("  LD A, (HL)").oper, ["A", "(hl)"])
+
+    def test_clear_decoded(self):
+        decoded = asm.decode("ld a, (hl)")
+        asm.clear_decoded()
+        self.assertIsNot(decoded, asm.decode("ld a, (hl)"))
+        self.assertEqual(decoded, asm.decode("ld a, (hl)"))
@@ -0,0 +1,151 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src.api import config
+from src.api.config import OPTIONS
+from src.arch.z80.peephole import engine, stats
+
+
+class TestPatternIndex(unittest.TestCase):
+    CODE = [
+        "push hl",
+        "pop hl",
+        "ld a, 5",
+        "ld a, 6",
+        "ld (_a), a",
+        "or a",
+        "jp nz, __LABEL0",
+        "__LABEL0:",
+        "ex de, hl",
+        "ex de, hl",
+        "ret",
+        "retn",
+        "  nop",
+    ]
+
+    def setUp(self):
+        engine.main(force=True)
+
+    def test_candidates_keep_every_match(self):
+        """Every pattern matching at any position must be among the
+        candidates for that position, in the same relative order
+        """
+        index = engine.get_patterns(None, 4)
+        for i, line in enumerate(self.CODE):
+            candidates = index.candidates(line)
+            matching = [p for p in index if p.patt.match(self.CODE, start=i) is not None]
+            self.assertEqual(matching, [p for p in candidates if p in matching], line)
+            self.assertEqual(candidates, [p for p in index if p in candidates], line)
+
+    def test_candidates_are_filtered(self):
+        index = engine.get_patterns(None, 4)
+        self.assertLess(len(index.candidates("push hl")), len(index))
+
+    def test_get_patterns_filters_levels(self):
+        self.assertTrue(all(3 <= p.level <= 4 for p in engine.get_patterns(3, 4)))
+        self.assertIs(engine.get_patterns(3, 4), engine.get_patterns(3, 4))
+
+    def test_apply_match_counts_hits(self):
+        code = ["push hl", "pop hl"]
+        self.assertTrue(engine.apply_match(code, engine.get_patterns(3, 3)))
+        self.assertEqual(code, [])
+        self.assertEqual(sum(x.applications for x in stats.STATS.values()), 1)
+
+    def test_match_pattern_updates_stats(self):
+        pattern = next(p for p in engine.get_patterns(None, 4) if p.fname == "031_jpX_Y_jpX.opt")
+        with mock.patch.object(stats, "ENABLED", True):
+            self.assertIsNone(engine.match_pattern(pattern, ["nop"], 0))
+            self.assertIsNone(engine.match_pattern(pattern, ["ld a, 1", "nop"], 0))
+            self.assertIsNotNone(engine.match_pattern(pattern, ["jp __LABEL0", "nop"], 0))
+
+        rule_stats = stats.STATS[pattern.fname]
+        self.assertEqual((rule_stats.attempts, rule_stats.matches, rule_stats.cond_failures), (3, 2, 1))
+        self.assertGreater(rule_stats.time, 0)
+
+    def test_match_pattern_stats_disabled(self):
+        pattern = next(p for p in engine.get_patterns(None, 4) if p.fname == "031_jpX_Y_jpX.opt")
+        with mock.patch.object(stats, "ENABLED", False):
+            self.assertIsNone(engine.match_pattern(pattern, ["ld a, 1", "nop"], 0))
+            self.assertIsNotNone(engine.match_pattern(pattern, ["jp __LABEL0", "nop"], 0))
+
+        self.assertNotIn(pattern.fname, stats.STATS)
+
+    def test_pop_up_keeps_writes_to_the_popped_register(self):
+        pattern = next(p for p in engine.get_patterns(None, 4) if p.fname == "028_o2_pop_up.opt")
+        self.assertIsNotNone(engine.match_pattern(pattern, ["ld a, (_x)", "pop hl"], 0))
+        self.assertIsNone(engine.match_pattern(pattern, ["ld l, a", "pop hl"], 0))
+        self.assertIsNone(engine.match_pattern(pattern, ["ld hl, 0", "pop hl"], 0))
+        self.assertIsNone(engine.match_pattern(pattern, ["ld a, l", "pop af"], 0))
+        self.assertIsNone(engine.match_pattern(pattern, ["inc b", "pop af"], 0))
+        self.assertIsNone(engine.match_pattern(pattern, ["scf", "pop af"], 0))
+        self.assertIsNone(engine.match_pattern(pattern, ["inc hl", "pop hl"], 0))
+        self.assertIsNotNone(engine.match_pattern(pattern, ["inc b", "pop hl"], 0))
+
+
+class TestPatternCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.opts_path = tempfile.mkdtemp()
+        shutil.copy(os.path.join(engine.OPTS_PATH, "000_o1_push_pop.opt"), self.opts_path)
+        shutil.copy(os.path.join(engine.OPTS_PATH, "007_o1_ex_de_hl.opt"), self.opts_path)
+        self.patterns_path = os.path.join(self.cache_path, "peephole")
+        config.init()
+        OPTIONS.cache_dir = self.cache_path
+
+    def tearDown(self):
+        config.init()  # Restores OPTIONS (cache_dir can't be set back to None)
+        shutil.rmtree(self.cache_path)
+        shutil.rmtree(self.opts_path)
+        engine.main(force=True)
+
+    def load(self) -> list[engine.OptPattern]:
+        engine.main([self.opts_path], force=True)
+        return list(engine.get_patterns(None, 4))
+
+    def test_patterns_are_loaded_lazily(self):
+        engine.main([self.opts_path], force=True)
+        self.assertEqual(engine.PATTERNS, [])
+        self.assertEqual(len(engine.get_patterns(None, 4)), 2)
+        self.assertEqual(engine.MAXLEN, 2)
+
+    def test_cache_is_written_and_read(self):
+        parsed = self.load()
+        self.assertEqual(len(os.listdir(self.patterns_path)), 1)
+
+        with mock.patch.object(engine, "read_opt") as read_opt:
+            cached = self.load()
+
+        read_opt.assert_not_called()
+        self.assertEqual([p.fname for p in parsed], [p.fname for p in cached])
+        self.assertEqual(engine.MAXLEN, 2)
+
+    def test_cache_depends_on_opt_files(self):
+        self.load()
+        os.remove(os.path.join(self.opts_path, "007_o1_ex_de_hl.opt"))
+        self.assertEqual(len(self.load()), 1)
+        self.assertEqual(len(os.listdir(self.patterns_path)), 2)
+
+    def test_broken_cache_is_ignored(self):
+        self.load()
+        (cache_file,) = os.listdir(self.patterns_path)
+        with open(os.path.join(self.patterns_path, cache_file), "wb") as f:
+            f.write(b"garbage")
+
+        self.assertEqual(len(self.load()), 2)
+
+    def test_no_cache_dir(self):
+        config.init()
+        with mock.patch.object(engine, "_write_cache") as write_cache:
+            self.assertEqual(len(self.load()), 2)
+
+        write_cache.assert_not_called()
@@ -41,6 +41,25 @@ class TestBasicLinePattern(unittest.TestCase):
         self.assertEqual(patt.line, r"ld $1, a")
         self.assertEqual(patt.output, ["ld", " ", "$1", ",", " ", "a"])
 
+    def test_prefix_token(self):
+        patt = pattern.BasicLinePattern(" ld $1, a")
+        self.assertEqual(patt.prefix, "ld")
+        self.assertTrue(patt.prefix_is_token)
+        self.assertTrue(patt.may_match("ld"))
+        self.assertFalse(patt.may_match("ldir"))
+
+    def test_prefix_no_token(self):
+        patt = pattern.BasicLinePattern("ret")
+        self.assertEqual(patt.prefix, "ret")
+        self.assertFalse(patt.prefix_is_token)
+        self.assertTrue(patt.may_match("retn"))
+        self.assertFalse(patt.may_match("re"))
+
+    def test_prefix_var(self):
+        patt = pattern.BasicLinePattern("$1 a, b")
+        self.assertEqual(patt.prefix, "")
+        self.assertTrue(patt.may_match("ld"))
+
 
 class TestLinePattern(unittest.TestCase):
     def setUp(self) -> None:
@@ -97,3 +116,8 @@ class TestBlockPattern(unittest.TestCase):
         patt = pattern.BlockPattern(["push af", "pop bc"])
         match = patt.match(["push af", "pop bc"])
         self.assertEqual(match, {})
+
+    def test_may_match_first_line_only(self):
+        patt = pattern.BlockPattern(["push $1", "pop $1"])
+        self.assertTrue(patt.may_match("push"))
+        self.assertFalse(patt.may_match("pop"))
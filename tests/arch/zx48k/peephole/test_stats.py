@@ -0,0 +1,42 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+from src.arch.z80.peephole import stats
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(stats, "ENABLED", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stats.STATS.clear()
+        self.addCleanup(stats.STATS.clear)
+
+    def test_cost(self):
+        self.assertEqual(stats.cost(["ld a, 0", "", "__LABEL0:", "ret"]), (3, 17))
+        self.assertEqual(stats.cost([]), (0, 0))
+
+    def test_savings_are_only_measured_if_enabled(self):
+        stats.record_application("rule.opt", ["ld a, 0"], ["xor a"])
+        self.assertEqual(stats.STATS["rule.opt"], stats.RuleStats(applications=1))
+
+        stats.init()
+        stats.record_application("rule.opt", ["ld a, 0"], ["xor a"])
+        self.assertEqual(stats.STATS["rule.opt"], stats.RuleStats(applications=1, bytes_saved=1, tstates_saved=3))
+
+    def test_report_is_sorted_by_time(self):
+        stats.STATS["fast.opt"] = stats.RuleStats(attempts=10, time=0.001)
+        stats.STATS["slow.opt"] = stats.RuleStats(attempts=5, matches=2, applications=1, time=0.01, bytes_saved=2)
+        lines = stats.report().splitlines()
+
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("Rule"))
+        self.assertEqual(lines[1].split(), ["slow.opt", "5", "2", "0", "1", "10.000", "2", "0"])
+        self.assertEqual(lines[2].split(), ["fast.opt", "10", "0", "0", "0", "1.000", "0", "0"])
@@ -0,0 +1,89 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+import shutil
+from unittest import mock
+
+import pytest
+
+from src.api import config
+from src.arch.z80 import backend
+from src.zxbc import args_parser, batch, zxbc
+
+PATH = os.path.realpath(os.path.dirname(os.path.abspath(__file__)))
+
+# Test runners (i.e. pytest-xdist) might be running threads when workers are forked
+pytestmark = pytest.mark.filterwarnings("ignore:.*multi-threaded.*fork:DeprecationWarning")
+
+
+@pytest.fixture
+def programs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Binaries are written in the current directory
+    result = []
+    for name in "a", "b", "c":
+        shutil.copy(os.path.join(PATH, "empty.bas"), tmp_path / f"{name}.bas")
+        result.append(str(tmp_path / f"{name}.bas"))
+
+    return result
+
+
+@pytest.fixture
+def init_options():
+    config.init()
+    backend.Backend()  # Defines the "org" option, used by the parser
+
+
+def test_is_batch(init_options):
+    assert batch.is_batch(["-j", "2", "a.bas"])
+    assert batch.is_batch(["-j2", "a.bas"])
+    assert batch.is_batch(["a.bas", "--jobs=2"])
+    assert not batch.is_batch(["-O2", "a.bas"])
+    assert not batch.is_batch(["-o", "-j2", "a.bas"])  # Wrong: -o requires a value
+    assert not batch.is_batch(["-j", "2", "--help"])
+
+
+def test_is_batch_without_jobs_does_not_parse(init_options):
+    with mock.patch.object(args_parser, "parser") as parser:
+        assert not batch.is_batch(["-O2", "--tap", "-I", "jdir", "a.bas", "b.bas"])
+
+    parser.assert_not_called()
+
+
+def test_to_args(init_options):
+    args = ["-O2", "-j", "4", "-t", "-dd", "a.bas", "b.bas", "-D", "X", "-o", "a.bas", "--jobs=3", "-j5", "-DY=1"]
+    parser = args_parser.parser(batch=True)
+    options = parser.parse_args(args)
+    assert options.PROGRAM == ["a.bas", "b.bas"]
+    assert sorted(parser.to_args(options, exclude={"jobs"})) == sorted(
+        ["--debug", "--debug", "--optimize=2", "--tap", "--define=X", "--define=Y=1", "--output=a.bas"]
+    )
+
+
+@pytest.mark.parametrize("jobs", ["1", "2", "0"])
+def test_compiles_every_program(programs, jobs):
+    assert zxbc.main(["-j", jobs, "-O2"] + programs) == 0
+    binaries = [open(os.path.splitext(x)[0] + ".bin", "rb").read() for x in programs]
+    assert binaries[0] and all(x == binaries[0] for x in binaries)
+
+
+def test_output_is_collated_in_order(programs, capsys):
+    with open(programs[1], "wt") as f:
+        f.write("PRINT a$(\n")
+    with open(programs[2], "wt") as f:
+        f.write("LET x = \n")
+
+    assert zxbc.main(["-j", "3"] + programs) == 1
+    err = capsys.readouterr().err
+    assert "b.bas:1: error:" in err
+    assert "c.bas:1: error:" in err
+    assert err.index("b.bas") < err.index("c.bas")
+
+
+def test_output_not_allowed_for_several_programs(programs):
+    with pytest.raises(SystemExit):
+        zxbc.main(["-j", "2", "-o", "out.bin"] + programs)
@@ -0,0 +1,85 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+from unittest import mock
+
+import pytest
+
+from src.zxbc import build_cache, zxbc, zxbparser
+
+PROGRAM = """
+DIM a AS UByte
+DIM unused AS UInteger = 3
+a = a + 1
+PRINT a
+"""
+
+
+@pytest.fixture
+def program(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "prog.bas").write_text(PROGRAM)
+    return "prog.bas"
+
+
+def compile_(*args: str) -> int:
+    return zxbc.main(["--cache-dir", "cache", *args])
+
+
+def test_cache_hit_skips_compilation(program, capsys):
+    assert compile_(program, "-taB", "-M", "prog.map") == 0
+    expected = {"prog.tap": open("prog.tap", "rb").read(), "prog.map": open("prog.map", "rb").read()}
+    warnings = capsys.readouterr().err
+    assert "warning" in warnings
+    os.unlink("prog.tap")
+    os.unlink("prog.map")
+
+    with mock.patch.object(zxbparser.parser, "parse", side_effect=AssertionError("not cached")):
+        assert compile_(program, "-taB", "-M", "prog.map") == 0
+
+    assert {x: open(x, "rb").read() for x in expected} == expected
+    assert capsys.readouterr().err == warnings
+
+
+def test_cache_key_depends_on_options_and_source(program):
+    compile_(program)
+    with mock.patch.object(zxbparser.parser, "parse", wraps=zxbparser.parser.parse) as parse:
+        compile_(program, "-O3")
+        assert parse.call_count == 1
+
+        with open(program, "at") as f:
+            f.write("PRINT 1\n")
+        compile_(program)
+        assert parse.call_count == 2
+
+
+def test_errors_are_not_cached(program):
+    with open(program, "at") as f:
+        f.write("PRINT b$(\n")
+
+    assert compile_(program) == 1
+    assert not os.path.exists("cache") or not any(files for _, _, files in os.walk("cache"))
+
+
+@pytest.mark.parametrize("option", ["--peephole-stats", "--profile-passes"])
+def test_reports_skip_the_cache(program, option):
+    compile_(program)
+    with mock.patch.object(zxbparser.parser, "parse", wraps=zxbparser.parser.parse) as parse:
+        assert compile_(program, option, "report.txt") == 0
+        assert parse.call_count == 1
+
+    assert os.path.getsize("report.txt")
+
+
+def test_compiler_signature_is_computed_once(program):
+    compile_(program)
+    with mock.patch.object(os, "walk") as walk:
+        compile_(program, "-O3")
+        walk.assert_not_called()
+
+    assert build_cache._compiler_signature.cache_info().hits
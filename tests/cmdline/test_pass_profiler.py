@@ -0,0 +1,57 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import json
+import os
+
+from src.zxbc import pass_profiler, zxbc
+
+PATH = os.path.realpath(os.path.dirname(os.path.abspath(__file__)))
+
+PASSES = [
+    "preprocess",
+    "parse",
+    "unreachable_code",
+    "function_graph",
+    "ast_optimizer",
+    "translation",
+    "backend_emit",
+    "peephole_optimizer",
+    "asm_preprocess",
+    "variables_translation",
+    "assembly",
+    "binary_generation",
+]
+
+
+def test_profile_passes(tmp_path):
+    report_file = str(tmp_path / "report.json")
+    program = os.path.join(PATH, "empty.bas")
+    assert zxbc.main([program, "-o", str(tmp_path / "empty.bin"), "--profile-passes", report_file]) == 0
+
+    with open(report_file) as f:
+        report = json.load(f)
+
+    assert report["program"] == program
+    assert [x["name"] for x in report["passes"]] == PASSES
+    assert all(x["time"] >= 0 and x["peak_memory"] > 0 for x in report["passes"])
+    assert report["passes"][-2]["items"] > 0  # Bytes assembled
+    assert not pass_profiler.ENABLED
+
+
+def test_profile_passes_stdout(tmp_path, capsys):
+    program = os.path.join(PATH, "empty.bas")
+    assert zxbc.main([program, "--parse-only", "--profile-passes"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert [x["name"] for x in report["passes"]] == PASSES[:6]
+
+
+def test_disabled_profiler_does_nothing(monkeypatch):
+    monkeypatch.setattr(pass_profiler, "PASSES", [])
+    pass_profiler.begin("test")
+    pass_profiler.end(items=lambda: 1 // 0)
+    assert pass_profiler.PASSES == []
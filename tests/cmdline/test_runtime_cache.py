@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+from unittest import mock
+
+import pytest
+
+from src.zxbc import zxbc
+from src.zxbpp import runtime_cache, zxbpp
+
+PROGRAM = """
+DIM s$ AS String
+s$ = "hello" + STR$(3.5)
+PRINT AT 1, 2; s$
+"""
+
+
+@pytest.fixture
+def program(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runtime_cache, "_ENTRIES", {})
+    (tmp_path / "prog.bas").write_text(PROGRAM)
+    return "prog.bas"
+
+
+def compile_asm(program: str, output: str, *args: str) -> str:
+    assert zxbc.main([program, "-f", "asm", "-o", output, *args]) == 0
+    with open(output) as f:
+        return f.read()
+
+
+def test_runtime_modules_are_cached(program):
+    expected = compile_asm(program, "prog1.asm")
+    assert len(runtime_cache._ENTRIES) == 4  # copy_attr, print, printstr and storestr
+
+    with mock.patch.object(zxbpp, "filter_", wraps=zxbpp.filter_) as filter_:
+        assert compile_asm(program, "prog2.asm") == expected
+        assert filter_.call_count == 1  # Only user code
+
+
+def test_runtime_modules_are_shared(program):
+    compile_asm(program, "prog1.asm")
+    with open(program, "at") as f:  # Requires another module
+        f.write("PRINT LEN(s$) * 2.5\n")
+
+    with mock.patch.object(zxbpp, "filter_", wraps=zxbpp.filter_) as filter_:
+        result = compile_asm(program, "prog2.asm")
+        assert 1 < filter_.call_count < 1 + len(runtime_cache._ENTRIES)  # User code and new modules only
+
+    runtime_cache._ENTRIES.clear()
+    assert compile_asm(program, "prog3.asm") == result
+
+
+def test_cached_runtime_modules_are_relocated(program):
+    compile_asm(program, "prog1.asm")
+    with open(program, "at") as f:
+        f.write("PRINT 1\nPRINT 2\n")
+
+    result = compile_asm(program, "prog2.asm")
+    runtime_cache._ENTRIES.clear()
+    assert compile_asm(program, "prog3.asm") == result
+
+
+def test_disk_cache(program):
+    compile_asm(program, "prog1.asm", "--cache-dir", "cache")
+    runtime_cache._ENTRIES.clear()
+    with open(program, "at") as f:  # Avoids using the compilation cache (requires the same runtime modules)
+        f.write("PRINT AT 3, 4; s$\n")
+
+    with mock.patch.object(runtime_cache, "put") as put:
+        result = compile_asm(program, "prog2.asm", "--cache-dir", "cache")
+        put.assert_not_called()
+
+    runtime_cache._ENTRIES.clear()
+    assert compile_asm(program, "prog3.asm") == result
+
+
+def test_entry_invalidated_on_file_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime_cache, "_ENTRIES", {})
+    fname = tmp_path / "module.asm"
+    fname.write_text("nop\n")
+    entry = runtime_cache.Entry(
+        files=[runtime_cache.file_signature(str(fname))], requires={}, output="", included={}, defines={}
+    )
+    runtime_cache.put("key", entry)
+    assert runtime_cache.get("key") == [entry]
+
+    fname.write_text("halt\n")
+    os.utime(fname, ns=(0, 0))
+    assert runtime_cache.get("key") == []
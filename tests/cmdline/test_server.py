@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from src.zxbc import server, zxbc
+
+PATH = os.path.realpath(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_compiler(args: list[str]) -> int:
+    """Echoes its arguments, and exits as requested"""
+    print(" ".join(args))
+    print(os.getcwd(), file=sys.stderr)
+    if args[0] == "exit":
+        sys.exit(int(args[1]))
+    if args[0] == "raise":
+        raise ValueError("boom")
+    return len(args)
+
+
+def test_run_job_captures_output():
+    response = server.run_job({"args": ["a", "b"], "cwd": PATH}, fake_compiler)
+    assert response == {"exit_code": 2, "stdout": "a b\n", "stderr": f"{PATH}\n"}
+
+
+def test_run_job_restores_cwd():
+    cwd = os.getcwd()
+    server.run_job({"args": ["raise"], "cwd": PATH}, fake_compiler)
+    assert os.getcwd() == cwd
+
+
+def test_run_job_handles_exit_and_exceptions():
+    assert server.run_job({"args": ["exit", "3"]}, fake_compiler)["exit_code"] == 3
+    response = server.run_job({"args": ["raise"]}, fake_compiler)
+    assert response["exit_code"] == 1
+    assert "ValueError: boom" in response["stderr"]
+
+
+def test_serve_invalid_requests():
+    output = io.StringIO()
+    server.serve(io.StringIO('not json\n\n[1, 2]\n{"args": "x"}\n'), output, fake_compiler)
+    responses = [json.loads(x) for x in output.getvalue().splitlines()]
+    assert [x["exit_code"] for x in responses] == [2, 2, 2]
+    assert all("invalid request" in x["stderr"] for x in responses)
+
+
+def test_serve_compiles_several_programs(tmp_path):
+    """The server must give the same result for every compilation of the same program"""
+    program = os.path.join(PATH, "empty.bas")
+    requests = [
+        {"args": [program, "-o", str(tmp_path / "empty1.bin")]},
+        {"args": ["--arch=zxnext", program, "-o", str(tmp_path / "empty2.bin")]},
+        {"args": [program, "-o", str(tmp_path / "empty3.bin")]},
+        {"args": ["--no-such-option", program]},
+    ]
+    output = io.StringIO()
+    server.serve(io.StringIO("".join(json.dumps(x) + "\n" for x in requests)), output, zxbc.main)
+    responses = [json.loads(x) for x in output.getvalue().splitlines()]
+
+    assert [x["exit_code"] for x in responses] == [0, 0, 0, 2]
+    assert (tmp_path / "empty1.bin").read_bytes() == (tmp_path / "empty3.bin").read_bytes()
+    assert "--no-such-option" in responses[3]["stderr"]
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="UNIX sockets not available")
+def test_connect(tmp_path, capsys):
+    socket_path = str(tmp_path / "zxbc.sock")
+    thread = threading.Thread(target=server.serve_unix, args=(socket_path, fake_compiler), daemon=True)
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+
+    assert zxbc.main(["--connect", socket_path, "x", "y", "z"]) == 3
+    captured = capsys.readouterr()
+    assert captured.out == "x y z\n"
+    assert captured.err == f"{os.getcwd()}\n"
+
+
+def test_connect_without_server(tmp_path, capsys):
+    assert zxbc.main(["--connect", str(tmp_path / "none.sock"), "x"]) == 1
+    assert "could not connect" in capsys.readouterr().err
@@ -0,0 +1,36 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from src.zxbc import zxbc
+
+PATH = os.path.realpath(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_simulate(tmp_path):
+    report_file = tmp_path / "report.txt"
+    program = os.path.join(PATH, "empty.bas")
+    assert zxbc.main([program, "-o", str(tmp_path / "empty.bin"), "--simulate", str(report_file)]) == 0
+
+    report = report_file.read_text()
+    assert f"Program: {program}\n" in report
+    assert "Stopped: program finished\n" in report
+
+
+def test_simulate_stdout(tmp_path, capsys):
+    program = os.path.join(PATH, "empty.bas")
+    assert zxbc.main([program, "-o", str(tmp_path / "empty.bin"), "--simulate"]) == 0
+    assert "Stopped: program finished\n" in capsys.readouterr().out
+
+
+def test_simulate_requires_binary(tmp_path):
+    program = os.path.join(PATH, "empty.bas")
+    with pytest.raises(SystemExit):
+        zxbc.main([program, "-o", str(tmp_path / "empty.asm"), "-f", "asm", "--simulate"])
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from src.arch.z80.optimizer import timing
+from src.zxbc import zxbc
+
+PATH = os.path.realpath(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAM = """\
+DIM a AS UByte
+DIM s AS UInteger
+
+SUB fill(n AS UByte)
+    DIM i AS UByte
+    FOR i = 0 TO n
+        POKE 16384 + i, 255
+    NEXT i
+END SUB
+
+FOR a = 1 TO 10
+    fill(a)
+NEXT a
+
+WHILE s > 10
+    s = s - 3
+END WHILE
+"""
+
+
+def get_rows(report: str, header: str) -> list[list[str]]:
+    """Returns the rows of the table with the given header (first column)"""
+    table = next(x for x in report.split("\n\n") if x.startswith(header))
+    return [x.split() for x in table.splitlines()[1:]]
+
+
+@pytest.mark.parametrize("level", ["-O2", "-O3"])
+def test_timing_report(tmp_path, level):
+    program = tmp_path / "test.bas"
+    program.write_text(PROGRAM)
+    report_file = tmp_path / "report.txt"
+    args = [str(program), level, "-o", str(tmp_path / "test.bin"), "--timing-report", str(report_file)]
+    assert zxbc.main(args) == 0
+    assert not timing.ENABLED
+
+    report = report_file.read_text()
+    functions = {x[1]: x for x in get_rows(report, "Kind")}
+    assert functions["(main)"][0] == "PROGRAM"
+    assert functions["fill"][:3] == ["SUB", "fill", f"{program}:4"]
+
+    loops = {x[1]: x for x in get_rows(report, "Loop")}
+    assert sorted(loops) == [f"{program}:{x}" for x in (11, 15, 6)]
+    assert loops[f"{program}:6"][0] == "FOR"
+    assert loops[f"{program}:15"][0] == "WHILE"
+
+    # The WHILE loop: the condition (jumping out) and the body (jumping back)
+    blocks = [x for x in get_rows(report, "Block") if f"{program}:15" in x]
+    assert sum(int(x[-2]) for x in blocks) == int(loops[f"{program}:15"][2])
+    assert sum(int(x[-1]) for x in blocks) == int(loops[f"{program}:15"][3])
+
+    # Every block of the SUB is within it
+    blocks = [x for x in get_rows(report, "Block") if "fill" in x]
+    assert sum(int(x[-2]) for x in blocks) == int(functions["fill"][3])
+
+
+def test_timing_report_stdout(capsys):
+    program = os.path.join(PATH, "empty.bas")
+    assert zxbc.main([program, "-f", "asm", "-o", os.devnull, "--timing-report"]) == 0
+    assert capsys.readouterr().out.startswith("Kind")
+
+
+def test_timing_report_requires_asm():
+    program = os.path.join(PATH, "empty.bas")
+    with pytest.raises(SystemExit):
+        zxbc.main([program, "--parse-only", "--timing-report"])
@@ -29,8 +29,14 @@ _a:
 	ld a, ((.LABEL._test) + (1))
 	ld l, a
 	ld h, 0
-	ld de, 256
-	call .core.__MUL16_FAST
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
 	ex de, hl
 	pop hl
 	add hl, de
@@ -58,31 +64,4 @@ _a:
 	ld c, l
 	jp .core.__END_PROGRAM
 	;; --- end of user code ---
-#line 1 "/zxbasic/src/lib/arch/zx48k/runtime/arith/mul16.asm"
-	    push namespace core
-__MUL16:	; Mutiplies HL with the last value stored into de stack
-	    ; Works for both signed and unsigned
-	    PROC
-	    LOCAL __MUL16LOOP
-	    LOCAL __MUL16NOADD
-	    ex de, hl
-	    pop hl		; Return address
-	    ex (sp), hl ; CALLEE caller convention
-__MUL16_FAST:
-	    ld b, 16
-	    ld a, h
-	    ld c, l
-	    ld hl, 0
-__MUL16LOOP:
-	    add hl, hl  ; hl << 1
-	    sla c
-	    rla         ; a,c << 1
-	    jp nc, __MUL16NOADD
-	    add hl, de
-__MUL16NOADD:
-	    djnz __MUL16LOOP
-	    ret	; Result in hl (16 lower bits)
-	    ENDP
-	    pop namespace
-#line 16 "arch/zx48k/loadu16ii.bas"
 	END
@@ -0,0 +1,281 @@
+	org 32768
+.core.__START_PROGRAM:
+	di
+	push ix
+	push iy
+	exx
+	push hl
+	exx
+	ld (.core.__CALL_BACK__), sp
+	ei
+	jp .core.__MAIN_PROGRAM__
+.core.__CALL_BACK__:
+	DEFW 0
+.core.ZXBASIC_USER_DATA:
+	; Defines USER DATA Length in bytes
+.core.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_END - .core.ZXBASIC_USER_DATA
+	.core.__LABEL__.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_LEN
+	.core.__LABEL__.ZXBASIC_USER_DATA EQU .core.ZXBASIC_USER_DATA
+_i:
+	DEFB 00
+_a:
+	DEFW .LABEL.__LABEL0
+_a.__DATA__.__PTR__:
+	DEFW _a.__DATA__
+	DEFW _a.__LBOUND__
+	DEFW 0
+_a.__DATA__:
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+.LABEL.__LABEL0:
+	DEFW 0000h
+	DEFB 01h
+_a.__LBOUND__:
+	DEFW 0001h
+_b:
+	DEFW .LABEL.__LABEL1
+_b.__DATA__.__PTR__:
+	DEFW _b.__DATA__
+	DEFW _b.__LBOUND__
+	DEFW 0
+_b.__DATA__:
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+.LABEL.__LABEL1:
+	DEFW 0000h
+	DEFB 05h
+_b.__LBOUND__:
+	DEFW 0001h
+.core.ZXBASIC_USER_DATA_END:
+.core.__MAIN_PROGRAM__:
+	ld a, 2
+	ld (_i), a
+	call _f
+	push af
+	ld a, (_i)
+	ld l, a
+	ld h, 0
+	ld de, _a.__DATA__ - 1
+	add hl, de
+	pop af
+	ld (hl), a
+	call _f
+	srl a
+	call .core.__U8TOFREG
+	push bc
+	push de
+	push af
+	ld a, (_i)
+	ld l, a
+	ld h, 0
+	ld d, h
+	ld e, l
+	add hl, hl
+	add hl, hl
+	add hl, de
+	ld de, _b.__DATA__ - 5
+	add hl, de
+	pop af
+	pop de
+	pop bc
+	call .core.__STOREF
+	ld a, (_a.__DATA__ + 4)
+	ld (60000), a
+	ld a, (_b.__DATA__ + 35)
+	ld de, (_b.__DATA__ + 35 + 1)
+	ld bc, (_b.__DATA__ + 35 + 3)
+	ld hl, 60001
+	call .core.__STOREF
+	ld hl, 0
+	ld b, h
+	ld c, l
+.core.__END_PROGRAM:
+	di
+	ld hl, (.core.__CALL_BACK__)
+	ld sp, hl
+	exx
+	pop hl
+	pop iy
+	pop ix
+	exx
+	ei
+	ret
+_f:
+	ld a, (_i)
+	add a, 3
+	ld (_i), a
+	ld a, 7
+_f__leave:
+	ret
+	;; --- end of user code ---
+#line 1 "/zxbasic/src/lib/arch/zx48k/runtime/storef.asm"
+	    push namespace core
+__PISTOREF:	; Indect Stores a float (A, E, D, C, B) at location stored in memory, pointed by (IX + HL)
+	    push de
+	    ex de, hl	; DE <- HL
+	    push ix
+	    pop hl		; HL <- IX
+	    add hl, de  ; HL <- IX + HL
+	    pop de
+__ISTOREF:  ; Load address at hl, and stores A,E,D,C,B registers at that address. Modifies A' register
+	    ex af, af'
+	    ld a, (hl)
+	    inc hl
+	    ld h, (hl)
+	    ld l, a     ; HL = (HL)
+	    ex af, af'
+__STOREF:	; Stores the given FP number in A EDCB at address HL
+	    ld (hl), a
+	    inc hl
+	    ld (hl), e
+	    inc hl
+	    ld (hl), d
+	    inc hl
+	    ld (hl), c
+	    inc hl
+	    ld (hl), b
+	    ret
+	    pop namespace
+#line 62 "arch/zx48k/opt2_arr_inline_eval_order.bas"
+#line 1 "/zxbasic/src/lib/arch/zx48k/runtime/u32tofreg.asm"
+#line 1 "/zxbasic/src/lib/arch/zx48k/runtime/neg32.asm"
+	    push namespace core
+__ABS32:
+	    bit 7, d
+	    ret z
+__NEG32: ; Negates DEHL (Two's complement)
+	    ld a, l
+	    cpl
+	    ld l, a
+	    ld a, h
+	    cpl
+	    ld h, a
+	    ld a, e
+	    cpl
+	    ld e, a
+	    ld a, d
+	    cpl
+	    ld d, a
+	    inc l
+	    ret nz
+	    inc h
+	    ret nz
+	    inc de
+	    ret
+	    pop namespace
+#line 2 "/zxbasic/src/lib/arch/zx48k/runtime/u32tofreg.asm"
+	    push namespace core
+__I8TOFREG:
+	    ld l, a
+	    rlca
+	    sbc a, a	; A = SGN(A)
+	    ld h, a
+	    ld e, a
+	    ld d, a
+__I32TOFREG:	; Converts a 32bit signed integer (stored in DEHL)
+	    ; to a Floating Point Number returned in (A ED CB)
+	    ld a, d
+	    or a		; Test sign
+	    jp p, __U32TOFREG	; It was positive, proceed as 32bit unsigned
+	    call __NEG32		; Convert it to positive
+	    call __U32TOFREG	; Convert it to Floating point
+	    set 7, e			; Put the sign bit (negative) in the 31bit of mantissa
+	    ret
+__U8TOFREG:
+	    ; Converts an unsigned 8 bit (A) to Floating point
+	    ld l, a
+	    ld h, 0
+	    ld e, h
+	    ld d, h
+__U32TOFREG:	; Converts an unsigned 32 bit integer (DEHL)
+	    ; to a Floating point number returned in A ED CB
+	    PROC
+	    LOCAL __U32TOFREG_END
+	    ld a, d
+	    or e
+	    or h
+	    or l
+	    ld b, d
+	    ld c, e		; Returns 00 0000 0000 if ZERO
+	    ret z
+	    push de
+	    push hl
+	    exx
+	    pop de  ; Loads integer into B'C' D'E'
+	    pop bc
+	    exx
+	    ld l, 128	; Exponent
+	    ld bc, 0	; DEBC = 0
+	    ld d, b
+	    ld e, c
+__U32TOFREG_LOOP: ; Also an entry point for __F16TOFREG
+	    exx
+	    ld a, d 	; B'C'D'E' == 0 ?
+	    or e
+	    or b
+	    or c
+	    jp z, __U32TOFREG_END	; We are done
+	    srl b ; Shift B'C' D'E' >> 1, output bit stays in Carry
+	    rr c
+	    rr d
+	    rr e
+	    exx
+	    rr e ; Shift EDCB >> 1, inserting the carry on the left
+	    rr d
+	    rr c
+	    rr b
+	    inc l	; Increment exponent
+	    jp __U32TOFREG_LOOP
+__U32TOFREG_END:
+	    exx
+	    ld a, l     ; Puts the exponent in a
+	    res 7, e	; Sets the sign bit to 0 (positive)
+	    ret
+	    ENDP
+	    pop namespace
+#line 63 "arch/zx48k/opt2_arr_inline_eval_order.bas"
+	END
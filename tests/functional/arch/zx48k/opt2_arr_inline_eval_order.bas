@@ -0,0 +1,15 @@
+REM The value is evaluated before the (inline) element address
+DIM i AS UByte
+DIM a(1 TO 8) AS UByte
+DIM b(1 TO 8) AS Float
+
+FUNCTION f AS UByte
+    i = i + 3
+    RETURN 7
+END FUNCTION
+
+i = 2
+a(i) = f()
+b(i) = f() / 2
+POKE 60000, a(5)
+POKE Float 60001, b(8)
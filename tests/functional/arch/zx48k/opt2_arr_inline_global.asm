@@ -0,0 +1,202 @@
+	org 32768
+.core.__START_PROGRAM:
+	di
+	push ix
+	push iy
+	exx
+	push hl
+	exx
+	ld (.core.__CALL_BACK__), sp
+	ei
+	jp .core.__MAIN_PROGRAM__
+.core.__CALL_BACK__:
+	DEFW 0
+.core.ZXBASIC_USER_DATA:
+	; Defines USER DATA Length in bytes
+.core.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_END - .core.ZXBASIC_USER_DATA
+	.core.__LABEL__.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_LEN
+	.core.__LABEL__.ZXBASIC_USER_DATA EQU .core.ZXBASIC_USER_DATA
+_i:
+	DEFB 00
+_j:
+	DEFB 00
+_a:
+	DEFW .LABEL.__LABEL10
+_a.__DATA__.__PTR__:
+	DEFW _a.__DATA__
+	DEFW _a.__LBOUND__
+	DEFW 0
+_a.__DATA__:
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+.LABEL.__LABEL10:
+	DEFW 0001h
+	DEFW 0005h
+	DEFB 02h
+_a.__LBOUND__:
+	DEFW 0001h
+	DEFW 0002h
+_b:
+	DEFW .LABEL.__LABEL11
+_b.__DATA__.__PTR__:
+	DEFW _b.__DATA__
+	DEFW _b.__LBOUND__
+	DEFW 0
+_b.__DATA__:
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+	DEFB 00h
+.LABEL.__LABEL11:
+	DEFW 0000h
+	DEFB 01h
+_b.__LBOUND__:
+	DEFW 0003h
+.core.ZXBASIC_USER_DATA_END:
+.core.__MAIN_PROGRAM__:
+	ld a, 1
+	ld (_i), a
+	jp .LABEL.__LABEL0
+.LABEL.__LABEL3:
+	ld a, 2
+	ld (_j), a
+	jp .LABEL.__LABEL5
+.LABEL.__LABEL8:
+	ld hl, (_i - 1)
+	ld a, (_j)
+	add a, h
+	ld l, a
+	ld h, 0
+	ld de, _b.__DATA__ - 3
+	add hl, de
+	ld a, (hl)
+	ld l, a
+	ld h, 0
+	ld b, h
+	ld c, l
+	ld a, (_i)
+	ld l, a
+	ld h, 0
+	ld d, h
+	ld e, l
+	add hl, hl
+	add hl, hl
+	add hl, de
+	add hl, hl
+	push hl
+	ld a, (_j)
+	ld l, a
+	ld h, 0
+	add hl, hl
+	ex de, hl
+	pop hl
+	add hl, de
+	ld de, _a.__DATA__ - 14
+	add hl, de
+	ld (hl), c
+	inc hl
+	ld (hl), b
+	ld hl, _j
+	inc (hl)
+.LABEL.__LABEL5:
+	ld a, 6
+	ld hl, (_j - 1)
+	cp h
+	jp nc, .LABEL.__LABEL8
+	ld hl, _i
+	inc (hl)
+.LABEL.__LABEL0:
+	ld a, 4
+	ld hl, (_i - 1)
+	cp h
+	jp nc, .LABEL.__LABEL3
+	ld a, (_j)
+	dec a
+	ld l, a
+	ld h, 0
+	add hl, hl
+	ld de, _a.__DATA__ + 16
+	add hl, de
+	ld a, (hl)
+	inc hl
+	ld h, (hl)
+	ld l, a
+	ld b, a
+	ld a, (_i)
+	ld l, a
+	ld h, 0
+	ld de, _b.__DATA__ - 3
+	add hl, de
+	ld a, b
+	ld (hl), a
+	ld a, (_i)
+	ld l, a
+	ld h, 0
+	ld d, h
+	ld e, l
+	add hl, hl
+	add hl, hl
+	add hl, de
+	add hl, hl
+	ld de, _a.__DATA__ - 10
+	add hl, de
+	ld a, 99
+	ld (hl), a
+	ld hl, 0
+	ld b, h
+	ld c, l
+.core.__END_PROGRAM:
+	di
+	ld hl, (.core.__CALL_BACK__)
+	ld sp, hl
+	exx
+	pop hl
+	pop iy
+	pop ix
+	exx
+	ei
+	ret
+	;; --- end of user code ---
+	END
@@ -0,0 +1,14 @@
+REM Inline element address of LOCAL arrays with static bounds
+SUB test
+    DIM i, j AS UByte
+    DIM a(1 TO 4, 2 TO 6) AS UInteger
+    DIM b(3 TO 10) AS UByte
+    FOR i = 1 TO 4
+        FOR j = 2 TO 6
+            a(i, j) = b(i + j)
+        NEXT j
+    NEXT i
+    b(i) = a(3, j - 1)
+    POKE @a(i, 2), 99
+END SUB
+test
@@ -55,7 +55,7 @@ _doorY:
 	sub h
 	sub 1
 	sbc a, a
-	push af
+	ld b, a
 	ld hl, (_toloY)
 	ld a, (hl)
 	ld hl, (_doorY - 1)
@@ -63,21 +63,22 @@ _doorY:
 	sub 1
 	sbc a, a
 	ld h, a
-	pop af
+	ld a, b
 	or a
 	jr z, .LABEL.__LABEL2
 	ld a, h
 .LABEL.__LABEL2:
 	pop de
 	or d
-	push af
+	ld b, a
 	ld hl, (_toloY)
 	ld de, (_toloX)
 	or a
 	sbc hl, de
-	pop de
 	sbc a, a
-	or d
+	ld h, a
+	ld a, b
+	or h
 	jp z, .LABEL.__LABEL1
 	xor a
 	ld (_doorX), a
@@ -55,7 +55,7 @@ _doorY:
 	sub h
 	sub 1
 	sbc a, a
-	push af
+	ld b, a
 	ld hl, (_toloY)
 	ld a, (hl)
 	ld hl, (_doorY - 1)
@@ -63,7 +63,7 @@ _doorY:
 	sub 1
 	sbc a, a
 	ld h, a
-	pop af
+	ld a, b
 	or a
 	jr z, .LABEL.__LABEL2
 	ld a, h
@@ -0,0 +1,121 @@
+	org 32768
+.core.__START_PROGRAM:
+	di
+	push ix
+	push iy
+	exx
+	push hl
+	exx
+	ld (.core.__CALL_BACK__), sp
+	ei
+	jp .core.__MAIN_PROGRAM__
+.core.__CALL_BACK__:
+	DEFW 0
+.core.ZXBASIC_USER_DATA:
+	; Defines USER DATA Length in bytes
+.core.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_END - .core.ZXBASIC_USER_DATA
+	.core.__LABEL__.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_LEN
+	.core.__LABEL__.ZXBASIC_USER_DATA EQU .core.ZXBASIC_USER_DATA
+_i:
+	DEFB 00
+_x:
+	DEFB 00
+_y:
+	DEFB 00
+_s:
+	DEFB 00, 00
+_t:
+	DEFB 00, 00
+_dx:
+	DEFB 00, 00
+_dy:
+	DEFB 00, 00
+.core.ZXBASIC_USER_DATA_END:
+.core.__MAIN_PROGRAM__:
+	ld hl, 3
+	ld (_dx), hl
+	ld hl, 5
+	ld (_dy), hl
+	ld a, 1
+	ld (_i), a
+	jp .LABEL.__LABEL0
+.LABEL.__LABEL3:
+	ld hl, (_x - 1)
+	ld a, (_i)
+	add a, h
+	ld b, a
+	ld a, (_y)
+	ld hl, (_i - 1)
+	sub h
+	ld h, a
+	ld a, b
+	sub h
+	ld (_x), a
+	ld hl, (_i - 1)
+	ld a, (_x)
+	and h
+	ld b, a
+	ld a, (_y)
+	or 1
+	ld h, a
+	ld a, b
+	add a, h
+	ld (_y), a
+	ld de, (_s)
+	ld hl, (_dx)
+	add hl, de
+	ld b, h
+	ld c, l
+	ld hl, (_t)
+	ld de, (_dy)
+	or a
+	sbc hl, de
+	add hl, bc
+	ld (_s), hl
+	ld de, (_t)
+	ld hl, (_dy)
+	add hl, de
+	ld b, h
+	ld c, l
+	ld hl, (_s)
+	ld de, (_dx)
+	or a
+	sbc hl, de
+	ld d, h
+	ld e, l
+	ld h, b
+	ld l, c
+	or a
+	sbc hl, de
+	ld (_t), hl
+	ld hl, _i
+	inc (hl)
+.LABEL.__LABEL0:
+	ld a, 200
+	ld hl, (_i - 1)
+	cp h
+	jp nc, .LABEL.__LABEL3
+	ld a, (_x)
+	ld (40000), a
+	ld a, (_y)
+	ld (40001), a
+	ld hl, (_s)
+	ld (40002), hl
+	ld hl, (_t)
+	ld (40004), hl
+	ld hl, 0
+	ld b, h
+	ld c, l
+.core.__END_PROGRAM:
+	di
+	ld hl, (.core.__CALL_BACK__)
+	ld sp, hl
+	exx
+	pop hl
+	pop iy
+	pop ix
+	exx
+	ei
+	ret
+	;; --- end of user code ---
+	END
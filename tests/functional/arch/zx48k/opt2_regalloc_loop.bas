@@ -0,0 +1,16 @@
+REM Intermediate results of an arithmetic loop are kept in BC instead of the stack
+DIM i, x, y AS UByte
+DIM s, t, dx, dy AS UInteger
+
+dx = 3
+dy = 5
+FOR i = 1 TO 200
+    x = (x + i) - (y - i)
+    y = (x bAND i) + (y bOR 1)
+    s = (s + dx) + (t - dy)
+    t = (t + dy) - (s - dx)
+NEXT i
+POKE 40000, x
+POKE 40001, y
+POKE UInteger 40002, s
+POKE UInteger 40004, t
@@ -36,12 +36,13 @@ _nfires:
 	ld (_doorid), a
 	ld (_nfires), a
 	ld (_key), a
-	ld a, (_level)
+	ld a, 1
 	ld (_key), a
-	ld a, (_doorid)
+	xor a
 	ld (_doorstate), a
-	ld hl, _nfires
-	inc (hl)
+	ld a, 1
+	ld (_nfires), a
+	xor a
 	ld (_nfires), a
 	ld bc, 0
 .core.__END_PROGRAM:
@@ -24,8 +24,8 @@ _b:
 .core.__MAIN_PROGRAM__:
 	ld hl, 19
 	ld (_a), hl
-	ex de, hl
 	ld hl, (_b)
+	ld de, 19
 	add hl, de
 	ld (_a), hl
 	ld bc, 0
@@ -38,15 +38,15 @@ _dataSprite:
 	ld hl, (_dataSprite)
 	ld de, 12
 	add hl, de
-	push hl
+	ld b, h
+	ld c, l
 	ld hl, (_dataSprite)
 	ld de, 5
 	add hl, de
 	ld a, (hl)
-	pop hl
 	add a, a
 	add a, a
-	ld (hl), a
+	ld (bc), a
 	ld hl, (_dataSprite)
 	ld de, 17
 	add hl, de
@@ -57,13 +57,13 @@ _dataSprite:
 	ld hl, (_dataSprite)
 	ld de, 30
 	add hl, de
-	push hl
+	ld b, h
+	ld c, l
 	ld hl, (_dataSprite)
 	ld de, 8
 	add hl, de
 	ld a, (hl)
-	pop hl
-	ld (hl), a
+	ld (bc), a
 	ld hl, 0
 	ld (31748), hl
 	ld hl, (_dataSprite)
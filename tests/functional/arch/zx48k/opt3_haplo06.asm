@@ -25,6 +25,7 @@ _y:
 	ld hl, (_y)
 	ld a, (_a)
 	or (hl)
+	ld b, a
 	inc hl
 	or (hl)
 	ld (_a), a
@@ -30,23 +30,23 @@ _dataSprite:
 	ld hl, (_dataSprite)
 	ld de, 11
 	add hl, de
-	push hl
+	ld b, h
+	ld c, l
 	ld hl, (_dataSprite)
 	ld de, 28
 	add hl, de
 	ld a, (hl)
-	pop hl
-	ld (hl), a
+	ld (bc), a
 	ld hl, (_dataSprite)
 	ld de, 12
 	add hl, de
-	push hl
+	ld b, h
+	ld c, l
 	ld hl, (_dataSprite)
 	ld de, 29
 	add hl, de
 	ld a, (hl)
-	pop hl
-	ld (hl), a
+	ld (bc), a
 	ld hl, (_dataSprite)
 	inc de
 	add hl, de
@@ -109,22 +109,18 @@ _ScanField:
 .LABEL.__LABEL8:
 	or a
 	jp z, .LABEL.__LABEL0
-	ld hl, .LABEL._overlay
-	push hl
+	ld bc, .LABEL._overlay
 	ld l, (ix+6)
 	ld h, (ix+7)
 	add hl, hl
 	add hl, hl
 	add hl, hl
-	ex de, hl
-	pop hl
-	add hl, de
-	push hl
+	add hl, bc
+	ld b, h
+	ld c, l
 	ld l, (ix+4)
 	ld h, (ix+5)
-	ex de, hl
-	pop hl
-	add hl, de
+	add hl, bc
 	ld (ix-2), l
 	ld (ix-1), h
 	ld a, (hl)
@@ -156,12 +152,11 @@ _SetField:
 	ex de, hl
 	ld hl, .LABEL._overlay
 	add hl, de
-	push hl
+	ld b, h
+	ld c, l
 	ld l, (ix+4)
 	ld h, (ix+5)
-	ex de, hl
-	pop hl
-	add hl, de
+	add hl, bc
 	ld (ix-2), l
 	ld (ix-1), h
 	push hl
@@ -393,7 +388,7 @@ checkParity:
 	    ret
 	    ENDP
 	    pop namespace
-#line 354 "arch/zx48k/opt3_lcd5.bas"
+#line 349 "arch/zx48k/opt3_lcd5.bas"
 #line 1 "/zxbasic/src/lib/arch/zx48k/runtime/cmp/lti16.asm"
 #line 1 "/zxbasic/src/lib/arch/zx48k/runtime/cmp/lei8.asm"
 	    push namespace core
@@ -435,7 +430,7 @@ checkParity:
 	    ret
 	    ENDP
 	    pop namespace
-#line 355 "arch/zx48k/opt3_lcd5.bas"
+#line 350 "arch/zx48k/opt3_lcd5.bas"
 #line 1 "/zxbasic/src/lib/arch/zx48k/runtime/ftou32reg.asm"
 #line 1 "/zxbasic/src/lib/arch/zx48k/runtime/neg32.asm"
 	    push namespace core
@@ -534,5 +529,5 @@ __FTOU8:	; Converts float in C ED LH to Unsigned byte in A
 	    ld a, l
 	    ret
 	    pop namespace
-#line 356 "arch/zx48k/opt3_lcd5.bas"
+#line 351 "arch/zx48k/opt3_lcd5.bas"
 	END
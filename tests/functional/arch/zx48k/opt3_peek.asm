@@ -23,14 +23,14 @@ _dataSprite:
 	ld hl, (_dataSprite)
 	ld de, 26
 	add hl, de
-	push hl
+	ld b, h
+	ld c, l
 	ld hl, (_dataSprite)
 	add hl, de
 	ld a, (hl)
 	ld hl, (24328 - 1)
 	add a, h
-	pop hl
-	ld (hl), a
+	ld (bc), a
 	ld bc, 0
 .core.__END_PROGRAM:
 	di
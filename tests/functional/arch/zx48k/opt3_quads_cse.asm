@@ -0,0 +1,64 @@
+	org 32768
+.core.__START_PROGRAM:
+	di
+	push ix
+	push iy
+	exx
+	push hl
+	exx
+	ld (.core.__CALL_BACK__), sp
+	ei
+	jp .core.__MAIN_PROGRAM__
+.core.__CALL_BACK__:
+	DEFW 0
+.core.ZXBASIC_USER_DATA:
+	; Defines USER DATA Length in bytes
+.core.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_END - .core.ZXBASIC_USER_DATA
+	.core.__LABEL__.ZXBASIC_USER_DATA_LEN EQU .core.ZXBASIC_USER_DATA_LEN
+	.core.__LABEL__.ZXBASIC_USER_DATA EQU .core.ZXBASIC_USER_DATA
+_a:
+	DEFB 00, 00
+_b:
+	DEFB 07h
+	DEFB 00h
+_c:
+	DEFB 02h
+	DEFB 00h
+_x:
+	DEFB 00
+.core.ZXBASIC_USER_DATA_END:
+.core.__MAIN_PROGRAM__:
+	ld a, 5
+	ld (_x), a
+	ld hl, (_b)
+	ld d, h
+	ld e, l
+	add hl, hl
+	add hl, de
+	ex de, hl
+	ld hl, (_c)
+	add hl, de
+	ld (_a), hl
+	ld de, 5
+	add hl, de
+	ld (_c), hl
+	ld a, 11
+	ld (40000), a
+	ld hl, (_a)
+	ld (40001), hl
+	ld hl, (_c)
+	ld (40003), hl
+	ld bc, 0
+.core.__END_PROGRAM:
+	di
+	ld hl, (.core.__CALL_BACK__)
+	ld sp, hl
+	exx
+	pop hl
+	pop iy
+	pop ix
+	exx
+	ei
+	ret
+	;; --- end of user code ---
+	END
@@ -0,0 +1,12 @@
+REM The quads optimizer propagates constants and reuses values already held by variables
+DIM a AS UInteger
+DIM b AS UInteger = 7
+DIM c AS UInteger = 2
+DIM x AS UByte
+
+x = 5
+a = b * 3 + c
+c = b * 3 + c + x
+POKE 40000, x * 2 + 1
+POKE UInteger 40001, a
+POKE UInteger 40003, c
@@ -32,18 +32,7 @@ _sobando:
 	jp z, .LABEL._inicio
 	ld a, 1
 	ld (_sobando), a
-	sub 2
-	jp nz, .LABEL.__LABEL3
-	ld hl, (_toloTimer)
-	inc hl
-	ld a, (hl)
-	sub 12
-	jp nz, .LABEL.__LABEL3
-	ld a, 3
-	ld (_sobando), a
-	jp .LABEL._inicio
 .LABEL.__LABEL3:
-	ld a, (_sobando)
 	or a
 	jp nz, .LABEL._inicio
 	ld de, 10
@@ -70,5 +59,5 @@ __EQ16:	; Test if 16bit values HL == DE
 	    inc a
 	    ret
 	    pop namespace
-#line 38 "arch/zx48k/opt3_tolosob.bas"
+#line 27 "arch/zx48k/opt3_tolosob.bas"
 	END
@@ -20,8 +20,7 @@ _d1:
 	DEFB 00
 .core.ZXBASIC_USER_DATA_END:
 .core.__MAIN_PROGRAM__:
-	ld a, 31
-	add a, 4
+	ld a, 35
 	ld (_d1), a
 	ld bc, 0
 .core.__END_PROGRAM:
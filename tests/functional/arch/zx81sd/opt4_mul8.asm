@@ -68,12 +68,13 @@ _y:
 .core.__MAIN_PROGRAM__:
 	ld a, 1
 	ld (_y), a
-	ld h, 16
-	call .core.__MUL8_FAST
+	ld a, 16
 	push af
 	ld hl, (_x)
-	ld de, 16
-	call .core.__MUL16_FAST
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
 	push hl
 	call _printTest
 	ld hl, 0
@@ -98,78 +99,4 @@ _printTest__leave:
 	exx
 	ret
 	;; --- end of user code ---
-#line 1 "/zxbasic/src/lib/arch/zx48k/runtime/arith/mul16.asm"
-	    push namespace core
-__MUL16:	; Mutiplies HL with the last value stored into de stack
-	    ; Works for both signed and unsigned
-	    PROC
-	    LOCAL __MUL16LOOP
-	    LOCAL __MUL16NOADD
-	    ex de, hl
-	    pop hl		; Return address
-	    ex (sp), hl ; CALLEE caller convention
-__MUL16_FAST:
-	    ld b, 16
-	    ld a, h
-	    ld c, l
-	    ld hl, 0
-__MUL16LOOP:
-	    add hl, hl  ; hl << 1
-	    sla c
-	    rla         ; a,c << 1
-	    jp nc, __MUL16NOADD
-	    add hl, de
-__MUL16NOADD:
-	    djnz __MUL16LOOP
-	    ret	; Result in hl (16 lower bits)
-	    ENDP
-	    pop namespace
-#line 34 "arch/zx81sd/opt4_mul8.bas"
-#line 1 "/zxbasic/src/lib/arch/zx48k/runtime/arith/mul8.asm"
-	    push namespace core
-__MUL8:		; Performs 8bit x 8bit multiplication
-	    PROC
-	    ;LOCAL __MUL8A
-	    LOCAL __MUL8LOOP
-	    LOCAL __MUL8B
-	    ; 1st operand (byte) in A, 2nd operand into the stack (AF)
-	    pop hl	; return address
-	    ex (sp), hl ; CALLE convention
-;;__MUL8_FAST: ; __FASTCALL__ entry
-	;;	ld e, a
-	;;	ld d, 0
-	;;	ld l, d
-	;;
-	;;	sla h
-	;;	jr nc, __MUL8A
-	;;	ld l, e
-	;;
-;;__MUL8A:
-	;;
-	;;	ld b, 7
-;;__MUL8LOOP:
-	;;	add hl, hl
-	;;	jr nc, __MUL8B
-	;;
-	;;	add hl, de
-	;;
-;;__MUL8B:
-	;;	djnz __MUL8LOOP
-	;;
-	;;	ld a, l ; result = A and HL  (Truncate to lower 8 bits)
-__MUL8_FAST: ; __FASTCALL__ entry, a = a * h (8 bit mul) and Carry
-	    ld b, 8
-	    ld l, a
-	    xor a
-__MUL8LOOP:
-	    add a, a ; a *= 2
-	    sla l
-	    jp nc, __MUL8B
-	    add a, h
-__MUL8B:
-	    djnz __MUL8LOOP
-	    ret		; result = HL
-	    ENDP
-	    pop namespace
-#line 35 "arch/zx81sd/opt4_mul8.bas"
 	END
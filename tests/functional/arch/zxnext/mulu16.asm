@@ -18,8 +18,10 @@ _a:
 .core.ZXBASIC_USER_DATA_END:
 .core.__MAIN_PROGRAM__:
 	ld hl, (_a)
-	ld de, 3
-	call .core.__MUL16_FAST
+	ld d, h
+	ld e, l
+	add hl, hl
+	add hl, de
 	ld (_a), hl
 	ld hl, 0
 	ld b, h
@@ -32,33 +34,4 @@ _a:
 	ei
 	ret
 	;; --- end of user code ---
-#line 1 "/zxbasic/src/lib/arch/zxnext/runtime/arith/mul16.asm"
-	    push namespace core
-__MUL16:	; Multiplies HL with the last value stored into de stack
-	    ; Works for both signed and unsigned
-	    PROC
-	    ex de, hl
-	    pop hl		; Return address
-	    ex (sp), hl ; CALLEE caller convention
-__MUL16_FAST:
-	    ld a,d                      ; a = xh
-	    ld d,h                      ; d = yh
-	    ld h,a                      ; h = xh
-	    ld c,e                      ; c = xl
-	    ld b,l                      ; b = yl
-	    mul d,e                     ; yh * yl
-	    ex de,hl
-	    mul d,e                     ; xh * yl
-	    add hl,de                   ; add cross products
-	    ld e,c
-	    ld d,b
-	    mul d,e                     ; yl * xl
-	    ld a,l                      ; cross products lsb
-	    add a,d                     ; add to msb final
-	    ld h,a
-	    ld l,e                      ; hl = final
-	    ret	; Result in hl (16 lower bits)
-	    ENDP
-	    pop namespace
-#line 17 "arch/zxnext/mulu16.bas"
 	END
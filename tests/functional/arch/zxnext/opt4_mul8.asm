@@ -21,13 +21,13 @@ _y:
 .core.__MAIN_PROGRAM__:
 	ld a, 1
 	ld (_y), a
-	ld d, 16
-	ld e, a
-	mul d, e
-	ld a, e
+	ld a, 16
 	push af
 	ld hl, (_x)
-	call .core.__MUL16_FAST
+	add hl, hl
+	add hl, hl
+	add hl, hl
+	add hl, hl
 	push hl
 	call _printTest
 .core.__END_PROGRAM:
@@ -53,33 +53,4 @@ _printTest__leave:
 	exx
 	ret
 	;; --- end of user code ---
-#line 1 "/zxbasic/src/lib/arch/zxnext/runtime/arith/mul16.asm"
-	    push namespace core
-__MUL16:	; Multiplies HL with the last value stored into de stack
-	    ; Works for both signed and unsigned
-	    PROC
-	    ex de, hl
-	    pop hl		; Return address
-	    ex (sp), hl ; CALLEE caller convention
-__MUL16_FAST:
-	    ld a,d                      ; a = xh
-	    ld d,h                      ; d = yh
-	    ld h,a                      ; h = xh
-	    ld c,e                      ; c = xl
-	    ld b,l                      ; b = yl
-	    mul d,e                     ; yh * yl
-	    ex de,hl
-	    mul d,e                     ; xh * yl
-	    add hl,de                   ; add cross products
-	    ld e,c
-	    ld d,b
-	    mul d,e                     ; yl * xl
-	    ld a,l                      ; cross products lsb
-	    add a,d                     ; add to msb final
-	    ld h,a
-	    ld l,e                      ; hl = final
-	    ret	; Result in hl (16 lower bits)
-	    ENDP
-	    pop namespace
-#line 36 "arch/zxnext/opt4_mul8.bas"
 	END
@@ -0,0 +1,6 @@
+; Lines after END are still assembled
+x EQU 5
+    ld a, x
+    END 32768
+    ld a, b
+    nop
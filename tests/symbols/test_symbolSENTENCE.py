@@ -7,6 +7,7 @@
 
 from unittest import TestCase
 
+from src.ast_ import NodeVisitor
 from src.symbols import sym
 
 
@@ -28,3 +29,18 @@ class TestSymbolSENTENCE(TestCase):
     def test_token(self):
         s = sym.SENTENCE(1, "filename.bas", self.TOKEN)
         self.assertEqual(s.token, self.TOKEN)
+
+    def test_visit(self):
+        # Sentences are dispatched by their token (the keyword), not by their class
+        class Visitor(NodeVisitor):
+            def visit_TOKEN(self, node):
+                yield "TOKEN"
+
+            def visit_NOP(self, node):
+                yield "NOP"
+
+        visitor = Visitor()
+        other = sym.SENTENCE(1, "filename.bas", "OTHER")
+        self.assertEqual(visitor.visit(sym.SENTENCE(1, "filename.bas", self.TOKEN)), "TOKEN")
+        self.assertIs(visitor.visit(other), other)  # generic_visit
+        self.assertEqual(visitor.visit(sym.NOP()), "NOP")
@@ -0,0 +1,13 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+import os.path
+import sys
+
+path = os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+sys.path.insert(0, path)
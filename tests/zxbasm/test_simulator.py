@@ -0,0 +1,92 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import pytest
+
+from src.api import config
+from src.zxbasm import asmparse
+from src.zxbasm.simulator import FLAG_C, FLAG_Z, Simulator, simulate
+
+
+@pytest.fixture(autouse=True)
+def init():
+    config.init()
+    asmparse.init()
+
+
+def assemble(code: str):
+    asmparse.assemble("org 32768\n" + code)
+    asmparse.MEMORY.dump()
+    return asmparse.MEMORY
+
+
+def run(code: str) -> Simulator:
+    cpu = Simulator(assemble(code).memory_bytes)
+    assert cpu.run(32768) == "program finished"
+    return cpu
+
+
+def test_alu_flags():
+    cpu = run("ld a, 0FFh\nadd a, 1\nret")
+    assert cpu.a == 0
+    assert cpu.f & FLAG_Z
+    assert cpu.f & FLAG_C
+
+    cpu = run("ld a, 5\ncp 6\nret")
+    assert cpu.a == 5
+    assert cpu.f & FLAG_C
+    assert not cpu.f & FLAG_Z
+
+
+def test_16bit_arithmetic():
+    cpu = run("ld hl, 1000\nld de, 1001\nor a\nsbc hl, de\nret")
+    assert cpu.hl == 0xFFFF
+    assert cpu.f & FLAG_C
+
+
+def test_tstates():
+    # LD B,N (7) + XOR A (4) + 10 x ADD A,B (4) + 9 x DJNZ taken (13) + DJNZ not taken (8) + RET (10)
+    result = simulate(assemble("start:\nld b, 10\nxor a\nloop:\nadd a, b\ndjnz loop\nret"), 32768)
+    assert result.stop_reason == "program finished"
+    assert result.tstates == 7 + 4 + 40 + 9 * 13 + 8 + 10
+    assert result.instructions == 23
+    assert result.by_label[".loop"] == (21, 40 + 9 * 13 + 8 + 10)
+    assert result.histogram["DJNZ N"] == (10, 9 * 13 + 8)
+
+
+def test_conditional_jumps():
+    result = simulate(assemble("xor a\njr nz, skip\njr z, skip\nnop\nskip:\nret"), 32768)
+    assert result.tstates == 4 + 7 + 12 + 10  # JR not taken takes 7 T-states, taken 12
+
+
+def test_ldir():
+    cpu = run("ld hl, src\nld de, 40000\nld bc, 3\nldir\nret\nsrc:\ndb 1, 2, 3")
+    assert cpu.mem[40000:40003] == b"\x01\x02\x03"
+    assert cpu.bc == 0
+    assert cpu.tstates == 10 + 10 + 10 + 2 * 21 + 16 + 10
+
+
+def test_self_modifying_code():
+    cpu = run("ld a, 1\nld (patch + 1), a\npatch:\nld b, 0\nret")
+    assert cpu.b == 1
+
+
+def test_rom_calls():
+    result = simulate(assemble("call 0D6Bh\nret"), 32768)
+    assert result.stop_reason == "program finished"
+    assert result.rom_calls == {0x0D6B: 1}
+
+
+def test_rst8_stops():
+    result = simulate(assemble("rst 8\ndb 1\nret"), 32768)
+    assert result.stop_reason.startswith("error report 1 ")
+
+
+def test_tstates_limit():
+    result = simulate(assemble("loop:\njr loop"), 32768, max_tstates=1000)
+    assert result.stop_reason == "T-states limit reached"
+    assert result.tstates >= 1000
@@ -0,0 +1,46 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import pytest
+
+from src.zxbpp.prepro import OutputBuffer
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [],
+        ["a\n"],
+        ["a\nb", "c\n", "\n", "d"],
+        ["a", "b", "c\nd\ne", "f"],
+        ["\n", "\n"],
+    ],
+)
+def test_lines(chunks):
+    buffer = OutputBuffer()
+    for chunk in chunks:
+        buffer.write(chunk)
+
+    text = "".join(chunks)
+    assert list(buffer.lines()) == text.split("\n")
+    assert buffer.line_count() == text.count("\n")
+    assert buffer.getvalue() == text
+    assert list(buffer.lines()) == text.split("\n")
+
+
+def test_end_line():
+    buffer = OutputBuffer()
+    buffer.end_line()
+    assert not buffer
+
+    buffer.write("a")
+    buffer.end_line()
+    buffer.end_line()
+    assert buffer.getvalue() == "a\n"
+
+    buffer.clear()
+    assert buffer.getvalue() == ""
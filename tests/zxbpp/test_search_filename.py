@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# © Copyright 2008-2024 José Manuel Rodríguez de la Rosa and contributors.
+# See the file CONTRIBUTORS.md for copyright details.
+# See https://www.gnu.org/licenses/agpl-3.0.html for details.
+# --------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from src.api import config
+from src.zxbpp import zxbpp
+
+
+@pytest.fixture
+def lib_dirs(tmp_path, monkeypatch):
+    config.init()
+    zxbpp.init()
+    monkeypatch.setattr(zxbpp, "DIR_LISTINGS", {})  # Not cleared by init()
+    monkeypatch.chdir(tmp_path)
+    stdlib, runtime = tmp_path / "stdlib", tmp_path / "runtime"
+    (runtime / "arith").mkdir(parents=True)
+    stdlib.mkdir()
+    (stdlib / "input.bas").write_text("")
+    (runtime / "arith" / "mul32.asm").write_text("")
+    zxbpp.INCLUDE_MAP["test"] = [str(stdlib), str(runtime)]
+    yield stdlib, runtime
+    zxbpp.INCLUDE_MAP.pop("test")
+
+
+def test_search_library_file(lib_dirs):
+    stdlib, runtime = lib_dirs
+    path = zxbpp.search_filename("arith/mul32.asm", 1, local_first=False, arch="test")
+    assert path == os.path.realpath(runtime / "arith" / "mul32.asm")
+    assert zxbpp.DIR_LISTINGS == {
+        os.path.join(str(stdlib), "arith"): frozenset(),
+        os.path.join(str(runtime), "arith"): {os.path.normcase("mul32.asm")},
+    }
+
+
+def test_listings_are_kept(lib_dirs):
+    stdlib, _ = lib_dirs
+    zxbpp.search_filename("input.bas", 1, local_first=False, arch="test")
+    listings = dict(zxbpp.DIR_LISTINGS)
+    zxbpp.init()
+    assert zxbpp.DIR_LISTINGS == listings == {str(stdlib): {os.path.normcase("input.bas")}}
+
+
+def test_search_is_cached(lib_dirs):
+    stdlib, _ = lib_dirs
+    path = zxbpp.search_filename("input.bas", 1, local_first=True, arch="test")
+    os.remove(stdlib / "input.bas")
+    assert zxbpp.search_filename("input.bas", 1, local_first=True, arch="test") == path
+
+
+def test_search_new_file_outside_listing(lib_dirs):
+    stdlib, _ = lib_dirs
+    zxbpp.search_filename("input.bas", 1, local_first=False, arch="test")
+    (stdlib / "new.bas").write_text("")  # Not in the listing already read
+    assert zxbpp.search_filename("new.bas", 1, local_first=False, arch="test") == os.path.realpath(stdlib / "new.bas")
+
+
+def test_search_case_insensitive(lib_dirs, tmp_path, monkeypatch):
+    """In a case-insensitive file system where normcase() keeps the case (i.e. macOS), listings can't be trusted.
+    A library dir must be taken before other dirs, even if the file name differs in case.
+    """
+    exists = os.path.exists
+
+    def exists_ignoring_case(path: str) -> bool:  # Only the last component, created in lowercase here
+        return exists(os.path.join(os.path.dirname(path), os.path.basename(path).lower()))
+
+    monkeypatch.setattr(os.path, "normcase", lambda x: x)
+    monkeypatch.setattr(os.path, "exists", exists_ignoring_case)
+    _, runtime = lib_dirs
+    (tmp_path / "user" / "arith").mkdir(parents=True)
+    (tmp_path / "user" / "arith" / "mul32.asm").write_text("")
+    config.OPTIONS.include_path = str(tmp_path / "user")
+
+    path = zxbpp.search_filename("arith/MUL32.ASM", 1, local_first=False, arch="test")
+    assert path == os.path.realpath(runtime / "arith" / "MUL32.ASM")
+    assert zxbpp.DIR_LISTINGS[os.path.join(str(runtime), "arith")] is None